@@ -1,10 +1,43 @@
 # app/__init__.py
+import logging
+import os
+import threading
 from flask import Flask
 
+def configure_logging():
+    """Nível via SAPIEN_LOG_LEVEL (DEBUG, INFO, WARNING, ...; OFF desliga)."""
+    level = os.getenv("SAPIEN_LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(
+        level=logging.CRITICAL + 1 if level == "OFF" else level,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+def _watch_scheduler():
+    from app.core.tools.sheduler_tools import watch_scheduler_ownership
+    watch_scheduler_ownership()
+
 def create_app():
+    configure_logging()
     app = Flask(__name__)
 
+    # histórico em SQLite pedido (ex.: vários workers) sem o pacote: falha já na
+    # subida, em vez de cada worker manter as conversas só na própria memória
+    if os.getenv("SAPIEN_CHECKPOINT_DB"):
+        from app.core.checkpoint import check_backend
+        check_backend()
+
     from .routes import routes_bp   
     app.register_blueprint(routes_bp)
 
+    # LLM, embeddings, Chroma e agentes são preparados em segundo plano;
+    # com SAPIEN_WARMUP=0 são criados só no primeiro uso
+    if os.getenv("SAPIEN_WARMUP", "1") == "1":
+        from app.core.registry import warm_in_background
+        warm_in_background()
+
+    # o scheduler roda num único worker: cada um tenta assumi-lo ao subir e de
+    # novo periodicamente, para que os agendamentos continuem se o dono cair
+    if os.getenv("SAPIEN_SCHEDULER_AUTOSTART", "1") == "1":
+        threading.Thread(target=_watch_scheduler, name="scheduler-watch", daemon=True).start()
+
     return app
@@ -1,88 +1,120 @@
+import os
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
 from langgraph.prebuilt import create_react_agent
 from langgraph_supervisor import create_supervisor
-from .tools.nlp_process import nlp_process
-from .tools.validate_content import validate_content
-from .tools.store_in_chromadb import store_in_chromadb
 from .tools.web_search_with_flow import web_search_with_flow
 from .tools.simple_arxiv_search import simple_arxiv_search
+from .tools.search_local_articles import search_local_articles
 from .tools.sheduler_tools import cancel_research
 from .tools.sheduler_tools import schedule_research
 from .tools.sheduler_tools import check_scheduler_results
-from .config import llm
+from .config import get_llm
+from .registry import registry
 
-# --- AGENTES ESPECIALIZADOS ---
+# Orçamento de tokens do histórico enviado ao LLM em cada chamada; o histórico
+# completo continua no checkpointer.
+MAX_HISTORY_TOKENS = int(os.getenv("SAPIEN_MAX_HISTORY_TOKENS", "4000"))
 
-# Agente de Busca Web (Tavily)
-tavily_agent = create_react_agent(
-    model=llm,
-    tools=[web_search_with_flow],
-    prompt="You perform web searches and process results through the standardized flow: NLP -> Validation -> ChromaDB",
-    name="tavily_agent"
-)
+def _history_trimmer(end_on):
+    def trim(state):
+        messages = state["messages"]
+        trimmed = trim_messages(
+            messages,
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            max_tokens=MAX_HISTORY_TOKENS,
+            start_on="human",
+            end_on=end_on,
+            include_system=True,
+        )
+        # a última mensagem do usuário sozinha já passa do orçamento: envia assim mesmo
+        return {"llm_input_messages": trimmed or messages}
+    return trim
 
-# --- Agente de Pesquisa Científica (arXiv) ---
-arxiv_agent = create_react_agent(
-    model=llm,
-    tools=[simple_arxiv_search],
-    name="arxiv_agent",
-    prompt="You search arXiv papers using simple_arxiv_search tool. Pass the search query as parameters."
-)
+# pre_model_hook dos agentes: envia ao LLM só as mensagens mais recentes que
+# cabem em MAX_HISTORY_TOKENS, começando numa mensagem do usuário (sem tool
+# calls órfãs) e terminando na pergunta ou no resultado de uma ferramenta.
+trim_history = _history_trimmer(end_on=("human", "tool"))
 
+# pre_model_hook do supervisor: sem mensagens de retorno (add_handoff_back_messages=False),
+# a resposta final do agente (AIMessage) é a última do histórico e precisa ser mantida.
+trim_supervisor_history = _history_trimmer(end_on=("human", "tool", "ai"))
 
-# Agente Scheduler
-sched_agent = create_react_agent(
-    llm,
-    tools=[schedule_research, cancel_research, check_scheduler_results],
-    prompt="You schedule or cancel periodic arXiv searches, and can check results from scheduled searches.",
-    name="scheduler_agent"
-)
+def _build_supervisor():
+    """Cria os agentes e compila o supervisor (no primeiro uso, ver registry)."""
+    llm = get_llm()
 
-# Agente NLP
-nlp_agent = create_react_agent(
-    model=llm,
-    tools=[nlp_process],
-    prompt="You are the NLP Agent. Process content through linguistic normalization, metadata extraction, and preparation for indexing.",
-    name="nlp_agent"
-)
+    # --- AGENTES ESPECIALIZADOS ---
 
-# Agente de Validação com Similaridade Semântica
-validation_agent = create_react_agent(
-    model=llm,
-    tools=[validate_content],
-    prompt="You are the Validation Agent. Use semantic similarity with embeddings to validate content relevance. Accept content that is semantically similar to the research topic, even without exact keyword matches.",
-    name="validation_agent"
-)
+    # Agente de Busca Web (Tavily)
+    tavily_agent = create_react_agent(
+        model=llm,
+        tools=[web_search_with_flow],
+        pre_model_hook=trim_history,
+        prompt="You perform web searches and process results through the standardized flow: NLP -> Validation -> ChromaDB",
+        name="tavily_agent"
+    )
 
-# Agente ChromaDB
-chromadb_agent = create_react_agent(
-    model=llm,
-    tools=[store_in_chromadb],
-    prompt="You are the ChromaDB Agent. Store validated content with vectorized embeddings optimized for semantic search.",
-    name="chromadb_agent"
-)
+    # --- Agente de Pesquisa Científica (arXiv) ---
+    arxiv_agent = create_react_agent(
+        model=llm,
+        tools=[simple_arxiv_search],
+        pre_model_hook=trim_history,
+        name="arxiv_agent",
+        prompt="You search arXiv papers using simple_arxiv_search tool. Pass the search query as parameters."
+    )
 
-# --- SUPERVISOR ---
-supervisor_graph = create_supervisor(
-    model=llm,
-    agents=[tavily_agent, arxiv_agent, sched_agent, nlp_agent, validation_agent, chromadb_agent],
-    prompt=(
-        "Você é um supervisor que coordena um sistema multi-agente de pesquisas científicas.\n"
-        "FLUXO COMPLETO: Toda informação coletada segue: Coleta -> NLP -> Validação Semântica -> ChromaDB\n\n"
-        "Agentes disponíveis:\n"
-        "- tavily_agent: Buscas gerais na web (já integrado ao fluxo)\n"
-        "- arxiv_agent: Pesquisas científicas no arXiv (já integrado ao fluxo)\n"
-        "- scheduler_agent: Agendamento de pesquisas periódicas\n"
-        "- nlp_agent: Processamento de linguagem natural\n"
-        "- validation_agent: Validação com similaridade semântica usando embeddings\n"
-        "- chromadb_agent: Armazenamento vetorial otimizado\n\n"
-        "Para coleta inicial, use tavily_agent ou arxiv_agent.\n"
-        "O fluxo NLP -> Validação Semântica -> ChromaDB é automático nas ferramentas de coleta.\n"
-        "A validação usa embeddings para aceitar conteúdo semanticamente relevante.\n"
-        "Sempre gere UMA mensagem final clara ao usuário."
-    ),
-    add_handoff_messages=True,
-    add_handoff_back_messages=True,
-    output_mode="full_history"
-)
+    # --- Agente de Consulta à base local (ChromaDB) ---
+    retrieval_agent = create_react_agent(
+        model=llm,
+        tools=[search_local_articles],
+        pre_model_hook=trim_history,
+        name="retrieval_agent",
+        prompt="You answer questions using articles already stored in ChromaDB with search_local_articles. Use the source, year and authors filters when the user mentions them."
+    )
 
-compiled_supervisor = supervisor_graph.compile()
\ No newline at end of file
+    # Agente Scheduler
+    sched_agent = create_react_agent(
+        llm,
+        tools=[schedule_research, cancel_research, check_scheduler_results],
+        pre_model_hook=trim_history,
+        prompt="You schedule or cancel periodic arXiv searches, and can check results from scheduled searches.",
+        name="scheduler_agent"
+    )
+
+    # --- SUPERVISOR ---
+    supervisor_graph = create_supervisor(
+        model=llm,
+        agents=[retrieval_agent, tavily_agent, arxiv_agent, sched_agent],
+        prompt=(
+            "Você é um supervisor que coordena um sistema multi-agente de pesquisas científicas.\n"
+            "FLUXO COMPLETO: Toda informação coletada segue: Coleta -> NLP -> Validação Semântica -> ChromaDB\n\n"
+            "Agentes disponíveis:\n"
+            "- retrieval_agent: Consulta aos artigos já armazenados no ChromaDB (sem coleta na rede)\n"
+            "- tavily_agent: Buscas gerais na web (já integrado ao fluxo)\n"
+            "- arxiv_agent: Pesquisas científicas no arXiv (já integrado ao fluxo)\n"
+            "- scheduler_agent: Agendamento de pesquisas periódicas\n\n"
+            "Para perguntas sobre artigos, consulte primeiro o retrieval_agent; só colete com tavily_agent ou arxiv_agent se a base local não tiver resultados relevantes ou se o usuário pedir novos artigos.\n"
+            "O fluxo NLP -> Validação Semântica -> ChromaDB é automático nas ferramentas de coleta; não há agentes para essas etapas.\n"
+            "A validação usa embeddings para aceitar conteúdo semanticamente relevante.\n"
+            "Sempre gere UMA mensagem final clara ao usuário."
+        ),
+        # só a resposta final de cada agente volta ao supervisor
+        add_handoff_messages=True,
+        add_handoff_back_messages=False,
+        output_mode="last_message",
+        pre_model_hook=trim_supervisor_history
+    )
+
+    return supervisor_graph.compile()
+
+registry.register("supervisor", _build_supervisor)
+
+def get_compiled_supervisor():
+    return registry.get("supervisor")
+
+def __getattr__(name):
+    # compatibilidade: `from app.core.agents import compiled_supervisor`
+    if name == "compiled_supervisor":
+        return get_compiled_supervisor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,131 @@
+"""
+Cursores persistentes das pesquisas agendadas no arXiv.
+
+Para cada tópico guarda a marca d'água (maior data <published> já tratada)
+e as chaves (data completa + id) dos artigos tratados no minuto dessa marca,
+que é a granularidade do filtro submittedDate. Cada tick pede ao arXiv os
+artigos submetidos desde esse minuto, em ordem crescente, e descarta os já
+vistos. O cursor só avança depois do armazenamento, e só até o primeiro
+artigo cuja ingestão falhou, que volta no próximo tick.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional
+
+from app.core.tools.arxiv_client import arxiv_date
+
+CURSOR_DB_PATH = os.getenv("SAPIEN_ARXIV_CURSOR_DB", "./chroma_db/arxiv_cursors.sqlite3")
+
+class ArxivCursorStore:
+    """Marca d'água por tópico gravada em SQLite."""
+
+    def __init__(self, path: str = CURSOR_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS arxiv_cursor ("
+            " topic TEXT PRIMARY KEY, last_published TEXT NOT NULL,"
+            " seen_ids TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(topic: str) -> str:
+        return " ".join(topic.lower().split())
+
+    def get(self, topic: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_published, seen_ids FROM arxiv_cursor WHERE topic = ?",
+                (self._key(topic),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_published": row[0], "seen_ids": json.loads(row[1])}
+
+    def _save(self, topic: str, last_published: str, seen_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO arxiv_cursor (topic, last_published, seen_ids, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (self._key(topic), last_published, json.dumps(seen_ids), datetime.now().isoformat()),
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _seen_key(meta: Dict[str, Any]) -> str:
+        return f"{meta.get('published', '')} {meta['link']}"
+
+    def request_params(self, topic: str, max_results: int) -> Dict[str, Any]:
+        """Parâmetros de `fetch_arxiv_documents` para o próximo tick do tópico."""
+        cursor = self.get(topic)
+        if cursor is None:
+            # primeiro tick: os mais recentes
+            return {"max_results": max_results, "sort_by": "submittedDate", "sort_order": "descending"}
+        # o minuto da marca volta inteiro; pede-se a mais o que já foi visto nele
+        return {
+            "max_results": max_results + len(cursor["seen_ids"]),
+            "sort_by": "submittedDate",
+            "sort_order": "ascending",
+            "since": cursor["last_published"],
+        }
+
+    def new_entries(self, topic: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Artigos ainda não tratados, em ordem crescente de publicação (não grava nada)."""
+        cursor = self.get(topic)
+        if cursor is None:
+            return sorted(entries, key=lambda doc: self._seen_key(doc["metadata"]))
+        minute = arxiv_date(cursor["last_published"])
+        seen = set(cursor["seen_ids"])
+        new = [
+            doc for doc in entries
+            if arxiv_date(doc["metadata"].get("published", "")) >= minute
+            and self._seen_key(doc["metadata"]) not in seen
+        ]
+        return sorted(new, key=lambda doc: self._seen_key(doc["metadata"]))
+
+    def advance(self, topic: str, entries: List[Dict[str, Any]], failed_links: Collection[str] = ()) -> int:
+        """
+        Grava o cursor depois do armazenamento de `entries` (saída de
+        `new_entries`). Avança até o primeiro artigo de `failed_links`; sem
+        artigos novos grava mesmo assim (no primeiro tick a marca passa a ser
+        agora).
+
+        Returns:
+            int: quantos artigos o cursor passou a cobrir.
+        """
+        cursor = self.get(topic)
+        handled = []
+        for doc in entries:
+            if doc["metadata"]["link"] in failed_links:
+                break
+            handled.append(doc)
+
+        if cursor is None and not handled:
+            if entries:
+                # primeiro artigo falhou: o próximo tick repete a busca inicial
+                return 0
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            self._save(topic, now, [])
+            return 0
+
+        last_published = cursor["last_published"] if cursor else ""
+        seen = set(cursor["seen_ids"]) if cursor else set()
+        newest = max([last_published] + [doc["metadata"].get("published", "") for doc in handled])
+        minute = arxiv_date(newest)
+        if not cursor or arxiv_date(last_published) != minute:
+            seen = set()
+        for doc in handled:
+            if arxiv_date(doc["metadata"].get("published", "")) == minute:
+                seen.add(self._seen_key(doc["metadata"]))
+
+        self._save(topic, newest, sorted(seen))
+        return len(handled)
+
+# Instância única do processo
+arxiv_cursors = ArxivCursorStore()
@@ -0,0 +1,121 @@
+"""
+Callbacks do LangChain que alimentam as métricas (ver app/core/metrics.py):
+duração e tokens de cada chamada ao LLM e duração de cada ferramenta,
+com os handoffs entre agentes (`transfer_to_*`/`transfer_back_to_*`)
+contados à parte. Também limita o número de chamadas ao LLM por requisição.
+"""
+import os
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.core.llm_client import PROVIDER_CALL_EVENT
+from app.core.metrics import metrics, record
+
+LLM_TOKENS = metrics.counter("sapien_llm_tokens_total", "Tokens consumidos nas chamadas ao LLM.", ["agent", "kind"])
+LLM_CALLS = metrics.counter("sapien_llm_calls_total", "Chamadas ao LLM por agente.", ["agent"])
+HANDOFFS = metrics.counter("sapien_handoffs_total", "Transferências entre agentes.", ["tool"])
+
+MAX_LLM_CALLS = int(os.getenv("SAPIEN_MAX_LLM_CALLS", "8"))
+
+class LLMCallLimitExceeded(RuntimeError):
+    """Uma requisição tentou mais chamadas ao LLM do que o permitido."""
+
+    def __init__(self, max_calls: int):
+        super().__init__(f"limite de {max_calls} chamadas ao LLM por mensagem atingido")
+        self.max_calls = max_calls
+
+class LLMCallLimitHandler(BaseCallbackHandler):
+    """
+    Interrompe a execução do grafo ao passar de `max_calls` chamadas ao LLM.
+
+    Conta só as chamadas que vão à API, anunciadas pelo ResilientChatModel;
+    respostas do cache de LLM não gastam o limite.
+    """
+
+    raise_error = True
+
+    def __init__(self, max_calls: int = MAX_LLM_CALLS):
+        self.max_calls = max_calls
+        self.calls = 0
+
+    def on_custom_event(self, name: str, data: Any, **kwargs: Any) -> None:
+        if name != PROVIDER_CALL_EVENT:
+            return
+        self.calls += 1
+        if self.calls > self.max_calls:
+            raise LLMCallLimitExceeded(self.max_calls)
+
+def _usage(response) -> Dict[str, int]:
+    """Extrai uso de tokens de um LLMResult (usage_metadata ou llm_output)."""
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"input": usage.get("input_tokens", 0), "output": usage.get("output_tokens", 0)}
+    usage = (getattr(response, "llm_output", None) or {}).get("usage") or {}
+    return {"input": usage.get("input_tokens", 0), "output": usage.get("output_tokens", 0)}
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Mede LLM e ferramentas de uma execução do grafo."""
+
+    def __init__(self):
+        self._starts: Dict[UUID, tuple] = {}
+        # totais da requisição (um handler por execução do grafo)
+        self.llm_calls = 0
+        self.tokens = {"input": 0, "output": 0}
+
+    def _agent(self, metadata: Optional[Dict[str, Any]]) -> str:
+        metadata = metadata or {}
+        return metadata.get("lc_agent_name") or metadata.get("langgraph_node") or "unknown"
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._starts[run_id] = (time.perf_counter(), self._agent(metadata))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        self._starts[run_id] = (time.perf_counter(), self._agent(metadata))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        start, agent = started
+        usage = _usage(response)
+        LLM_CALLS.inc(agent=agent)
+        self.llm_calls += 1
+        for kind, count in usage.items():
+            if count:
+                LLM_TOKENS.inc(count, agent=agent, kind=kind)
+                self.tokens[kind] += count
+        record("llm", time.perf_counter() - start, agent=agent, **usage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            record("llm", time.perf_counter() - started[0], error=True, agent=started[1])
+
+    # --- ferramentas / handoffs ---
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._starts[run_id] = (time.perf_counter(), name)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id, error=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id, error=True)
+
+    def _finish_tool(self, run_id: UUID, error: bool) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        start, name = started
+        if name.startswith("transfer_"):
+            HANDOFFS.inc(tool=name)
+            stage = "handoff"
+        else:
+            stage = f"tool:{name}"
+        record(stage, time.perf_counter() - start, error=error, tool=name)
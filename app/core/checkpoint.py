@@ -0,0 +1,196 @@
+"""
+Checkpointer limitado para o grafo principal.
+
+Substitui o MemorySaver sem limites: mantém no máximo `max_threads` threads
+(LRU) e descarta threads ociosas há mais de `ttl` segundos. Opcionalmente
+persiste em SQLite (pacote langgraph-checkpoint-sqlite), permitindo retomar
+conversas pelo thread_id enviado pelo cliente.
+
+No SQLite o último acesso de cada thread fica numa tabela do próprio banco,
+e não na memória do processo: com vários workers do servidor o LRU e o TTL
+valem para o conjunto, e um worker não apaga uma conversa que outro acabou
+de usar.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+
+logger = logging.getLogger(__name__)
+
+MAX_THREADS = int(os.getenv("SAPIEN_CHECKPOINT_MAX_THREADS", "1000"))
+THREAD_TTL = float(os.getenv("SAPIEN_CHECKPOINT_TTL", "3600"))
+CHECKPOINT_DB = os.getenv("SAPIEN_CHECKPOINT_DB", "")
+SQLITE_MISSING = "SAPIEN_CHECKPOINT_DB está definido, mas o pacote langgraph-checkpoint-sqlite não está instalado."
+
+class _BoundedThreadsMixin:
+    """Rastreia o último acesso de cada thread e remove as excedentes/expiradas."""
+
+    def _init_bounds(self, max_threads: int, ttl: float) -> None:
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._bounds_lock = threading.Lock()
+        self.evicted_threads = 0
+
+    @staticmethod
+    def _thread_id(config: Dict[str, Any]) -> Optional[str]:
+        return (config or {}).get("configurable", {}).get("thread_id")
+
+    def _touch(self, config: Dict[str, Any]) -> None:
+        thread_id = self._thread_id(config)
+        if thread_id is None:
+            return
+        now = time.monotonic()
+        expired = []
+        with self._bounds_lock:
+            self._last_access[thread_id] = now
+            self._last_access.move_to_end(thread_id)
+            while self._last_access:
+                oldest, last = next(iter(self._last_access.items()))
+                if oldest == thread_id:
+                    break
+                if len(self._last_access) > self.max_threads or now - last > self.ttl:
+                    self._last_access.popitem(last=False)
+                    expired.append(oldest)
+                else:
+                    break
+        for old_thread in expired:
+            self.delete_thread(old_thread)
+            self.evicted_threads += 1
+
+    def get_tuple(self, config):
+        self._touch(config)
+        return super().get_tuple(config)
+
+    def put(self, config, *args, **kwargs):
+        self._touch(config)
+        return super().put(config, *args, **kwargs)
+
+    def put_writes(self, config, *args, **kwargs):
+        self._touch(config)
+        return super().put_writes(config, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._bounds_lock:
+            return {
+                "threads": len(self._last_access),
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl,
+                "evicted_threads": self.evicted_threads,
+            }
+
+def _stored_bytes(obj: Any) -> int:
+    """Soma o tamanho dos blobs serializados guardados pelo MemorySaver."""
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(_stored_bytes(v) for v in obj.values())
+    if isinstance(obj, (tuple, list)):
+        return sum(_stored_bytes(v) for v in obj)
+    return 0
+
+class BoundedMemorySaver(_BoundedThreadsMixin, MemorySaver):
+    """MemorySaver com limite de threads (LRU) e TTL por thread."""
+
+    def __init__(self, max_threads: int = MAX_THREADS, ttl: float = THREAD_TTL, **kwargs):
+        super().__init__(**kwargs)
+        self._init_bounds(max_threads, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["backend"] = "memory"
+        stats["stored_bytes"] = (
+            _stored_bytes(dict(self.storage)) + _stored_bytes(self.writes) + _stored_bytes(self.blobs)
+        )
+        return stats
+
+def _create_sqlite_saver(path: str, max_threads: int, ttl: float):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class BoundedSqliteSaver(_BoundedThreadsMixin, SqliteSaver):
+        """SqliteSaver com o mesmo limite de threads, com último acesso compartilhado no banco."""
+
+        def _touch(self, config: Dict[str, Any]) -> None:
+            thread_id = self._thread_id(config)
+            if thread_id is None:
+                return
+            now = time.time()
+            with self.lock:
+                self.conn.execute(
+                    "INSERT INTO thread_access (thread_id, last_access) VALUES (?, ?)"
+                    " ON CONFLICT (thread_id) DO UPDATE SET last_access = excluded.last_access",
+                    (thread_id, now),
+                )
+                # expiradas e excedentes, da mais antiga para a mais recente
+                expired = [row[0] for row in self.conn.execute(
+                    "SELECT thread_id FROM thread_access WHERE last_access < ?"
+                    " UNION SELECT thread_id FROM"
+                    " (SELECT thread_id FROM thread_access ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (now - self.ttl, self.max_threads),
+                ) if row[0] != thread_id]
+                self.conn.executemany("DELETE FROM thread_access WHERE thread_id = ?", [(t,) for t in expired])
+                self.conn.commit()
+            for old_thread in expired:
+                self.delete_thread(old_thread)
+                self.evicted_threads += 1
+
+        def stats(self) -> Dict[str, Any]:
+            with self.lock:
+                threads = self.conn.execute("SELECT COUNT(*) FROM thread_access").fetchone()[0]
+            return {
+                "backend": "sqlite",
+                "path": path,
+                "threads": threads,
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl,
+                "evicted_threads": self.evicted_threads,
+                "stored_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    saver = BoundedSqliteSaver(conn)
+    saver.setup()
+    saver._init_bounds(max_threads, ttl)
+
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS thread_access (thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS thread_access_last ON thread_access (last_access)")
+    # threads gravadas antes desta tabela entram no LRU com o horário atual
+    conn.execute(
+        "INSERT OR IGNORE INTO thread_access (thread_id, last_access)"
+        " SELECT DISTINCT thread_id, ? FROM checkpoints",
+        (time.time(),),
+    )
+    conn.commit()
+    return saver
+
+def create_checkpointer(path: Optional[str] = None, max_threads: int = MAX_THREADS, ttl: float = THREAD_TTL):
+    """
+    Cria o checkpointer do grafo: SQLite se `path` (ou SAPIEN_CHECKPOINT_DB)
+    estiver definido, senão em memória. Sem o pacote do SQLite levanta
+    RuntimeError em vez de cair para a memória, o que separaria as
+    conversas por worker.
+    """
+    path = path if path is not None else CHECKPOINT_DB
+    if path:
+        try:
+            return _create_sqlite_saver(path, max_threads, ttl)
+        except ImportError as e:
+            raise RuntimeError(SQLITE_MISSING) from e
+    return BoundedMemorySaver(max_threads=max_threads, ttl=ttl)
+
+def check_backend(path: Optional[str] = None) -> None:
+    """Falha na subida do app se o checkpointer em SQLite foi pedido e o pacote falta."""
+    from importlib.util import find_spec
+
+    path = path if path is not None else CHECKPOINT_DB
+    if path and find_spec("langgraph.checkpoint.sqlite") is None:
+        raise RuntimeError(SQLITE_MISSING)
@@ -1,8 +1,6 @@
-import os, getpass, time, random
-from langchain.chat_models import init_chat_model
-from langchain.embeddings.huggingface import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
+import os, getpass
 from dotenv import load_dotenv
+from .registry import registry
 
 load_dotenv()
 
@@ -16,37 +14,65 @@ _set_env("TAVILY_API_KEY")
 _set_env("ANTHROPIC_API_KEY")
 
 def create_llm_with_retry():
-    def try_init():
-        return init_chat_model("anthropic:claude-3-5-sonnet-latest")
-    for attempt in range(3):
-        try:
-            return try_init()
-        except Exception as e:
-            if "529" in str(e) or "overloaded" in str(e).lower():
-                delay = 2 ** attempt + random.random()
-                print(f"⏳ Tentativa {attempt+1}, aguardando {delay:.1f}s...")
-                time.sleep(delay)
-            else:
-                raise
-    raise RuntimeError("Não foi possível inicializar o modelo.")
-
-llm = create_llm_with_retry()
-
-
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(
-    collection_name="artigos_cientificos",
-    embedding_function=embeddings,
-    persist_directory="./chroma_db"
-)
-
-# caches globais
-adicionados_arxiv_links = set()
-processed_content_hashes = set()
-current_processed_data = None
-
-# scheduler compartilhado
-from apscheduler.schedulers.background import BackgroundScheduler
-scheduler = BackgroundScheduler()
-scheduler.start()
-active_jobs = {}
+    """
+    Chat model com limite de taxa/concorrência, novas tentativas em 429/529 e
+    circuit breaker aplicados a cada chamada (ver llm_client). Construir o
+    modelo não faz requisições, então não há o que repetir aqui.
+    """
+    from langchain.chat_models import init_chat_model
+    from .llm_client import ResilientChatModel
+
+    # as novas tentativas ficam no wrapper, não no cliente da Anthropic
+    inner = init_chat_model("anthropic:claude-3-5-sonnet-latest", max_retries=0)
+    # cache de respostas (ver llm_cache) antes do limitador: acertos não gastam cota
+    return ResilientChatModel(inner=inner, cache=registry.get("llm_cache"))
+
+SCHEDULER_LOCK = os.getenv("SAPIEN_SCHEDULER_LOCK", "./chroma_db/scheduler.lock")
+
+class SchedulerUnavailable(RuntimeError):
+    """Outro worker do servidor é o dono do scheduler."""
+
+def _create_scheduler():
+    # scheduler compartilhado: os jobs só enfileiram pesquisas (ver research_queue),
+    # um tick por tópico por vez e ticks perdidos coalescidos num só.
+    # Com vários workers, só o processo que obtiver a trava roda o scheduler.
+    from .process_lock import ProcessLock
+    lock = ProcessLock(SCHEDULER_LOCK)
+    if not lock.acquire():
+        raise SchedulerUnavailable("o scheduler está ativo em outro worker")
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerThreadPool
+    scheduler = BackgroundScheduler(
+        executors={"default": SchedulerThreadPool(int(os.getenv("SAPIEN_SCHEDULER_THREADS", "10")))},
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 30}
+    )
+    scheduler.start()
+    scheduler._sapien_lock = lock  # mantém a trava enquanto o processo viver
+    return scheduler
+
+def _create_llm_cache():
+    from .llm_cache import create_llm_cache
+    return create_llm_cache()
+
+# LLM, embeddings, vectorstore e scheduler são criados no primeiro uso (ver registry)
+registry.register("llm_cache", _create_llm_cache)
+registry.register("llm", create_llm_with_retry)
+registry.register("scheduler", _create_scheduler)
+
+def get_llm():
+    return registry.get("llm")
+
+def get_scheduler():
+    return registry.get("scheduler")
+
+def __getattr__(name):
+    # compatibilidade com `from app.core.config import llm, vectorstore, ...`
+    if name == "llm":
+        return get_llm()
+    if name == "scheduler":
+        return get_scheduler()
+    if name in ("embeddings", "vectorstore"):
+        from . import vectorestore
+        return getattr(vectorestore, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,302 @@
+"""
+Índice de deduplicação persistente (links do arXiv e hashes de conteúdo).
+
+Os conjuntos ficam num arquivo SQLite ao lado do diretório do Chroma, então
+sobrevivem a reinícios. Um filtro de Bloom em memória responde "certamente
+novo" sem tocar o disco, e um pequeno cache LRU guarda as chaves confirmadas
+recentemente, de modo que consultas repetidas também não vão ao disco.
+
+O arquivo é compartilhado pelos workers do servidor. Cada chave nova também
+entra em `seen_log` (por trigger); antes de responder, o índice confere o
+`PRAGMA data_version` e, se outra conexão gravou, acrescenta ao Bloom só as
+chaves registradas desde a última leitura.
+"""
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import groupby
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DB_PATH = os.getenv("SAPIEN_DEDUP_DB", "./chroma_db/dedup_index.sqlite3")
+BLOOM_CAPACITY = int(os.getenv("SAPIEN_DEDUP_BLOOM_CAPACITY", "1000000"))
+BLOOM_ERROR_RATE = 0.01
+RECENT_CACHE_SIZE = 10000
+# Limite de parâmetros por consulta no SQLite
+_SQL_CHUNK = 500
+
+LINK = "link"
+CONTENT_HASH = "hash"
+
+# Versão do bootstrap gravada em `meta`: a 2 passou a registrar os hashes de
+# conteúdo em blake2b (content_hash_of); índices da versão 1 (MD5) são
+# completados com os hashes novos na próxima abertura do vectorstore.
+BOOTSTRAP_VERSION = "2"
+
+def join_chunks(texts: List[str]) -> str:
+    """Remonta o conteúdo normalizado a partir dos chunks, descontando a sobreposição."""
+    content = texts[0]
+    for text in texts[1:]:
+        overlap = 0
+        for size in range(min(len(content), len(text)), 0, -1):
+            if content.endswith(text[:size]):
+                overlap = size
+                break
+        content += text[overlap:] if overlap else " " + text
+    return content
+
+class BloomFilter:
+    """Filtro de Bloom simples com double hashing sobre blake2b."""
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class DedupIndex:
+    """Conjuntos persistentes de chaves já vistas, separados por tipo (link, hash)."""
+
+    def __init__(self, path: str = DEDUP_DB_PATH, use_bloom: bool = True):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " kind TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (kind, key)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_log ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL)"
+        )
+        # só inserções efetivas (INSERT OR IGNORE de chave existente não dispara)
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS seen_log_insert AFTER INSERT ON seen"
+            " BEGIN INSERT INTO seen_log (kind, key) VALUES (NEW.kind, NEW.key); END"
+        )
+        self._conn.commit()
+        self._log_position = 0
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[tuple, None]" = OrderedDict()
+        self._bloom = BloomFilter() if use_bloom else None
+        if self._bloom is not None:
+            self._load_bloom()
+
+    def _load_bloom(self) -> None:
+        # posição do log e chaves lidas no mesmo snapshot
+        self._conn.execute("BEGIN")
+        self._log_position = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM seen_log").fetchone()[0]
+        for kind, key in self._conn.execute("SELECT kind, key FROM seen"):
+            self._bloom.add(f"{kind}:{key}")
+        self._conn.commit()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _catch_up(self) -> None:
+        """Acrescenta ao Bloom as chaves gravadas por outros processos (chamado com a trava)."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        for row_id, kind, key in self._conn.execute(
+            "SELECT id, kind, key FROM seen_log WHERE id > ? ORDER BY id", (self._log_position,)
+        ):
+            self._bloom.add(f"{kind}:{key}")
+            self._log_position = row_id
+
+    def _remember(self, kind: str, key: str) -> None:
+        self._recent[(kind, key)] = None
+        self._recent.move_to_end((kind, key))
+        while len(self._recent) > RECENT_CACHE_SIZE:
+            self._recent.popitem(last=False)
+
+    def contains_many(self, kind: str, keys: Iterable[str]) -> List[bool]:
+        """Verifica várias chaves de uma vez; só as candidatas do Bloom vão ao disco."""
+        keys = list(keys)
+        found = set()
+        with self._lock:
+            if self._bloom is not None:
+                self._catch_up()
+            candidates = []
+            for key in keys:
+                if (kind, key) in self._recent:
+                    found.add(key)
+                elif self._bloom is None or f"{kind}:{key}" in self._bloom:
+                    candidates.append(key)
+            candidates = list(dict.fromkeys(candidates))
+            for start in range(0, len(candidates), _SQL_CHUNK):
+                chunk = candidates[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key FROM seen WHERE kind = ? AND key IN ({placeholders})",
+                    [kind, *chunk],
+                )
+                for (key,) in rows:
+                    found.add(key)
+                    self._remember(kind, key)
+        return [key in found for key in keys]
+
+    def contains(self, kind: str, key: str) -> bool:
+        return self.contains_many(kind, [key])[0]
+
+    def add_many(self, kind: str, keys: Iterable[str]) -> None:
+        """Registra várias chaves numa única transação."""
+        keys = [k for k in dict.fromkeys(keys) if k]
+        if not keys:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (kind, key) VALUES (?, ?)",
+                [(kind, key) for key in keys],
+            )
+            self._conn.commit()
+            for key in keys:
+                if self._bloom is not None:
+                    self._bloom.add(f"{kind}:{key}")
+                self._remember(kind, key)
+
+    def add(self, kind: str, key: str) -> None:
+        self.add_many(kind, [key])
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def _rehash(self, content_hash: str, texts: List[str]) -> Tuple[str, Optional[str]]:
+        """
+        Confere o hash gravado contra o conteúdo remontado dos chunks (em
+        ordem de chunk_index). Devolve ("md5", hash blake2b) para documentos
+        da versão com MD5, ("current", None) se o hash gravado já é o novo e
+        ("unmatched", None) se nenhum confere (ex.: faltam chunks).
+        """
+        from app.core.tools.nlp_process import content_hash_of
+
+        content = join_chunks(texts)
+        if hashlib.md5(content.encode()).hexdigest() == content_hash:
+            # a normalização antiga podia deixar espaços duplos; a atual não
+            return "md5", content_hash_of(" ".join(content.split()))
+        if content_hash_of(content) == content_hash:
+            return "current", None
+        return "unmatched", None
+
+    def bootstrap_from_vectorstore(self, vectorstore, page_size: int = 5000) -> int:
+        """
+        Carrega em lote os `content_hash` e `link` já gravados no Chroma.
+
+        Documentos gravados antes da troca de MD5 por blake2b recebem também
+        o hash novo, calculado sobre o conteúdo remontado dos chunks (só
+        quando o MD5 desse conteúdo confere com o gravado). O Chroma não
+        devolve os chunks de um documento em sequência, então eles são
+        agrupados por `content_hash` e `chunk_index` numa tabela temporária
+        antes de remontar. Executado uma vez por versão do índice; devolve
+        quantos metadados foram lidos.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'bootstrapped'").fetchone()
+        version = row[0] if row else None
+        if version == BOOTSTRAP_VERSION:
+            return 0
+        # índice da versão 1: links e hashes antigos já carregados, falta o rehash
+        rehash_only = version is not None
+
+        with self._lock:
+            self._conn.execute("DROP TABLE IF EXISTS temp.bootstrap_chunks")
+            self._conn.execute(
+                "CREATE TEMP TABLE bootstrap_chunks (content_hash TEXT NOT NULL, chunk_index INTEGER, text TEXT NOT NULL)"
+            )
+
+        total = 0
+        offset = 0
+        while True:
+            page = vectorstore.get(include=["metadatas", "documents"], limit=page_size, offset=offset)
+            metadatas = page.get("metadatas") or []
+            if not metadatas:
+                break
+            if not rehash_only:
+                self.add_many(CONTENT_HASH, (m.get("content_hash") for m in metadatas if m))
+                self.add_many(LINK, (m.get("link") for m in metadatas if m))
+            rows = [
+                (meta["content_hash"], meta.get("chunk_index"), text or "")
+                for meta, text in zip(metadatas, page.get("documents") or [])
+                if meta and meta.get("content_hash")
+            ]
+            with self._lock:
+                self._conn.executemany("INSERT INTO temp.bootstrap_chunks VALUES (?, ?, ?)", rows)
+            total += len(metadatas)
+            offset += len(metadatas)
+            if len(metadatas) < page_size:
+                break
+
+        counts = {"md5": 0, "current": 0, "unmatched": 0}
+        unmatched: List[str] = []
+        rehashed: List[str] = []
+        with self._lock:
+            # um documento por vez, chunks na ordem; ids repetidos entre páginas contam uma vez
+            rows = self._conn.execute(
+                "SELECT content_hash, chunk_index, MIN(text) FROM temp.bootstrap_chunks"
+                " GROUP BY content_hash, COALESCE(chunk_index, rowid) ORDER BY content_hash, chunk_index, rowid"
+            )
+            for content_hash, group in groupby(rows, key=lambda row: row[0]):
+                status, new_hash = self._rehash(content_hash, [text for _, _, text in group])
+                counts[status] += 1
+                if new_hash is not None:
+                    rehashed.append(new_hash)
+                if status == "unmatched":
+                    unmatched.append(content_hash)
+            self._conn.execute("DROP TABLE temp.bootstrap_chunks")
+        self.add_many(CONTENT_HASH, rehashed)
+        if counts["md5"]:
+            logger.info(
+                "bootstrap do índice de deduplicação: %d documentos com MD5 receberam o hash novo, %d já estavam em blake2b",
+                counts["md5"], counts["current"],
+            )
+        if unmatched:
+            logger.warning(
+                "%d documentos não puderam ser re-hasheados (conteúdo remontado não confere com o hash gravado): %s",
+                len(unmatched), ", ".join(h[:8] for h in unmatched[:10]) + (" ..." if len(unmatched) > 10 else ""),
+            )
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('bootstrapped', ?)", (BOOTSTRAP_VERSION,)
+            )
+            self._conn.commit()
+        return total
+
+# Instância única do processo, aberta no primeiro uso: importar o módulo não
+# cria o arquivo nem lê a tabela inteira para o Bloom
+registry.register("dedup_index", DedupIndex)
+
+def get_dedup_index() -> DedupIndex:
+    return registry.get("dedup_index")
+
+def __getattr__(name):
+    # compatibilidade: `from app.core.dedup_index import dedup_index`
+    if name == "dedup_index":
+        return get_dedup_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
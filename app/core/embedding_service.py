@@ -0,0 +1,123 @@
+"""
+Serviço único de embeddings compartilhado por validação, armazenamento e consultas.
+
+Carrega o modelo all-MiniLM-L6-v2 uma só vez no processo e mantém um cache
+LRU limitado de vetores indexado pelo hash do texto, de modo que o vetor
+calculado na validação é reaproveitado quando o Chroma indexa o mesmo chunk.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.metrics import timed
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_SIZE = int(os.getenv("SAPIEN_EMBEDDING_CACHE_SIZE", "4096"))
+
+class CachedEmbeddingService(Embeddings):
+    """Embeddings do SentenceTransformer com cache LRU por hash de conteúdo."""
+
+    def __init__(self, model_name: str = MODEL_NAME, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def model(self):
+        """Carrega o SentenceTransformer uma única vez."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray) -> None:
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Codifica uma lista de textos, consultando o cache antes do modelo.
+
+        Os textos ausentes do cache são codificados numa única chamada a `encode`.
+
+        Returns:
+            np.ndarray: matriz (len(texts), dim) na mesma ordem da entrada.
+        """
+        keys = [self._key(t) for t in texts]
+        vectors = [self._cache_get(k) for k in keys]
+
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            with timed("embedding", len(missing)):
+                encoded = self.model.encode(list(missing.values()))
+            computed = dict(zip(missing.keys(), encoded))
+            for key, vector in computed.items():
+                self._cache_put(key, vector)
+            vectors = [v if v is not None else computed[k] for k, v in zip(keys, vectors)]
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores do cache de embeddings."""
+        with self._cache_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+            }
+
+    def clear_cache(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+# Instância única do processo
+embedding_service = CachedEmbeddingService()
+
+def get_embedding_service() -> CachedEmbeddingService:
+    """Retorna o serviço de embeddings compartilhado."""
+    return embedding_service
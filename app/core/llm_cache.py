@@ -0,0 +1,254 @@
+"""
+Cache de respostas do LLM (LangChain `BaseCache`) em SQLite.
+
+- Exato: a chave é (modelo + parâmetros + ferramentas vinculadas, mensagens).
+  Ids de mensagens e de tool calls, que mudam a cada execução, são removidos
+  antes de calcular a chave.
+- Semântico (opcional, SAPIEN_LLM_CACHE_SEMANTIC=1): com o mesmo modelo e o
+  mesmo histórico anterior, reaproveita a resposta se a última mensagem for
+  semanticamente parecida (embeddings do serviço compartilhado, limiar
+  SAPIEN_LLM_CACHE_THRESHOLD).
+- O arquivo é limitado a SAPIEN_LLM_CACHE_MAX_MB; as entradas usadas há
+  mais tempo são descartadas primeiro.
+
+Modos (SAPIEN_LLM_CACHE_MODE):
+- off: sem cache (padrão);
+- cache: consulta e grava;
+- record: sempre chama o modelo e grava todas as respostas;
+- replay: só responde do cache e falha em vez de chamar o modelo, para rodar
+  o grafo multiagente offline e de forma determinística.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_MODE = os.getenv("SAPIEN_LLM_CACHE_MODE", "off").lower()
+LLM_CACHE_DB = os.getenv("SAPIEN_LLM_CACHE_DB", "./chroma_db/llm_cache.sqlite3")
+LLM_CACHE_MAX_MB = float(os.getenv("SAPIEN_LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_SEMANTIC = os.getenv("SAPIEN_LLM_CACHE_SEMANTIC", "0") == "1"
+LLM_CACHE_THRESHOLD = float(os.getenv("SAPIEN_LLM_CACHE_THRESHOLD", "0.95"))
+# candidatos comparados por consulta semântica (os mais recentes do mesmo contexto)
+SEMANTIC_CANDIDATES = 500
+
+MODES = ("off", "cache", "record", "replay")
+
+CACHE_EVENTS = metrics.counter("sapien_llm_cache_total", "Consultas ao cache do LLM.", ["result"])
+
+class LLMReplayMiss(LookupError):
+    """Modo replay: a chamada ao LLM não está gravada no cache."""
+
+# campos que variam entre execuções idênticas e não entram na chave
+_VOLATILE_KEYS = {"id", "tool_call_id", "response_metadata", "usage_metadata"}
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        # no formato serializado do LangChain o "id" de topo é o caminho da classe
+        keep_id = value.get("lc") == 1
+        return {
+            k: _strip_volatile(v) for k, v in value.items()
+            if k not in _VOLATILE_KEYS or (k == "id" and keep_id)
+        }
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+def _messages(prompt: str) -> list:
+    """Mensagens normalizadas a partir do prompt serializado pelo LangChain."""
+    try:
+        data = json.loads(prompt)
+    except ValueError:
+        return [prompt]
+    data = _strip_volatile(data)
+    return data if isinstance(data, list) else [data]
+
+def _message_text(message: Any) -> str:
+    if isinstance(message, dict):
+        content = message.get("kwargs", {}).get("content", "")
+    else:
+        content = message
+    if isinstance(content, list):
+        content = " ".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+    return str(content)
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+class SQLiteLLMCache(BaseCache):
+    def __init__(
+        self,
+        path: str = LLM_CACHE_DB,
+        mode: str = LLM_CACHE_MODE,
+        max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024),
+        semantic: bool = LLM_CACHE_SEMANTIC,
+        threshold: float = LLM_CACHE_THRESHOLD,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"SAPIEN_LLM_CACHE_MODE inválido: {mode!r} (use {', '.join(MODES)})")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.semantic = semantic
+        self.threshold = threshold
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, llm_hash TEXT NOT NULL, context_hash TEXT NOT NULL,"
+            " value TEXT NOT NULL, embedding BLOB, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_context ON llm_cache (llm_hash, context_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    # --- chaves ---
+    @staticmethod
+    def _keys(prompt: str, llm_string: str) -> Tuple[str, str, str, list]:
+        """(chave exata, hash do modelo, hash do histórico sem a última mensagem, mensagens)"""
+        messages = _messages(prompt)
+        llm_hash = _digest(llm_string)
+        context_hash = _digest(llm_hash, _dump(messages[:-1]))
+        key = _digest(llm_hash, _dump(messages))
+        return key, llm_hash, context_hash, messages
+
+    def _embed(self, messages: list) -> np.ndarray:
+        from app.core.embedding_service import get_embedding_service
+
+        vector = get_embedding_service().encode([_message_text(messages[-1])])[0].astype(np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    # --- BaseCache ---
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if self.mode in ("off", "record"):
+            return None
+        key, llm_hash, context_hash, messages = self._keys(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._touch(key)
+        result = "hit"
+        if row is None and self.semantic and messages:
+            row = self._semantic_lookup(llm_hash, context_hash, messages)
+            result = "semantic_hit"
+        if row is None:
+            CACHE_EVENTS.inc(result="miss")
+            if self.mode == "replay":
+                raise LLMReplayMiss(f"chamada ao LLM não gravada (chave {key[:12]}); grave com SAPIEN_LLM_CACHE_MODE=record")
+            return None
+        CACHE_EVENTS.inc(result=result)
+        return [loads(g) for g in json.loads(row[0])]
+
+    def _semantic_lookup(self, llm_hash: str, context_hash: str, messages: list):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, embedding FROM llm_cache"
+                " WHERE llm_hash = ? AND context_hash = ? AND embedding IS NOT NULL"
+                " ORDER BY last_used DESC LIMIT ?",
+                (llm_hash, context_hash, SEMANTIC_CANDIDATES),
+            ).fetchall()
+        if not rows:
+            return None
+        try:
+            query = self._embed(messages)
+        except Exception as e:
+            # sem o modelo de embeddings, só o cache exato responde
+            logger.warning("cache semântico do LLM indisponível: %s", e)
+            return None
+        matrix = np.vstack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        with self._lock:
+            self._touch(rows[best][0])
+        return (rows[best][1],)
+
+    def _touch(self, key: str) -> None:
+        self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        if self.mode in ("off", "replay"):
+            return
+        key, llm_hash, context_hash, messages = self._keys(prompt, llm_string)
+        value = json.dumps([dumps(g) for g in return_val])
+        embedding = None
+        if self.semantic and messages:
+            try:
+                embedding = self._embed(messages).tobytes()
+            except Exception as e:
+                logger.warning("cache semântico do LLM indisponível: %s", e)
+        size = len(value) + (len(embedding) if embedding else 0)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache"
+                " (key, llm_hash, context_hash, value, embedding, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, llm_hash, context_hash, value, embedding, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Remove as entradas menos usadas até caber em `max_bytes`."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "mode": self.mode,
+            "semantic": self.semantic,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+def create_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Cache configurado pelas variáveis de ambiente (None no modo off)."""
+    if LLM_CACHE_MODE == "off":
+        return None
+    return SQLiteLLMCache()
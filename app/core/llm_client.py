@@ -0,0 +1,327 @@
+"""
+Cliente resiliente do LLM.
+
+`ResilientChatModel` envolve o chat model e aplica, em cada chamada:
+- limite de taxa por token bucket (SAPIEN_LLM_RATE chamadas/s, rajadas de
+  até SAPIEN_LLM_BURST);
+- no máximo SAPIEN_LLM_CONCURRENCY chamadas simultâneas;
+- novas tentativas com backoff exponencial e jitter em 429/529/overloaded
+  (respeitando Retry-After quando a API informa);
+- circuit breaker: após SAPIEN_LLM_BREAKER_FAILURES falhas seguidas as
+  chamadas falham na hora por SAPIEN_LLM_BREAKER_RESET segundos, e então
+  uma chamada de teste decide se o circuito fecha.
+
+O modelo interno é qualquer `BaseChatModel`, então um modelo falso que injeta
+erros serve para exercitar o comportamento.
+
+Respostas vindas do cache (ver llm_cache) não chegam ao wrapper; cada chamada
+que de fato vai à API é anunciada aos callbacks com o evento
+PROVIDER_CALL_EVENT (usado pelo limite de chamadas por requisição).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import handle_event
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_RATE = float(os.getenv("SAPIEN_LLM_RATE", "2.0"))
+LLM_BURST = int(os.getenv("SAPIEN_LLM_BURST", "5"))
+LLM_CONCURRENCY = int(os.getenv("SAPIEN_LLM_CONCURRENCY", "4"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("SAPIEN_LLM_QUEUE_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("SAPIEN_LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE = float(os.getenv("SAPIEN_LLM_RETRY_BASE", "1.0"))
+LLM_RETRY_MAX = float(os.getenv("SAPIEN_LLM_RETRY_MAX", "30"))
+LLM_BREAKER_FAILURES = int(os.getenv("SAPIEN_LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("SAPIEN_LLM_BREAKER_RESET", "30"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+PROVIDER_CALL_EVENT = "sapien_llm_provider_call"
+
+QUEUE_SECONDS = metrics.histogram(
+    "sapien_llm_queue_seconds", "Espera por vaga (taxa + concorrência) antes de chamar o LLM."
+)
+RETRIES = metrics.counter("sapien_llm_retries_total", "Novas tentativas de chamadas ao LLM.", ["reason"])
+FAST_FAILS = metrics.counter("sapien_llm_fast_fail_total", "Chamadas recusadas sem ir à API.", ["reason"])
+BREAKER_OPENED = metrics.counter("sapien_llm_breaker_open_total", "Vezes em que o circuit breaker abriu.")
+
+class LLMUnavailableError(RuntimeError):
+    """O LLM está indisponível (circuito aberto ou fila cheia); a chamada nem foi feita."""
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` fichas por segundo, até `capacity` acumuladas."""
+
+    def __init__(self, rate: float = LLM_RATE, capacity: int = LLM_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Espera por uma ficha; False se não houver uma dentro de `timeout` segundos."""
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """Fechado -> aberto após `failure_threshold` falhas seguidas -> meio-aberto após `reset_timeout`."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Levanta LLMUnavailableError se o circuito estiver aberto."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise LLMUnavailableError("circuito aberto após falhas seguidas do LLM")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                # só uma chamada de teste por vez
+                if self._probe_running:
+                    raise LLMUnavailableError("LLM em recuperação; aguardando chamada de teste")
+                self._probe_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_running = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    BREAKER_OPENED.inc()
+                    logger.warning("circuit breaker do LLM aberto por %.0fs", self.reset_timeout)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Chamada de teste terminou com erro que não indica indisponibilidade."""
+        with self._lock:
+            self._probe_running = False
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(error: BaseException) -> bool:
+    """429/529/5xx, 'overloaded' e 'rate limit' (inclui erros de conexão/timeout da API)."""
+    if isinstance(error, LLMUnavailableError):
+        return False
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("overloaded", "rate limit", "rate_limit", "timeout", "connection"))
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """Exponencial com jitter (entre metade e o valor cheio), limitado a LLM_RETRY_MAX."""
+    delay = min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt)
+    delay = random.uniform(delay / 2, delay)
+    hinted = _retry_after(error) if error is not None else None
+    return min(LLM_RETRY_MAX, max(delay, hinted or 0.0))
+
+class LLMGuard:
+    """Taxa, concorrência, novas tentativas e circuit breaker compartilhados pelas chamadas."""
+
+    def __init__(
+        self,
+        bucket: Optional[TokenBucket] = None,
+        max_concurrency: int = LLM_CONCURRENCY,
+        breaker: Optional[CircuitBreaker] = None,
+        max_retries: int = LLM_MAX_RETRIES,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        sleep=time.sleep,
+    ):
+        self.bucket = bucket or TokenBucket()
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self._sleep = sleep
+
+    def _acquire(self) -> None:
+        started = time.perf_counter()
+        if not self.bucket.acquire(self.queue_timeout):
+            FAST_FAILS.inc(reason="rate_limit")
+            raise LLMUnavailableError("fila do LLM cheia (limite de taxa)")
+        remaining = max(0.0, self.queue_timeout - (time.perf_counter() - started))
+        if not self.slots.acquire(timeout=remaining):
+            FAST_FAILS.inc(reason="concurrency")
+            raise LLMUnavailableError("fila do LLM cheia (limite de concorrência)")
+        QUEUE_SECONDS.observe(time.perf_counter() - started)
+
+    def attempts(self) -> Iterator[int]:
+        """Índices das tentativas permitidas (a primeira mais `max_retries`)."""
+        return iter(range(self.max_retries + 1))
+
+    def before_attempt(self) -> None:
+        try:
+            self.breaker.before_call()
+        except LLMUnavailableError:
+            FAST_FAILS.inc(reason="circuit_open")
+            raise
+        try:
+            self._acquire()
+        except LLMUnavailableError:
+            self.breaker.release_probe()
+            raise
+
+    def after_attempt(self, error: Optional[BaseException], attempt: int) -> bool:
+        """Libera a vaga e registra o resultado. True se deve tentar de novo."""
+        self.slots.release()
+        if error is None:
+            self.breaker.record_success()
+            return False
+        if not is_retryable(error):
+            # erro do pedido (ex.: 400), não da disponibilidade da API
+            self.breaker.release_probe()
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+            return False
+        delay = backoff_delay(attempt, error)
+        status = _status_code(error)
+        RETRIES.inc(reason=str(status) if status else type(error).__name__)
+        logger.warning("LLM: %s; nova tentativa %d em %.1fs", error, attempt + 1, delay)
+        self._sleep(delay)
+        return True
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in self.attempts():
+            self.before_attempt()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self.after_attempt(e, attempt):
+                    raise
+                continue
+            self.after_attempt(None, attempt)
+            return result
+
+class ResilientChatModel(BaseChatModel):
+    """Chat model que delega ao `inner` passando por um `LLMGuard`."""
+
+    inner: BaseChatModel
+    guard: Any = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if self.guard is None:
+            self.guard = LLMGuard()
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self):
+        # o modelo interno identifica a chamada (chave do cache de respostas)
+        return self.inner._identifying_params
+
+    def _should_stream(self, *, async_api: bool, run_manager=None, **kwargs: Any) -> bool:
+        if type(self.inner)._stream is BaseChatModel._stream:
+            return False  # modelo interno sem streaming (ex.: modelos falsos)
+        return super()._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+    def bind_tools(self, tools, **kwargs: Any):
+        # o modelo interno formata as ferramentas; as chamadas continuam passando pelo wrapper
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    @staticmethod
+    def _announce_call(run_manager: Optional[CallbackManagerForLLMRun]) -> None:
+        """Avisa os callbacks de que esta chamada vai à API (não veio do cache)."""
+        if run_manager is None:
+            return
+        handle_event(
+            run_manager.handlers, "on_custom_event", "ignore_custom_event",
+            PROVIDER_CALL_EVENT, {}, run_id=run_manager.run_id, tags=run_manager.tags, metadata=run_manager.metadata,
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._announce_call(run_manager)
+        return self.guard.call(self.inner._generate, messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._announce_call(run_manager)
+        # só repete enquanto nenhum token foi entregue; depois disso o erro sobe
+        for attempt in self.guard.attempts():
+            self.guard.before_attempt()
+            started = False
+            try:
+                for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    self.guard.after_attempt(e, self.guard.max_retries)
+                    raise
+                if not self.guard.after_attempt(e, attempt):
+                    raise
+                continue
+            except BaseException:
+                # gerador fechado pelo consumidor (ex.: cliente desconectou)
+                self.guard.slots.release()
+                self.guard.breaker.release_probe()
+                raise
+            self.guard.after_attempt(None, attempt)
+            return
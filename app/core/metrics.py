@@ -0,0 +1,189 @@
+"""
+Métricas leves do pipeline (contadores e histogramas em memória).
+
+Cada etapa — chamadas ao LLM, handoffs entre agentes, coleta no arXiv/Tavily,
+NLP, embeddings, validação e gravação no Chroma — registra sua duração com
+`timed(stage, items)`. O endpoint /metrics expõe tudo no formato texto do
+Prometheus. Com SAPIEN_TRACE=1, cada requisição de chat guarda também a lista
+das etapas executadas (ver `start_trace`/`finish_trace`), gravada em
+SAPIEN_TRACE_DIR quando definido.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENABLED = os.getenv("SAPIEN_TRACE", "0") == "1"
+TRACE_DIR = os.getenv("SAPIEN_TRACE_DIR", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # por rótulo: [contagens por bucket (não cumulativas)..., +Inf], soma, total
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {n}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registro único do processo
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram("sapien_stage_seconds", "Duração de cada etapa do pipeline.", ["stage"])
+STAGE_ITEMS = metrics.counter("sapien_stage_items_total", "Itens processados por etapa.", ["stage"])
+STAGE_ERRORS = metrics.counter("sapien_stage_errors_total", "Etapas que terminaram com exceção.", ["stage"])
+
+# --- traces por requisição ---
+_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar("sapien_trace", default=None)
+
+def start_trace(name: str, **attrs: Any) -> Optional[Dict[str, Any]]:
+    """Abre um trace para a requisição atual (no-op se SAPIEN_TRACE != 1)."""
+    if not TRACE_ENABLED:
+        return None
+    trace = {"trace_id": uuid.uuid4().hex[:12], "name": name, "started_at": time.time(), "spans": [], **attrs}
+    _trace.set(trace)
+    return trace
+
+def finish_trace() -> Optional[Dict[str, Any]]:
+    """Fecha o trace atual e grava em SAPIEN_TRACE_DIR, se configurado."""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    _trace.set(None)
+    trace["seconds"] = round(time.time() - trace["started_at"], 6)
+    if TRACE_DIR:
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"{trace['trace_id']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning("não foi possível gravar o trace %s: %s", trace["trace_id"], e)
+    logger.debug("trace %s: %s", trace["trace_id"], trace["spans"])
+    return trace
+
+def record(stage: str, seconds: float, items: int = 1, error: bool = False, **attrs: Any) -> None:
+    """Registra a duração de uma etapa já medida."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if items:
+        STAGE_ITEMS.inc(items, stage=stage)
+    if error:
+        STAGE_ERRORS.inc(stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        span = {"stage": stage, "seconds": round(seconds, 6), "items": items, **attrs}
+        if error:
+            span["error"] = True
+        trace["spans"].append(span)
+
+@contextmanager
+def timed(stage: str, items: int = 1, **attrs: Any):
+    """
+    Mede o bloco e registra em `sapien_stage_seconds{stage=...}`. O dicionário
+    produzido permite ajustar `items` quando a quantidade só é conhecida no fim.
+    """
+    span = {"items": items}
+    start = time.perf_counter()
+    error = False
+    try:
+        yield span
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(stage, time.perf_counter() - start, span["items"], error, **attrs)
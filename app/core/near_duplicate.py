@@ -0,0 +1,163 @@
+"""
+Detecção de quase-duplicatas com MinHash + LSH.
+
+Cada conteúdo vira uma assinatura MinHash sobre shingles de 3 palavras; as
+assinaturas são divididas em bandas e cada banda vira um bucket (LSH), de
+modo que a busca por candidatos é uma consulta indexada. Candidatos são
+confirmados pela Jaccard estimada. Assinaturas e buckets ficam no mesmo
+SQLite do índice de deduplicação e são lidos do disco a cada consulta: a
+memória não cresce com o acervo e o que outro worker grava já aparece na
+consulta seguinte.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.dedup_index import DEDUP_DB_PATH
+from app.core.registry import registry
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+JACCARD_THRESHOLD = float(os.getenv("SAPIEN_NEAR_DUP_THRESHOLD", "0.8"))
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WORD = re.compile(r"\w+")
+
+def _lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Escolhe (bandas, linhas) com o maior limiar LSH (1/b)^(1/r) que não passe
+    do desejado: favorece a revocação, já que os candidatos são confirmados depois.
+    """
+    options = []
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows == 0:
+            bands = num_perm // rows
+            options.append(((1 / bands) ** (1 / rows), bands, rows))
+    below = [o for o in options if o[0] <= threshold]
+    _, bands, rows = max(below) if below else min(options)
+    return bands, rows
+
+class NearDuplicateIndex:
+    """Índice LSH de assinaturas MinHash em SQLite, indexado por content_hash."""
+
+    def __init__(self, path: str = DEDUP_DB_PATH, threshold: float = JACCARD_THRESHOLD, num_perm: int = NUM_PERM, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _lsh_params(num_perm, threshold)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm).astype(np.uint64)
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS minhash (content_hash TEXT PRIMARY KEY, signature BLOB NOT NULL)"
+        )
+        has_buckets = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'minhash_bucket'"
+        ).fetchone() is not None
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS minhash_bucket ("
+            " bucket INTEGER NOT NULL, content_hash TEXT NOT NULL, PRIMARY KEY (bucket, content_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        if not has_buckets:
+            self._index_stored()
+
+    def _index_stored(self) -> None:
+        """Gera os buckets das assinaturas gravadas antes da tabela de buckets existir."""
+        rows = self._conn.execute("SELECT content_hash, signature FROM minhash").fetchall()
+        stored = [(h, np.frombuffer(blob, dtype=np.uint32)) for h, blob in rows]
+        self._write_buckets([(h, sig) for h, sig in stored if len(sig) == self.num_perm])
+        self._conn.commit()
+
+    def signature(self, text: str) -> np.ndarray:
+        """Assinatura MinHash dos shingles de palavras do texto."""
+        words = _WORD.findall(text.lower())
+        if len(words) >= SHINGLE_SIZE:
+            shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+        else:
+            shingles = {" ".join(words)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+        ) % _MERSENNE_PRIME
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """Um bucket por banda: hash de 64 bits do número da banda e das suas linhas."""
+        signature = signature.astype(np.uint32)
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    band.to_bytes(2, "little") + signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                    digest_size=8,
+                ).digest(),
+                "little", signed=True,
+            )
+            for band in range(self.bands)
+        ]
+
+    def _write_buckets(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO minhash_bucket (bucket, content_hash) VALUES (?, ?)",
+            [(bucket, h) for h, sig in items for bucket in self._buckets(sig)],
+        )
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Retorna (content_hash, jaccard estimada) do conteúdo mais parecido acima do limiar."""
+        buckets = self._buckets(signature)
+        placeholders = ",".join("?" * len(buckets))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content_hash, signature FROM minhash WHERE content_hash IN"
+                f" (SELECT content_hash FROM minhash_bucket WHERE bucket IN ({placeholders}))",
+                buckets,
+            ).fetchall()
+        best = None
+        for content_hash, blob in rows:
+            stored = np.frombuffer(blob, dtype=np.uint32)
+            if len(stored) != self.num_perm:
+                continue
+            jaccard = float(np.mean(stored == signature))
+            if jaccard >= self.threshold and (best is None or jaccard > best[1]):
+                best = (content_hash, jaccard)
+        return best
+
+    def add_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        """Registra (content_hash, assinatura) numa única transação."""
+        items = list({h: sig for h, sig in items if h}.items())
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO minhash (content_hash, signature) VALUES (?, ?)",
+                [(h, sig.astype(np.uint32).tobytes()) for h, sig in items],
+            )
+            self._write_buckets(items)
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM minhash").fetchone()[0]
+
+# Instância única do processo, aberta no primeiro uso (ver registry)
+registry.register("near_duplicate_index", NearDuplicateIndex)
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    return registry.get("near_duplicate_index")
+
+def __getattr__(name):
+    # compatibilidade: `from app.core.near_duplicate import near_duplicate_index`
+    if name == "near_duplicate_index":
+        return get_near_duplicate_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,69 @@
+"""
+Contexto por execução do pipeline NLP -> Validação -> ChromaDB.
+
+Substitui o antigo slot global `_current_processed_data`: cada execução do
+NLP cria um PipelineContext próprio, guardado numa ContextVar (isolada por
+thread/tarefa) e num registro limitado indexado por `pipeline_id`, para que
+as etapas seguintes, mesmo chamadas em outra thread por um agente, recebam
+exatamente o registro que lhes pertence.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+MAX_OPEN_CONTEXTS = 256
+
+class PipelineContext:
+    """Registro processado de uma execução do pipeline."""
+
+    __slots__ = ("pipeline_id", "processed_data")
+
+    def __init__(self, processed_data: Dict[str, Any], pipeline_id: Optional[str] = None):
+        self.pipeline_id = pipeline_id or uuid.uuid4().hex[:12]
+        self.processed_data = processed_data
+
+_current: ContextVar[Optional[PipelineContext]] = ContextVar("sapien_pipeline_context", default=None)
+_registry: "OrderedDict[str, PipelineContext]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+def open_context(processed_data: Dict[str, Any]) -> PipelineContext:
+    """Cria o contexto de uma execução e o torna o atual neste fluxo de execução."""
+    ctx = PipelineContext(processed_data)
+    with _registry_lock:
+        _registry[ctx.pipeline_id] = ctx
+        while len(_registry) > MAX_OPEN_CONTEXTS:
+            _registry.popitem(last=False)
+    _current.set(ctx)
+    return ctx
+
+def get_context(pipeline_id: Optional[str] = None) -> Optional[PipelineContext]:
+    """Busca o contexto pelo id ou, sem id, o atual deste fluxo de execução."""
+    if pipeline_id:
+        with _registry_lock:
+            return _registry.get(pipeline_id)
+    return _current.get()
+
+def close_context(pipeline_id: Optional[str] = None) -> None:
+    """Descarta o contexto (pelo id ou o atual)."""
+    ctx = get_context(pipeline_id)
+    if ctx is None:
+        return
+    with _registry_lock:
+        _registry.pop(ctx.pipeline_id, None)
+    if _current.get() is ctx:
+        _current.set(None)
+
+def resolve_processed_data(
+    processed_data: Optional[Dict[str, Any]] = None,
+    pipeline_id: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Registro que uma etapa deve usar: o explícito, o do `pipeline_id`
+    ou o do contexto atual, nessa ordem.
+    """
+    if processed_data:
+        return processed_data
+    ctx = get_context(pipeline_id)
+    return ctx.processed_data if ctx else None
@@ -0,0 +1,53 @@
+"""
+Trava de arquivo entre processos (flock), usada quando o app roda com vários
+workers: garante um único dono para recursos do processo, como o scheduler
+e cada journal do buffer de escrita. A trava some junto com o processo, então
+um worker que caiu não deixa o recurso preso.
+"""
+import os
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem gunicorn, há um único processo servindo
+    fcntl = None
+
+class ProcessLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[object] = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Tenta obter a trava sem bloquear. True se este processo é o dono."""
+        with self._lock:
+            if self._file is not None:
+                return True
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            f = open(self.path, "a+")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    f.close()
+                    return False
+            f.seek(0)
+            f.truncate()
+            f.write(str(os.getpid()))
+            f.flush()
+            self._file = f
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,92 @@
+"""
+Registro de serviços com inicialização preguiçosa.
+
+LLM, modelo de embeddings, vectorstore, scheduler e grafo de agentes são
+caros de construir; cada um é registrado com uma fábrica e só é criado no
+primeiro uso (ou no aquecimento em segundo plano), uma única vez por
+processo, mesmo com várias threads pedindo ao mesmo tempo.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyService:
+    """Valor construído sob demanda, no máximo uma vez."""
+
+    __slots__ = ("name", "_factory", "_value", "_lock", "_built", "build_seconds")
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+        self._built = False
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def get(self) -> Any:
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                started = time.perf_counter()
+                self._value = self._factory()
+                self.build_seconds = time.perf_counter() - started
+                self._built = True
+                logger.info("'%s' inicializado em %.2fs", self.name, self.build_seconds)
+        return self._value
+
+class ServiceRegistry:
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyService:
+        """Registra uma fábrica; registrar o mesmo nome de novo mantém a primeira."""
+        with self._lock:
+            if name not in self._services:
+                self._services[name] = LazyService(name, factory)
+            return self._services[name]
+
+    def get(self, name: str) -> Any:
+        try:
+            service = self._services[name]
+        except KeyError:
+            raise KeyError(f"Serviço '{name}' não registrado.") from None
+        return service.get()
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> None:
+        """Constrói os serviços indicados (ou todos os registrados)."""
+        for name in list(names) if names is not None else list(self._services):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning("falha ao aquecer '%s': %s", name, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {"ready": service.ready, "build_seconds": service.build_seconds}
+            for name, service in self._services.items()
+        }
+
+# Registro único do processo
+registry = ServiceRegistry()
+
+def _warm_all() -> None:
+    # os imports registram as fábricas; ficam aqui para não pesar no import do app
+    import app.core.vectorestore  # noqa: F401
+    import app.core.services  # noqa: F401
+
+    registry.warm(["embeddings", "vectorstore", "llm", "graph"])
+
+def warm_in_background() -> threading.Thread:
+    """Aquece os serviços numa thread daemon, sem atrasar a subida do servidor."""
+    thread = threading.Thread(target=_warm_all, name="service-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,291 @@
+"""
+Camada de execução das pesquisas agendadas.
+
+Os jobs do APScheduler apenas enfileiram a pesquisa numa fila limitada.
+Um despachante agrupa os pedidos que chegam na mesma janela, busca todos
+os tópicos em paralelo e envia os artigos novos ao pipeline de ingestão num
+único lote. Por padrão (SAPIEN_RESEARCH_POOL=async) as buscas do lote rodam
+juntas no coletor assíncrono (conexões reaproveitadas, limite por host,
+novas tentativas); `thread` e `process` usam um pool com o cliente síncrono. Pedidos de um tópico que já
+está na fila são coalescidos, e com a fila cheia o tick é descartado
+(backpressure) em vez de acumular trabalho atrasado.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.tools.arxiv_client import ARXIV_API_URL, ArxivFetchError, fetch_arxiv_documents
+from app.core.arxiv_cursor import arxiv_cursors
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.getenv("SAPIEN_RESEARCH_QUEUE_SIZE", "100"))
+FETCH_WORKERS = int(os.getenv("SAPIEN_RESEARCH_WORKERS", "8"))
+POOL_KIND = os.getenv("SAPIEN_RESEARCH_POOL", "async")  # async | thread | process
+BATCH_WINDOW = float(os.getenv("SAPIEN_RESEARCH_BATCH_WINDOW", "0.5"))
+MAX_BATCH_TOPICS = int(os.getenv("SAPIEN_RESEARCH_MAX_BATCH", "50"))
+
+class ResearchRequest:
+    """Pedido de pesquisa de um tópico, criado a cada tick do scheduler."""
+
+    __slots__ = ("topic", "max_results", "on_result", "incremental", "enqueued_at")
+
+    def __init__(self, topic: str, max_results: int, on_result: Callable[[str, str], None], incremental: bool = True):
+        self.topic = topic
+        self.max_results = max_results
+        self.on_result = on_result
+        self.incremental = incremental
+        self.enqueued_at = time.monotonic()
+
+class ResearchQueue:
+    """Fila limitada + despachante que processa tópicos em lotes."""
+
+    def __init__(
+        self,
+        max_size: int = QUEUE_SIZE,
+        workers: int = FETCH_WORKERS,
+        pool_kind: str = POOL_KIND,
+        batch_window: float = BATCH_WINDOW,
+        max_batch: int = MAX_BATCH_TOPICS,
+        arxiv_url: str = ARXIV_API_URL,
+    ):
+        self._queue: "queue.Queue[ResearchRequest]" = queue.Queue(maxsize=max_size)
+        self._pending_topics = set()
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._pool_kind = pool_kind
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._arxiv_url = arxiv_url
+        self._pool = None
+        # modo async: event loop e coletor do despachante
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collector = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "processed": 0,
+            "failed": 0,
+            "batches": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._dispatcher is not None:
+            return
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            if self._pool_kind != "async":
+                pool_cls = ProcessPoolExecutor if self._pool_kind == "process" else ThreadPoolExecutor
+                self._pool = pool_cls(max_workers=self._workers)
+            self._dispatcher = threading.Thread(target=self._run, name="research-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def submit(self, topic: str, max_results: int, on_result: Callable[[str, str], None], incremental: bool = True) -> bool:
+        """
+        Enfileira uma pesquisa. Retorna False se o pedido foi coalescido com
+        um já pendente do mesmo tópico ou descartado por fila cheia.
+
+        Com `incremental`, só são buscados artigos mais novos que o cursor
+        persistido do tópico.
+        """
+        self._ensure_started()
+        with self._lock:
+            if topic in self._pending_topics:
+                self._stats["coalesced"] += 1
+                return False
+            try:
+                self._queue.put_nowait(ResearchRequest(topic, max_results, on_result, incremental))
+            except queue.Full:
+                self._stats["dropped"] += 1
+                return False
+            self._pending_topics.add(topic)
+            self._stats["submitted"] += 1
+            return True
+
+    def _next_batch(self) -> List[ResearchRequest]:
+        try:
+            first = self._queue.get(timeout=1.0)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self._batch_window
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        with self._lock:
+            for request in batch:
+                self._pending_topics.discard(request.topic)
+        return batch
+
+    def _run(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                batch = self._next_batch()
+                if batch:
+                    try:
+                        self._process(batch)
+                    except Exception as e:
+                        logger.exception("erro no lote de pesquisas: %s", e)
+        finally:
+            self._close_collector()
+
+    # --- busca ---
+    def _async_collector(self):
+        """Coletor assíncrono do despachante, criado na primeira busca."""
+        if self._collector is None:
+            from app.core.tools.async_collector import AsyncCollector, CollectorConfig
+
+            self._loop = asyncio.new_event_loop()
+            collector = AsyncCollector(
+                CollectorConfig(total_connections=self._workers * 2, per_host_limit=self._workers),
+                arxiv_url=self._arxiv_url,
+            )
+            self._loop.run_until_complete(collector.__aenter__())
+            self._collector = collector
+        return self._collector
+
+    def _close_collector(self) -> None:
+        if self._collector is not None:
+            self._loop.run_until_complete(self._collector.__aexit__(None, None, None))
+            self._collector = None
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def _fetch_all(self, batch: List[ResearchRequest]) -> List[Any]:
+        """
+        Busca os tópicos do lote em paralelo, sem passar pelo cache de buscas
+        (cada tick procura artigos novos). Cada item é a lista de documentos
+        do pedido correspondente ou a exceção da busca.
+        """
+        params = [
+            arxiv_cursors.request_params(r.topic, r.max_results) if r.incremental else {"max_results": r.max_results}
+            for r in batch
+        ]
+        if self._pool_kind == "async":
+            collector = self._async_collector()
+
+            async def fetch_batch():
+                return await asyncio.gather(
+                    *(collector.fetch_arxiv(r.topic, use_cache=False, **p) for r, p in zip(batch, params)),
+                    return_exceptions=True,
+                )
+
+            return self._loop.run_until_complete(fetch_batch())
+
+        futures = [self._pool.submit(fetch_arxiv_documents, r.topic, **p) for r, p in zip(batch, params)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _process(self, batch: List[ResearchRequest]) -> None:
+        # importado aqui para que processos de trabalho não carreguem o pipeline
+        from app.core.tools.simple_arxiv_search import filter_new_arxiv_documents, format_arxiv_outcomes, ARXIV_SIMILARITY_THRESHOLD
+        from app.core.tools.ingest_pipeline import ingest_documents
+
+        summaries: Dict[int, str] = {}
+        per_request_docs: Dict[int, List[Dict[str, Any]]] = {}
+        # artigos novos de cada pedido incremental; o cursor avança depois do armazenamento
+        cursor_entries: Dict[int, List[Dict[str, Any]]] = {}
+        for i, (request, entries) in enumerate(zip(batch, self._fetch_all(batch))):
+            if isinstance(entries, ArxivFetchError):
+                summaries[i] = f"Erro ao acessar arXiv: {entries.status_code}"
+                continue
+            if isinstance(entries, BaseException):
+                summaries[i] = f"Erro ao acessar arXiv: {str(entries)}"
+                continue
+            if request.incremental:
+                entries = arxiv_cursors.new_entries(request.topic, entries)
+                cursor_entries[i] = entries
+                if not entries:
+                    summaries[i] = "Nenhum artigo novo desde a última busca."
+                    continue
+            if not entries:
+                summaries[i] = "Nenhum artigo encontrado no arXiv."
+                continue
+            per_request_docs[i] = filter_new_arxiv_documents(entries)
+
+        # Um único lote de ingestão para todos os tópicos da janela
+        all_docs = [doc for i in sorted(per_request_docs) for doc in per_request_docs[i]]
+        try:
+            outcomes = ingest_documents(all_docs, source_type="arxiv", similarity_threshold=ARXIV_SIMILARITY_THRESHOLD)
+            error = None
+        except Exception as e:
+            outcomes, error = [], str(e)
+
+        offset = 0
+        failed_links = set()
+        for i in sorted(per_request_docs):
+            docs = per_request_docs[i]
+            doc_outcomes = outcomes[offset:offset + len(docs)]
+            summaries[i] = format_arxiv_outcomes(docs, doc_outcomes, error=error)
+            offset += len(docs)
+            if error is not None:
+                failed_links.update(doc["metadata"]["link"] for doc in docs)
+            else:
+                failed_links.update(
+                    doc["metadata"]["link"] for doc, o in zip(docs, doc_outcomes) if o.status == "error"
+                )
+
+        for i, entries in cursor_entries.items():
+            try:
+                arxiv_cursors.advance(batch[i].topic, entries, failed_links)
+            except Exception as e:
+                logger.warning("falha ao gravar o cursor de '%s': %s", batch[i].topic, e)
+
+        now = time.monotonic()
+        with self._lock:
+            self._stats["batches"] += 1
+        for i, request in enumerate(batch):
+            latency = now - request.enqueued_at
+            with self._lock:
+                self._stats["processed"] += 1
+                if summaries[i].startswith("Erro"):
+                    self._stats["failed"] += 1
+                self._stats["total_latency"] += latency
+                self._stats["max_latency"] = max(self._stats["max_latency"], latency)
+            try:
+                request.on_result(request.topic, summaries[i])
+            except Exception as e:
+                logger.exception("erro ao publicar resultado de '%s': %s", request.topic, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Vazão e latência (enfileiramento -> resultado) das pesquisas agendadas."""
+        with self._lock:
+            stats = dict(self._stats)
+        processed = stats.pop("total_latency")
+        stats["avg_latency"] = processed / stats["processed"] if stats["processed"] else 0.0
+        stats["queue_size"] = self._queue.qsize()
+        stats["pool"] = self._pool_kind
+        stats["workers"] = self._workers
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stopping.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5 if wait else 0)
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+# Fila única do processo
+research_queue = ResearchQueue()
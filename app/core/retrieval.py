@@ -0,0 +1,172 @@
+"""
+Consulta à coleção artigos_cientificos do ChromaDB.
+
+Busca top-k por similaridade com filtros de metadados (fonte, ano, autores)
+e re-ranqueamento MMR. Os resultados ficam num cache LRU com TTL que é
+invalidado sempre que novos documentos são gravados.
+
+A consulta não descarrega o buffer de escrita: chunks recém-coletados
+aparecem na busca depois da próxima descarga (no máximo
+SAPIEN_WRITE_BUFFER_DELAY segundos), e a descarga invalida o cache.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain.schema import Document
+
+from app.core.vectorestore import get_vectorstore
+from app.core.write_buffer import write_buffer
+
+CACHE_SIZE = int(os.getenv("SAPIEN_QUERY_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("SAPIEN_QUERY_CACHE_TTL", "600"))
+
+class QueryResultCache:
+    """
+    Cache LRU com TTL; `invalidate` descarta tudo o que foi calculado antes.
+    Resultados calculados antes de uma invalidação (consulta em andamento
+    durante a descarga) não são guardados: `put` recebe a `generation` lida
+    antes da consulta.
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def get(self, key: tuple) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: List[Document], generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+query_cache = QueryResultCache()
+
+def invalidate_query_cache() -> None:
+    """Chamado após gravações no vectorstore."""
+    query_cache.invalidate()
+
+write_buffer.add_listener(invalidate_query_cache)
+
+def _build_filter(source: Optional[str], year: Optional[str]) -> Optional[Dict[str, Any]]:
+    conditions = []
+    if source:
+        conditions.append({"source": {"$eq": source}})
+    if year:
+        conditions.append({"year": {"$eq": str(year)}})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def search_articles(
+    query: str,
+    k: int = 5,
+    source: Optional[str] = None,
+    year: Optional[str] = None,
+    authors: Optional[str] = None,
+    use_mmr: bool = True,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+) -> List[Document]:
+    """
+    Busca documentos armazenados semelhantes à consulta.
+
+    Args:
+        query: consulta em linguagem natural
+        k: número máximo de documentos distintos retornados
+        source: filtra pela fonte (arxiv, web_search)
+        year: filtra pelo ano de publicação
+        authors: filtra por trecho do nome de um autor (sem diferenciar maiúsculas)
+        use_mmr: re-ranqueia com Maximal Marginal Relevance
+        fetch_k: candidatos considerados pelo MMR
+        lambda_mult: equilíbrio relevância/diversidade do MMR
+
+    Returns:
+        list: documentos, no máximo um chunk por conteúdo armazenado.
+    """
+    key = (" ".join(query.lower().split()), k, source, str(year) if year else None,
+           authors.lower() if authors else None, use_mmr, fetch_k, lambda_mult)
+    generation = query_cache.generation
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    where = _build_filter(source, year)
+    # Autores não podem ser filtrados por substring no Chroma: busca mais e filtra aqui
+    n = k * 4 if authors else k * 2
+    if use_mmr:
+        docs = get_vectorstore().max_marginal_relevance_search(
+            query, k=n, fetch_k=max(fetch_k, n), lambda_mult=lambda_mult, filter=where
+        )
+    else:
+        docs = get_vectorstore().similarity_search(query, k=n, filter=where)
+
+    results = []
+    seen = set()
+    for doc in docs:
+        meta = doc.metadata or {}
+        if authors and authors.lower() not in str(meta.get("authors", "")).lower():
+            continue
+        content_hash = meta.get("content_hash") or doc.page_content
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        results.append(doc)
+        if len(results) >= k:
+            break
+
+    query_cache.put(key, results, generation)
+    return results
+
+def format_results(docs: List[Document], snippet_chars: int = 300) -> str:
+    """Resumo textual dos documentos encontrados."""
+    if not docs:
+        return "Nenhum artigo relevante encontrado na base local."
+
+    lines = []
+    for doc in docs:
+        meta = doc.metadata or {}
+        title = meta.get("title", "Sem título")
+        year = meta.get("year")
+        header = f"📚 {title} ({year})" if year else f"📚 {title}"
+        if meta.get("authors"):
+            header += f" - {meta['authors']}"
+        link = meta.get("link") or meta.get("url")
+        if link:
+            header += f"\n   {link}"
+        snippet = doc.page_content[:snippet_chars]
+        if len(doc.page_content) > snippet_chars:
+            snippet += "..."
+        lines.append(f"{header}\n   {snippet}")
+    return "Artigos encontrados na base local:\n\n" + "\n\n".join(lines)
@@ -0,0 +1,97 @@
+"""
+Roteador rápido executado antes do supervisor LangGraph.
+
+Comandos com gramática fixa (agendamento, cancelamento, busca direta no
+arXiv/web e consulta à base local) são reconhecidos por expressões regulares
+e despachados diretamente para as ferramentas, sem chamadas ao LLM. Qualquer
+outra entrada segue para o supervisor.
+"""
+import re
+from typing import Callable, List, Optional, Tuple
+
+from .tools.sheduler_tools import (
+    SCHEDULE_PATTERN,
+    schedule_research,
+    cancel_research,
+    check_scheduler_results,
+)
+from .tools.simple_arxiv_search import arxiv_search_collect
+from .tools.web_search_with_flow import web_search_with_flow
+from .tools.search_local_articles import search_local_articles
+
+_VERB = r"(?:buscar|busque|busca|pesquisar|pesquise|procurar|procure)"
+
+ARXIV_PATTERN = re.compile(
+    rf"^\s*{_VERB}\s+(?:no|na)\s+arxiv\s*[:\-]\s*(?P<query>.+?)\s*$",
+    re.IGNORECASE
+)
+WEB_PATTERN = re.compile(
+    rf"^\s*{_VERB}\s+na\s+(?:web|internet)\s*[:\-]\s*(?P<query>.+?)\s*$",
+    re.IGNORECASE
+)
+LOCAL_PATTERN = re.compile(
+    r"^\s*(?:consultar|consulte|buscar|busque)\s+(?:na\s+)?base(?:\s+local)?\s*[:\-]\s*(?P<query>.+?)\s*$",
+    re.IGNORECASE
+)
+# Os padrões das ferramentas localizam o comando em qualquer ponto do texto
+# (o supervisor pode repassar a mensagem inteira); aqui a mensagem precisa ser
+# só o comando, para que frases que apenas o mencionam sigam ao supervisor.
+SCHEDULE_COMMAND = re.compile(rf"^\s*(?:{SCHEDULE_PATTERN.pattern})\s*[.!]?\s*$", re.IGNORECASE)
+CANCEL_COMMAND = re.compile(r"^\s*cancelar busca sobre (?P<tema>.+?)\s*[.!]?\s*$", re.IGNORECASE)
+RESULTS_PATTERN = re.compile(
+    r"^\s*(?:ver|verificar|mostrar)\s+resultados(?:\s+(?:das\s+)?(?:pesquisas|buscas)\s+agendadas)?\s*[.!?]?\s*$",
+    re.IGNORECASE
+)
+
+def _schedule(text: str, m: re.Match) -> str:
+    return schedule_research.invoke({"mensagem": text})
+
+def _cancel(text: str, m: re.Match) -> str:
+    # sem a pontuação final, que faria parte do tema
+    return cancel_research.invoke({"mensagem": f"cancelar busca sobre {m.group('tema')}"})
+
+def _results(text: str, m: re.Match) -> str:
+    return check_scheduler_results.invoke({})
+
+def _arxiv(text: str, m: re.Match) -> str:
+    return arxiv_search_collect(m.group("query"), 3)
+
+def _web(text: str, m: re.Match) -> str:
+    return web_search_with_flow.invoke({"query": m.group("query")})
+
+def _local(text: str, m: re.Match) -> str:
+    return search_local_articles.invoke({"query": m.group("query")})
+
+# Ordem importa: o primeiro padrão que casar é usado
+ROUTES: List[Tuple[str, re.Pattern, Callable[[str, re.Match], str]]] = [
+    ("schedule_research", SCHEDULE_COMMAND, _schedule),
+    ("cancel_research", CANCEL_COMMAND, _cancel),
+    ("check_scheduler_results", RESULTS_PATTERN, _results),
+    ("arxiv_search", ARXIV_PATTERN, _arxiv),
+    ("web_search", WEB_PATTERN, _web),
+    ("search_local_articles", LOCAL_PATTERN, _local),
+]
+
+def match_route(user_input: str) -> Optional[Tuple[str, Callable[[str, re.Match], str], re.Match]]:
+    """Retorna (nome, handler, match) da primeira rota que reconhece a entrada."""
+    for name, pattern, handler in ROUTES:
+        m = pattern.search(user_input)
+        if m:
+            return name, handler, m
+    return None
+
+def route(user_input: str) -> Optional[str]:
+    """
+    Executa a entrada pelo caminho rápido, se for um comando determinístico.
+
+    Returns:
+        str | None: resposta da ferramenta, ou None para seguir ao supervisor.
+    """
+    matched = match_route(user_input)
+    if matched is None:
+        return None
+    name, handler, m = matched
+    try:
+        return handler(user_input, m)
+    except Exception as e:
+        return f"❌ Erro ao executar {name}: {str(e)}"
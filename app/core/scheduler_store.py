@@ -0,0 +1,113 @@
+"""
+Agendamentos e resultados das pesquisas periódicas, compartilhados entre os
+workers do servidor.
+
+Só um processo roda o APScheduler (ver config._create_scheduler), mas
+qualquer worker pode receber o pedido de agendar, cancelar ou ver
+resultados. A tabela de agendamentos é a referência: o dono do scheduler
+cria os jobs pedidos em outros workers e remove os que sumiram dela
+(cancelados); os ticks gravam os resultados aqui, visíveis em todos.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.registry import registry
+
+SCHEDULER_DB_PATH = os.getenv("SAPIEN_SCHEDULER_DB", "./chroma_db/scheduler.sqlite3")
+
+class SchedulerStore:
+    """Tabelas de agendamentos (um por tópico) e de resultados em SQLite."""
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduled_jobs ("
+            " topic TEXT PRIMARY KEY, job_id TEXT NOT NULL,"
+            " interval_seconds INTEGER NOT NULL, ends_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduler_results ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    # --- agendamentos ---
+    def save_job(self, topic: str, job_id: str, interval_seconds: int, ends_at: float) -> Optional[str]:
+        """Grava o agendamento do tópico; devolve o job que ele substitui, se houver."""
+        with self._lock:
+            row = self._conn.execute("SELECT job_id FROM scheduled_jobs WHERE topic = ?", (topic,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scheduled_jobs (topic, job_id, interval_seconds, ends_at) VALUES (?, ?, ?, ?)",
+                (topic, job_id, interval_seconds, ends_at),
+            )
+            self._conn.commit()
+        return row[0] if row else None
+
+    def remove_job(self, topic: str, job_id: Optional[str] = None) -> Optional[str]:
+        """Remove o agendamento do tópico (só se for `job_id`, quando informado); devolve o job removido."""
+        with self._lock:
+            row = self._conn.execute("SELECT job_id FROM scheduled_jobs WHERE topic = ?", (topic,)).fetchone()
+            if row is None or (job_id is not None and row[0] != job_id):
+                return None
+            self._conn.execute("DELETE FROM scheduled_jobs WHERE topic = ?", (topic,))
+            self._conn.commit()
+        return row[0]
+
+    def has_job(self, job_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM scheduled_jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, job_id, interval_seconds, ends_at FROM scheduled_jobs"
+            ).fetchall()
+        return [
+            {"topic": topic, "job_id": job_id, "interval_seconds": interval, "ends_at": ends_at}
+            for topic, job_id, interval, ends_at in rows
+        ]
+
+    # --- resultados ---
+    def add_result(self, text: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT INTO scheduler_results (created, text) VALUES (?, ?)", (time.time(), text))
+            self._conn.commit()
+
+    def results(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT text FROM scheduler_results ORDER BY id")]
+
+    def take_results(self) -> List[str]:
+        """Lê e remove os resultados numa só transação (cada um é entregue uma vez)."""
+        with self._lock:
+            # trava de escrita já na leitura: dois workers não entregam o mesmo resultado
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute("SELECT id, text FROM scheduler_results ORDER BY id").fetchall()
+            if rows:
+                self._conn.execute("DELETE FROM scheduler_results WHERE id <= ?", (rows[-1][0],))
+            self._conn.commit()
+        return [text for _, text in rows]
+
+    def clear_results(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM scheduler_results")
+            self._conn.commit()
+
+# Instância única do processo (o arquivo é compartilhado pelos workers), aberta no primeiro uso
+registry.register("scheduler_store", SchedulerStore)
+
+def get_scheduler_store() -> SchedulerStore:
+    return registry.get("scheduler_store")
+
+def __getattr__(name):
+    # compatibilidade: `from app.core.scheduler_store import scheduler_store`
+    if name == "scheduler_store":
+        return get_scheduler_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
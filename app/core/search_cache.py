@@ -0,0 +1,234 @@
+"""
+Cache das buscas externas (arXiv e Tavily).
+
+A chave é (fonte, consulta normalizada, parâmetros de paginação/ordenação).
+As respostas ficam serializadas em JSON num LRU com TTL e, se
+SAPIEN_SEARCH_CACHE_DB estiver definido, também em SQLite, sobrevivendo a
+reinícios. Buscas idênticas simultâneas são coalescidas (single-flight): só
+a primeira vai à rede e as demais esperam o mesmo resultado, tanto entre
+threads quanto entre tarefas asyncio. Erros nunca são guardados.
+
+A função de busca é recebida como parâmetro, então o cache pode ser
+exercitado com um backend falso local.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_SIZE = int(os.getenv("SAPIEN_SEARCH_CACHE_SIZE", "512"))
+SEARCH_CACHE_TTL = float(os.getenv("SAPIEN_SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_DB = os.getenv("SAPIEN_SEARCH_CACHE_DB", "")
+SEARCH_CACHE_DISK_SIZE = int(os.getenv("SAPIEN_SEARCH_CACHE_DISK_SIZE", "10000"))
+
+CACHE_EVENTS = metrics.counter("sapien_search_cache_total", "Consultas ao cache de buscas externas.", ["source", "result"])
+
+def search_key(source: str, query: str, **params: Any) -> str:
+    """Chave estável: fonte, consulta normalizada e parâmetros não nulos ordenados."""
+    normalized = " ".join(str(query).lower().split())
+    extra = {k: v for k, v in sorted(params.items()) if v is not None}
+    return json.dumps([source, normalized, extra], ensure_ascii=False, separators=(",", ":"))
+
+class _Flight:
+    """Busca em andamento compartilhada pelas threads que pediram a mesma chave."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+class SearchResultCache:
+    def __init__(
+        self,
+        max_size: int = SEARCH_CACHE_SIZE,
+        ttl: float = SEARCH_CACHE_TTL,
+        path: Optional[str] = SEARCH_CACHE_DB or None,
+        max_disk_entries: int = SEARCH_CACHE_DISK_SIZE,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        # chave -> (instante em time.time(), JSON)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[Tuple[int, str], "asyncio.Future"] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+        self._conn = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY, created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS search_cache_created ON search_cache (created)")
+            self._conn.commit()
+
+    # --- armazenamento ---
+    def _get_locked(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT created, value FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[0] <= self.ttl:
+                self._put_memory_locked(key, row[0], row[1])
+                return row[1]
+        return None
+
+    def _put_memory_locked(self, key: str, created: float, value: str) -> None:
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _put_locked(self, key: str, value: str) -> None:
+        created = time.time()
+        self._put_memory_locked(key, created, value)
+        if self._conn is not None:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, created, value) VALUES (?, ?, ?)",
+                    (key, created, value),
+                )
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE created < ? OR key IN ("
+                    " SELECT key FROM search_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (created - self.ttl, self.max_disk_entries),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("falha ao persistir o cache de buscas: %s", e)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._get_locked(key)
+        return None if value is None else json.loads(value)
+
+    def put(self, key: str, value: Any) -> None:
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._put_locked(key, text)
+
+    def _count(self, source: str, result: str) -> None:
+        CACHE_EVENTS.inc(source=source, result=result)
+        with self._lock:
+            self._stats[{"hit": "hits", "miss": "misses", "coalesced": "coalesced"}[result]] += 1
+
+    # --- single-flight ---
+    def get_or_fetch(self, source: str, query: str, fetch: Callable[[], Any], **params: Any) -> Any:
+        """Devolve a resposta em cache ou executa `fetch` uma única vez para chamadas concorrentes."""
+        key = search_key(source, query, **params)
+        with self._lock:
+            value = self._get_locked(key)
+            flight = None
+            leader = False
+            if value is None:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    leader = True
+
+        if value is not None:
+            self._count(source, "hit")
+            return json.loads(value)
+
+        if not leader:
+            self._count(source, "coalesced")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return json.loads(flight.value)
+
+        self._count(source, "miss")
+        try:
+            flight.value = json.dumps(fetch(), ensure_ascii=False)
+            with self._lock:
+                self._put_locked(key, flight.value)
+            return json.loads(flight.value)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_fetch(self, source: str, query: str, fetch: Callable[[], Awaitable[Any]], **params: Any) -> Any:
+        """Versão asyncio de `get_or_fetch` (coalescimento por event loop)."""
+        key = search_key(source, query, **params)
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            value = self._get_locked(key)
+            future = None
+            leader = False
+            if value is None:
+                future = self._async_flights.get(flight_key)
+                if future is None:
+                    future = self._async_flights[flight_key] = loop.create_future()
+                    leader = True
+
+        if value is not None:
+            self._count(source, "hit")
+            return json.loads(value)
+
+        if not leader:
+            self._count(source, "coalesced")
+            return json.loads(await asyncio.shield(future))
+
+        self._count(source, "miss")
+        try:
+            text = json.dumps(await fetch(), ensure_ascii=False)
+            with self._lock:
+                self._put_locked(key, text)
+            future.set_result(text)
+            return json.loads(text)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # marca como consumida se ninguém estiver esperando
+            raise
+        finally:
+            with self._lock:
+                self._async_flights.pop(flight_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["max_size"] = self.max_size
+            stats["persistent"] = self._conn is not None
+        return stats
+
+# Cache único do processo
+search_cache = SearchResultCache()
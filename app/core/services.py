@@ -1,46 +1,193 @@
+import logging
+import time
 import uuid
 from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import BaseMessage
-from .agents import compiled_supervisor
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from .agents import get_compiled_supervisor
+from .registry import registry
+from .callbacks import MetricsCallbackHandler, LLMCallLimitHandler, LLMCallLimitExceeded
+from .llm_client import LLMUnavailableError
+from .llm_cache import LLMReplayMiss
+from .metrics import metrics, start_trace, finish_trace
+from .router import route
+from .checkpoint import create_checkpointer
 from typing_extensions import TypedDict
-from typing import Annotated
+from typing import Annotated, Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CHAT_REQUESTS = metrics.counter("sapien_chat_requests_total", "Mensagens de chat atendidas.", ["path"])
+CHAT_SECONDS = metrics.histogram("sapien_chat_seconds", "Tempo total de uma mensagem de chat.", ["path"])
+REQUEST_LLM_CALLS = metrics.histogram(
+    "sapien_chat_llm_calls", "Chamadas ao LLM por mensagem de chat.", buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24)
+)
+REQUEST_LLM_TOKENS = metrics.histogram(
+    "sapien_chat_llm_tokens", "Tokens (entrada + saída) por mensagem de chat.",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+)
 
 # --- GRAFO PRINCIPAL ---
 class StateSchema(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
-graph = StateGraph(StateSchema)
-graph.add_node("supervisor", compiled_supervisor)
-graph.add_edge(START, "supervisor")
-compiled = graph.compile(checkpointer=MemorySaver())
-
-def run(user_input: str):
-    thread_id = f"multiagent-{uuid.uuid4().hex[:8]}"
-    config = {"configurable": {"thread_id": thread_id}}
-    
-    candidate_responses = []
-
-    # processa o fluxo
-    for chunk in compiled.stream(
-        {"messages": [{"role": "user", "content": user_input}]},
-        config=config,
-        stream_mode="values"
-    ):
-        for msg in chunk.get("messages", []):
-            if isinstance(msg.content, str) and msg.content.strip():
-                # imprime todas as mensagens no terminal
-                print(msg.content)
-
-                # detecta mensagens que parecem ser respostas do agente
-                lower = msg.content.lower()
-                if not any(kw in lower for kw in [
-                    "transferred", "successfully", "❌", "erro"
-                ]) and len(msg.content.split()) > 5:  # ignora mensagens curtas de log
-                    candidate_responses.append(msg.content)
+checkpointer = create_checkpointer()
+
+def _build_graph(supervisor=None):
+    graph = StateGraph(StateSchema)
+    graph.add_node("supervisor", supervisor if supervisor is not None else get_compiled_supervisor())
+    graph.add_edge(START, "supervisor")
+    return graph.compile(checkpointer=checkpointer)
+
+registry.register("graph", _build_graph)
+
+def get_compiled():
+    """Grafo principal compilado, construído no primeiro uso."""
+    return registry.get("graph")
+
+# mensagens que são logs de handoff/erro e não respostas ao usuário
+_LOG_KEYWORDS = ["transferred", "successfully", "❌", "erro"]
+
+def _message_text(content: Any) -> str:
+    """Extrai o texto de um conteúdo de mensagem (string ou lista de blocos)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return ""
+
+def _is_candidate_response(text: str) -> bool:
+    """Detecta mensagens que parecem ser respostas do agente."""
+    lower = text.lower()
+    return not any(kw in lower for kw in _LOG_KEYWORDS) and len(text.split()) > 5  # ignora mensagens curtas de log
+
+def new_thread_id() -> str:
+    return f"multiagent-{uuid.uuid4().hex[:8]}"
+
+def stream_events(user_input: str, thread_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Executa o fluxo e produz apenas os eventos novos. Se `thread_id` for
+    informado, a conversa continua a partir do histórico dessa thread.
+    Comandos do roteador (app/core/router.py) são respondidos sem o grafo,
+    mas também entram no histórico.
+
+    Eventos:
+    - {"type": "token", "agent", "content"}: tokens do LLM
+    - {"type": "message", "agent", "role", "content", "tools"}: mensagens completas de agentes/ferramentas
+    - {"type": "final", "content", "thread_id"}: resposta final ao usuário (último evento)
+    """
+    thread_id = thread_id or new_thread_id()
+    started = time.perf_counter()
+    trace = start_trace("chat", thread_id=thread_id)
+    path = "graph"
+    try:
+        # comandos determinísticos não passam pelo supervisor (nem pelo LLM)
+        fast_response = route(user_input)
+        if fast_response is not None:
+            path = "fast"
+            _record_fast_turn(thread_id, user_input, fast_response)
+            yield {"type": "final", "content": fast_response, "thread_id": thread_id}
+            return
+
+        yield from _stream_graph(user_input, thread_id)
+    finally:
+        CHAT_REQUESTS.inc(path=path)
+        CHAT_SECONDS.observe(time.perf_counter() - started, path=path)
+        if trace is not None:
+            finish_trace()
+
+def _record_fast_turn(thread_id: str, user_input: str, response: str) -> None:
+    """
+    Grava o comando e a resposta no histórico da thread, sem executar nenhum
+    nó do grafo, para que a conversa seguinte os veja (ex.: "e quando
+    termina?" depois de agendar uma pesquisa).
+    """
+    try:
+        get_compiled().update_state(
+            {"configurable": {"thread_id": thread_id}},
+            {"messages": [HumanMessage(user_input), AIMessage(response, name="router")]},
+            as_node="supervisor",
+        )
+    except Exception as e:
+        # a resposta já foi produzida: o histórico é só contexto
+        logger.warning("thread %s: comando não gravado no histórico: %s", thread_id, e)
+
+def _stream_graph(user_input: str, thread_id: str) -> Iterator[Dict[str, Any]]:
+    usage = MetricsCallbackHandler()
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [usage, LLMCallLimitHandler()]}
+
+    seen_ids = set()
+    final_response = None
+
+    try:
+        for namespace, mode, chunk in get_compiled().stream(
+            {"messages": [{"role": "user", "content": user_input}]},
+            config=config,
+            stream_mode=["updates", "messages"],
+            subgraphs=True
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if isinstance(message, AIMessageChunk):
+                    text = _message_text(message.content)
+                    if text:
+                        agent = metadata.get("lc_agent_name") or metadata.get("langgraph_node")
+                        yield {"type": "token", "agent": agent, "content": text}
+                continue
+
+            # o nó externo repete o histórico produzido pelos subgrafos
+            if not namespace:
+                continue
+
+            for node, update in chunk.items():
+                if not isinstance(update, dict):
+                    continue
+                for msg in update.get("messages", []):
+                    if not isinstance(msg, BaseMessage):
+                        continue
+                    if msg.id is not None:
+                        if msg.id in seen_ids:
+                            continue
+                        seen_ids.add(msg.id)
+
+                    text = _message_text(msg.content)
+                    tools = [tc["name"] for tc in getattr(msg, "tool_calls", None) or []]
+                    if text.strip():
+                        logger.debug("[%s] %s", getattr(msg, "name", None) or node, text)
+                        if _is_candidate_response(text):
+                            final_response = text
+                    yield {
+                        "type": "message",
+                        "agent": getattr(msg, "name", None) or node,
+                        "role": msg.type,
+                        "content": text,
+                        "tools": tools,
+                    }
+    except LLMCallLimitExceeded as e:
+        logger.warning("thread %s: %s", thread_id, e)
+        if final_response is None:
+            final_response = f"⚠️ A solicitação foi interrompida: {e}. Tente uma pergunta mais específica."
+    except LLMUnavailableError as e:
+        logger.warning("thread %s: LLM indisponível: %s", thread_id, e)
+        if final_response is None:
+            final_response = "⚠️ O modelo está sobrecarregado no momento. Tente novamente em alguns segundos."
+    except LLMReplayMiss as e:
+        logger.warning("thread %s: %s", thread_id, e)
+        if final_response is None:
+            final_response = "⚠️ Modo replay: esta conversa não está gravada no cache do LLM."
+    finally:
+        REQUEST_LLM_CALLS.observe(usage.llm_calls)
+        REQUEST_LLM_TOKENS.observe(sum(usage.tokens.values()))
 
     # retorna a última mensagem “real” do agente
-    if candidate_responses:
-        return candidate_responses[-1]
-    return None
\ No newline at end of file
+    yield {"type": "final", "content": final_response, "thread_id": thread_id}
+
+def run(user_input: str, thread_id: Optional[str] = None) -> Optional[str]:
+    final_response = None
+    for event in stream_events(user_input, thread_id):
+        if event["type"] == "final":
+            final_response = event["content"]
+    return final_response
@@ -2,51 +2,78 @@
 Módulo para gerenciar estado compartilhado entre os agentes do pipeline.
 É uma forma de manter e rastrear informações enquanto um sistema de IA processa dados.
 """
-from typing import Dict, Any, Optional, Set
-
-# Estado global compartilhado
-_current_processed_data: Optional[Dict[str, Any]] = None
-_processed_content_hashes: Set[str] = set()
-_scheduler_results: list = []
-
-def set_current_processed_data(data: Dict[str, Any]) -> None:
-    """Define os dados processados atuais."""
-    global _current_processed_data
-    _current_processed_data = data
-    print(f"DEBUG: current_processed_data set: {data.get('content_hash', 'unknown')[:8]}")
-
-def get_current_processed_data() -> Optional[Dict[str, Any]]:
-    """Obtém os dados processados atuais."""
-    global _current_processed_data
-    print(f"DEBUG: get_current_processed_data: {_current_processed_data is not None}")
-    return _current_processed_data
-
-def clear_current_processed_data() -> None:
-    """Limpa os dados processados atuais."""
-    global _current_processed_data
-    _current_processed_data = None
+import logging
+from typing import Dict, Any, Optional, List
+import numpy as np
+from app.core.dedup_index import get_dedup_index, CONTENT_HASH, LINK
+from app.core.near_duplicate import get_near_duplicate_index
+from app.core.pipeline_context import open_context, get_context, close_context
+from app.core.scheduler_store import get_scheduler_store
+
+logger = logging.getLogger(__name__)
+
+def set_current_processed_data(data: Dict[str, Any]) -> str:
+    """Define os dados processados da execução atual e retorna o pipeline_id."""
+    ctx = open_context(data)
+    logger.debug("current_processed_data set: %s (pipeline %s)", data.get("content_hash", "unknown")[:8], ctx.pipeline_id)
+    return ctx.pipeline_id
+
+def get_current_processed_data(pipeline_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Obtém os dados processados da execução atual (ou da indicada por pipeline_id)."""
+    ctx = get_context(pipeline_id)
+    logger.debug("get_current_processed_data: %s", ctx is not None)
+    return ctx.processed_data if ctx else None
+
+def clear_current_processed_data(pipeline_id: Optional[str] = None) -> None:
+    """Limpa os dados processados da execução atual (ou da indicada por pipeline_id)."""
+    close_context(pipeline_id)
 
 def add_processed_hash(content_hash: str) -> None:
     """Adiciona um hash de conteúdo processado."""
-    global _processed_content_hashes
-    _processed_content_hashes.add(content_hash)
+    get_dedup_index().add(CONTENT_HASH, content_hash)
+
+def add_processed_hashes(content_hashes: List[str]) -> None:
+    """Adiciona vários hashes de conteúdo processados de uma vez."""
+    get_dedup_index().add_many(CONTENT_HASH, content_hashes)
+
+def add_stored_records(records: List[Dict[str, Any]], signatures: Optional[List[np.ndarray]] = None) -> None:
+    """
+    Registra nos índices de deduplicação (hash, link do arXiv e assinatura
+    MinHash) registros que já foram entregues ao armazenamento. Só é chamado
+    depois que a gravação no journal do buffer de escrita deu certo: um
+    documento rejeitado, com erro ou perdido numa queda pode ser coletado de novo.
+    """
+    if not records:
+        return
+    near_duplicate_index = get_near_duplicate_index()
+    signatures = [
+        sig if sig is not None else near_duplicate_index.signature(r["content"])
+        for r, sig in zip(records, signatures or [None] * len(records))
+    ]
+    get_dedup_index().add_many(CONTENT_HASH, [r["content_hash"] for r in records])
+    get_dedup_index().add_many(LINK, [r["metadata"].get("link") for r in records])
+    near_duplicate_index.add_many([(r["content_hash"], sig) for r, sig in zip(records, signatures)])
 
 def is_hash_processed(content_hash: str) -> bool:
     """Verifica se um hash já foi processado."""
-    global _processed_content_hashes
-    return content_hash in _processed_content_hashes
+    return get_dedup_index().contains(CONTENT_HASH, content_hash)
+
+def are_hashes_processed(content_hashes: List[str]) -> List[bool]:
+    """Verifica vários hashes de uma vez."""
+    return get_dedup_index().contains_many(CONTENT_HASH, content_hashes)
 
 def add_scheduler_result(result: str) -> None:
-    """Adiciona um resultado do scheduler."""
-    global _scheduler_results
-    _scheduler_results.append(result)
+    """Adiciona um resultado do scheduler (visível em todos os workers)."""
+    get_scheduler_store().add_result(result)
 
 def get_scheduler_results() -> list:
     """Obtém todos os resultados do scheduler."""
-    global _scheduler_results
-    return _scheduler_results.copy()
+    return get_scheduler_store().results()
+
+def take_scheduler_results() -> list:
+    """Obtém e remove os resultados do scheduler; cada um é entregue uma só vez."""
+    return get_scheduler_store().take_results()
 
 def clear_scheduler_results() -> None:
     """Limpa os resultados do scheduler."""
-    global _scheduler_results
-    _scheduler_results.clear()
+    get_scheduler_store().clear_results()
@@ -0,0 +1,226 @@
+"""
+Acesso HTTP à API do arXiv e conversão do feed Atom em documentos brutos.
+
+Módulo leve (sem dependências do pipeline), para poder ser usado também em
+processos de trabalho do scheduler.
+"""
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, IO, Iterator, List, Optional, Union
+import requests
+import xml.etree.ElementTree as ET
+
+from app.core.metrics import timed
+from app.core.search_cache import search_cache
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_TIMEOUT = 30
+
+# Sessão HTTP compartilhada (reaproveita conexões entre chamadas)
+_session = requests.Session()
+
+class ArxivFetchError(Exception):
+    """Resposta não-200 da API do arXiv."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Erro ao acessar arXiv: {status_code}")
+        self.status_code = status_code
+
+@dataclass
+class ArxivEntry:
+    """Registro compacto de uma entrada do feed Atom."""
+
+    __slots__ = ("link", "title", "summary", "published", "authors")
+
+    link: str
+    title: str
+    summary: str
+    published: str
+    authors: List[str]
+
+    def to_document(self, query: str) -> Dict[str, Any]:
+        """Documento bruto ({"raw_content", "metadata"}) para o pipeline de ingestão."""
+        meta = {
+            "title": self.title,
+            "authors": ", ".join(self.authors),
+            "year": self.published[:4],
+            "link": self.link,
+            "published": self.published,
+            "source": "arxiv",
+            # só registro da consulta de origem: a validação usa o título
+            # como tópico (ver extract_topic_from_metadata)
+            "search_query": query
+        }
+        return {"raw_content": self.summary, "metadata": meta}
+
+_ENTRY = f"{ATOM_NS}entry"
+_ID = f"{ATOM_NS}id"
+_TITLE = f"{ATOM_NS}title"
+_SUMMARY = f"{ATOM_NS}summary"
+_PUBLISHED = f"{ATOM_NS}published"
+_AUTHOR = f"{ATOM_NS}author"
+_NAME = f"{ATOM_NS}name"
+
+def _entry_from_element(elem: ET.Element) -> ArxivEntry:
+    fields = {_ID: "", _TITLE: "", _SUMMARY: "", _PUBLISHED: ""}
+    authors = []
+    for child in elem:
+        if child.tag in fields:
+            fields[child.tag] = (child.text or "").strip()
+        elif child.tag == _AUTHOR:
+            name = child.find(_NAME)
+            if name is not None and name.text:
+                authors.append(name.text.strip())
+    return ArxivEntry(
+        link=fields[_ID],
+        title=fields[_TITLE],
+        summary=fields[_SUMMARY],
+        published=fields[_PUBLISHED],
+        authors=authors,
+    )
+
+def iter_arxiv_entries(source: Union[IO[bytes], str]) -> Iterator[ArxivEntry]:
+    """
+    Lê o feed Atom de forma incremental (iterparse), produzindo uma
+    ArxivEntry por <entry> e descartando os elementos já consumidos.
+    """
+    root = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+        if event != "end" or elem.tag != _ENTRY:
+            continue
+        yield _entry_from_element(elem)
+        # libera a entrada (e a referência a ela na raiz)
+        elem.clear()
+        root.clear()
+
+class ArxivFeedParser:
+    """
+    Parser incremental alimentado com pedaços do corpo (XMLPullParser), para
+    respostas lidas de forma assíncrona: cada `feed` devolve os documentos
+    das entradas que se completaram com aquele pedaço.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        documents = []
+        for event, elem in self._parser.read_events():
+            if self._root is None:
+                self._root = elem
+                continue
+            if event != "end" or elem.tag != _ENTRY:
+                continue
+            documents.append(_entry_from_element(elem).to_document(self.query))
+            elem.clear()
+            self._root.clear()
+        return documents
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._parser.close()
+        return self._drain()
+
+def parse_arxiv_entries(content: bytes, query: str) -> List[Dict[str, Any]]:
+    """
+    Converte o feed Atom do arXiv em documentos brutos
+    ({"raw_content", "metadata"}) prontos para o pipeline de ingestão.
+    """
+    return [entry.to_document(query) for entry in iter_arxiv_entries(io.BytesIO(content))]
+
+def arxiv_date(published: str) -> str:
+    """Converte '2024-05-01T12:34:56Z' no formato de submittedDate (YYYYMMDDHHMM)."""
+    return published[:16].replace("-", "").replace("T", "").replace(":", "")
+
+def build_arxiv_params(
+    query: str,
+    max_results: int = 3,
+    start: int = 0,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Parâmetros da API do arXiv.
+
+    Args:
+        start: deslocamento da página de resultados
+        sort_by: relevance, lastUpdatedDate ou submittedDate
+        sort_order: ascending ou descending
+        since: data de publicação mínima (ISO, como em <published>)
+    """
+    search_query = f"all:{query}"
+    if since:
+        until = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y%m%d%H%M")
+        search_query += f" AND submittedDate:[{arxiv_date(since)} TO {until}]"
+    params = {"search_query": search_query, "max_results": max_results}
+    if start:
+        params["start"] = start
+    if sort_by:
+        params["sortBy"] = sort_by
+    if sort_order:
+        params["sortOrder"] = sort_order
+    return params
+
+def iter_arxiv_documents(
+    query: str,
+    max_results: int = 3,
+    start: int = 0,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Busca a consulta na API do arXiv e produz os documentos brutos à medida
+    que o corpo da resposta é lido, sem montar a árvore XML inteira.
+    """
+    with _session.get(
+        ARXIV_API_URL,
+        params=build_arxiv_params(query, max_results, start, sort_by, sort_order, since),
+        timeout=ARXIV_TIMEOUT,
+        stream=True
+    ) as r:
+        if r.status_code != 200:
+            raise ArxivFetchError(r.status_code)
+        r.raw.decode_content = True
+        for entry in iter_arxiv_entries(r.raw):
+            yield entry.to_document(query)
+
+def fetch_arxiv_documents(
+    query: str,
+    max_results: int = 3,
+    start: int = 0,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    since: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Busca a consulta na API do arXiv e devolve os documentos brutos."""
+    with timed("fetch_arxiv") as span:
+        documents = list(iter_arxiv_documents(query, max_results, start, sort_by, sort_order, since))
+        span["items"] = len(documents)
+    return documents
+
+def cached_fetch_arxiv_documents(
+    query: str,
+    max_results: int = 3,
+    start: int = 0,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    since: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """`fetch_arxiv_documents` passando pelo cache de buscas (com coalescimento)."""
+    return search_cache.get_or_fetch(
+        "arxiv", query,
+        lambda: fetch_arxiv_documents(query, max_results, start, sort_by, sort_order, since),
+        max_results=max_results, start=start, sort_by=sort_by, sort_order=sort_order, since=since,
+    )
@@ -0,0 +1,178 @@
+"""
+Camada de coleta assíncrona para arXiv e Tavily.
+
+Várias consultas são buscadas concorrentemente sobre um pool de conexões
+compartilhado, com limite de concorrência por host, timeout e novas
+tentativas com backoff exponencial. É usada pelas pesquisas agendadas
+(research_queue, um lote de tópicos por vez) e pelo backfill (ingest.py).
+"""
+import asyncio
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.core.metrics import timed
+from app.core.search_cache import search_cache
+
+from .arxiv_client import ARXIV_API_URL, ArxivFeedParser, build_arxiv_params, parse_arxiv_entries
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# tamanho dos pedaços do corpo entregues ao parser incremental
+STREAM_CHUNK_BYTES = 64 * 1024
+
+class CollectorConfig:
+    """Parâmetros de rede do coletor."""
+
+    def __init__(
+        self,
+        total_connections: int = 32,
+        per_host_limit: int = 4,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        tavily_concurrency: int = 4,
+    ):
+        self.total_connections = total_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tavily_concurrency = tavily_concurrency
+
+class CollectorError(Exception):
+    """Falha definitiva ao buscar uma consulta."""
+
+class AsyncCollector:
+    """
+    Coletor concorrente. Use como gerenciador de contexto assíncrono:
+
+        async with AsyncCollector() as collector:
+            results = await asyncio.gather(*(collector.fetch_arxiv(q) for q in queries))
+    """
+
+    def __init__(self, config: Optional[CollectorConfig] = None, arxiv_url: str = ARXIV_API_URL):
+        self.config = config or CollectorConfig()
+        self.arxiv_url = arxiv_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._tavily_limit: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncCollector":
+        connector = aiohttp.TCPConnector(
+            limit=self.config.total_connections,
+            limit_per_host=self.config.per_host_limit,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+        )
+        self._tavily_limit = asyncio.Semaphore(self.config.tavily_concurrency)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.config.per_host_limit)
+        return self._host_limits[host]
+
+    async def _backoff(self, attempt: int) -> None:
+        delay = min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt)
+        await asyncio.sleep(delay + random.random() * self.config.backoff_base)
+
+    async def get_bytes(self, url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        """GET com limite por host, timeout e novas tentativas com backoff."""
+        last_error = None
+        for attempt in range(self.config.retries + 1):
+            try:
+                async with self._host_limit(url):
+                    async with self._session.get(url, params=params) as resp:
+                        if resp.status == 200:
+                            return await resp.read()
+                        last_error = CollectorError(f"HTTP {resp.status}")
+                        if resp.status not in RETRY_STATUS:
+                            raise last_error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+            if attempt < self.config.retries:
+                await self._backoff(attempt)
+        raise CollectorError(f"Falha ao acessar {url}: {last_error}")
+
+    async def fetch_arxiv_raw(self, query: str, max_results: int = 3, start: int = 0, **params) -> bytes:
+        """Corpo bruto (feed Atom) de uma página de resultados do arXiv."""
+        with timed("fetch_arxiv", items=0):
+            return await self.get_bytes(
+                self.arxiv_url,
+                params=build_arxiv_params(query, max_results, start, **params),
+            )
+
+    async def stream_arxiv(
+        self, query: str, max_results: int = 3, start: int = 0, **params
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Produz os documentos de uma página do arXiv à medida que o corpo
+        chega, sem guardar a resposta inteira. Novas tentativas só acontecem
+        antes do primeiro documento entregue.
+        """
+        request_params = build_arxiv_params(query, max_results, start, **params)
+        last_error = None
+        for attempt in range(self.config.retries + 1):
+            delivered = False
+            try:
+                async with self._host_limit(self.arxiv_url):
+                    async with self._session.get(self.arxiv_url, params=request_params) as resp:
+                        if resp.status == 200:
+                            parser = ArxivFeedParser(query)
+                            async for chunk in resp.content.iter_chunked(STREAM_CHUNK_BYTES):
+                                documents = parser.feed(chunk)
+                                if documents:
+                                    delivered = True
+                                    yield documents
+                            documents = parser.close()
+                            if documents:
+                                yield documents
+                            return
+                        last_error = CollectorError(f"HTTP {resp.status}")
+                        if resp.status not in RETRY_STATUS:
+                            raise last_error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if delivered:
+                    raise CollectorError(f"Conexão interrompida no meio da resposta do arXiv: {e}") from e
+                last_error = e
+            if attempt < self.config.retries:
+                await self._backoff(attempt)
+        raise CollectorError(f"Falha ao acessar {self.arxiv_url}: {last_error}")
+
+    async def fetch_arxiv(
+        self, query: str, max_results: int = 3, start: int = 0, use_cache: bool = True, **params
+    ) -> List[Dict[str, Any]]:
+        """
+        Documentos brutos de uma página de resultados do arXiv. Com
+        `use_cache=False` (polling do scheduler) sempre vai à rede.
+        """
+        async def fetch():
+            content = await self.fetch_arxiv_raw(query, max_results, start, **params)
+            return parse_arxiv_entries(content, query)
+
+        if not use_cache:
+            return await fetch()
+        # mesma chave de `cached_fetch_arxiv_documents`: cache compartilhado com as ferramentas
+        return await search_cache.aget_or_fetch(
+            "arxiv", query, fetch, max_results=max_results, start=start, **params
+        )
+
+    async def fetch_web(self, query: str) -> List[Dict[str, Any]]:
+        from .web_search_with_flow import tavily_search_raw, parse_web_results
+
+        # O cliente Tavily é síncrono: roda em thread, limitado pelo semáforo
+        async with self._tavily_limit:
+            search_results = await asyncio.to_thread(tavily_search_raw, query)
+        return parse_web_results(search_results, query)
@@ -0,0 +1,73 @@
+"""
+Etapa de chunking reutilizável do armazenamento no ChromaDB.
+
+- Divisores criados uma única vez por `source_type`, com tamanho e
+  sobreposição configuráveis
+- Conteúdos curtos (ex.: resumos do arXiv) viram um único chunk, sem passar
+  pelo divisor
+- Ids determinísticos (`content_hash-índice`), para que reingestões façam
+  upsert em vez de duplicar vetores
+- Metadados completos só no primeiro chunk; os demais levam apenas os campos
+  usados em filtros e na exibição
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Resumos do arXiv têm no máximo ~1920 caracteres: cabem num único chunk
+CHUNKING_CONFIG: Dict[str, Dict[str, int]] = {
+    "arxiv": {"chunk_size": 2000, "chunk_overlap": 200},
+    "web_search": {"chunk_size": 1000, "chunk_overlap": 200},
+    "default": {"chunk_size": 1000, "chunk_overlap": 200},
+}
+
+# Campos mantidos em todos os chunks (filtros da consulta e exibição)
+CHUNK_METADATA_KEYS = ("title", "authors", "year", "link", "url", "source", "query", "search_query")
+
+def chunking_params(source_type: str) -> Dict[str, int]:
+    return CHUNKING_CONFIG.get(source_type, CHUNKING_CONFIG["default"])
+
+@lru_cache(maxsize=None)
+def _splitter_for(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def chunk_id(content_hash: str, index: int) -> str:
+    return f"{content_hash}-{index}"
+
+def chunk_record(processed_data: Dict[str, Any], stored_at: Optional[str] = None) -> Tuple[List[Document], List[str]]:
+    """
+    Converte um registro processado em chunks e seus ids determinísticos.
+
+    Returns:
+        tuple: (documentos, ids), na mesma ordem.
+    """
+    content = processed_data["content"]
+    content_hash = processed_data["content_hash"]
+    metadata = processed_data["metadata"]
+    params = chunking_params(processed_data.get("source_type", "default"))
+
+    if len(content) <= params["chunk_size"]:
+        texts = [content]
+    else:
+        texts = _splitter_for(params["chunk_size"], params["chunk_overlap"]).split_text(content)
+
+    slim_metadata = {k: metadata[k] for k in CHUNK_METADATA_KEYS if metadata.get(k) is not None}
+    docs = []
+    ids = []
+    for index, text in enumerate(texts):
+        if index == 0:
+            chunk_metadata = {
+                **metadata,
+                "stored_at": stored_at or datetime.now().isoformat(),
+                "chunk_count": len(texts),
+            }
+        else:
+            chunk_metadata = dict(slim_metadata)
+        chunk_metadata["content_hash"] = content_hash
+        chunk_metadata["chunk_index"] = index
+        docs.append(Document(page_content=text, metadata=chunk_metadata))
+        ids.append(chunk_id(content_hash, index))
+    return docs, ids
@@ -0,0 +1,156 @@
+"""
+Pipeline de ingestão em lote: NLP -> Validação -> ChromaDB.
+
+Substitui as chamadas documento a documento das ferramentas de coleta:
+cada lote é normalizado de uma vez, codificado numa única chamada ao
+modelo de embeddings e gravado com um único `add_documents`.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Any, Iterable, List, Optional
+from .nlp_process import nlp_process_batch
+from .validate_content import validate_batch
+from .store_in_chromadb import store_documents_batch
+from .structure import IngestOutcome
+from app.core.metrics import timed
+
+DEFAULT_BATCH_SIZE = 32
+
+class StageStats:
+    """Tempo acumulado e itens processados por etapa (para medir vazão em docs/s)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = {}
+        self.items: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float, items: int) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.items[stage] = self.items.get(stage, 0) + items
+
+    @contextmanager
+    def measure(self, stage: str, items: int):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, items)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """{etapa: {"items", "seconds", "docs_per_s"}}"""
+        with self._lock:
+            return {
+                stage: {
+                    "items": self.items[stage],
+                    "seconds": round(self.seconds[stage], 3),
+                    "docs_per_s": round(self.items[stage] / self.seconds[stage], 1) if self.seconds[stage] else 0.0,
+                }
+                for stage in self.seconds
+            }
+
+@contextmanager
+def _measure(stats: Optional[StageStats], stage: str, items: int):
+    with timed(stage, items):
+        if stats is None:
+            yield
+        else:
+            with stats.measure(stage, items):
+                yield
+
+def _ingest_batch(
+    documents: List[Dict[str, Any]],
+    source_type: str,
+    similarity_threshold: float,
+    stats: Optional[StageStats] = None,
+) -> List[IngestOutcome]:
+    titles = [doc.get("metadata", {}).get("title", "Sem título") for doc in documents]
+    outcomes: List[IngestOutcome] = [None] * len(documents)
+
+    # NLP
+    with _measure(stats, "nlp", len(documents)):
+        processed = nlp_process_batch(documents, source_type)
+    valid_idx = []
+    for i, item in enumerate(processed):
+        if item["error"]:
+            outcomes[i] = IngestOutcome(title=titles[i], status="error", message=item["error"])
+        else:
+            valid_idx.append(i)
+
+    # Validação semântica
+    records = [processed[i]["data"] for i in valid_idx]
+    try:
+        with _measure(stats, "validation", len(records)):
+            validations = validate_batch(records, similarity_threshold)
+    except Exception as e:
+        validations = [{"valid": False, "message": f"❌ Erro na validação: {str(e)}"}] * len(records)
+
+    accepted_idx = []
+    signatures = []
+    for i, data, validation in zip(valid_idx, records, validations):
+        if validation["valid"]:
+            accepted_idx.append(i)
+            signatures.append(validation.get("signature"))
+        else:
+            status = "error" if validation["message"].startswith("❌ Erro") else "rejected"
+            outcomes[i] = IngestOutcome(
+                title=titles[i], status=status,
+                message=validation["message"], content_hash=data["content_hash"]
+            )
+
+    # Armazenamento
+    accepted = [processed[i]["data"] for i in accepted_idx]
+    try:
+        with _measure(stats, "store", len(accepted)):
+            chunk_counts = store_documents_batch(accepted, signatures)
+    except Exception as e:
+        for i, data in zip(accepted_idx, accepted):
+            outcomes[i] = IngestOutcome(
+                title=titles[i], status="error",
+                message=f"❌ Erro no armazenamento ChromaDB: {str(e)}",
+                content_hash=data["content_hash"]
+            )
+        return outcomes
+
+    for i, data, n_chunks in zip(accepted_idx, accepted, chunk_counts):
+        content_hash = data["content_hash"]
+        outcomes[i] = IngestOutcome(
+            title=titles[i], status="stored",
+            message=f"✅ Armazenado no ChromaDB: {n_chunks} chunks, hash: {content_hash[:8]}",
+            content_hash=content_hash
+        )
+
+    return outcomes
+
+def ingest_documents(
+    documents: Iterable[Dict[str, Any]],
+    source_type: str,
+    similarity_threshold: float = 0.6,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    stats: Optional[StageStats] = None,
+) -> List[IngestOutcome]:
+    """
+    Ingere documentos brutos em lotes.
+
+    Args:
+        documents: lista ou gerador de itens no formato
+            {"raw_content": str, "metadata": dict}; geradores são
+            consumidos um lote por vez
+        source_type: tipo da fonte (arxiv, web_search, ...)
+        similarity_threshold: limiar da validação semântica
+        batch_size: quantidade de documentos por lote
+        stats: se informado, acumula tempo e itens de cada etapa
+
+    Returns:
+        list: um IngestOutcome por documento, na mesma ordem da entrada.
+    """
+    outcomes: List[IngestOutcome] = []
+    iterator = iter(documents)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        outcomes.extend(_ingest_batch(batch, source_type, similarity_threshold, stats))
+    return outcomes
@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
 import hashlib
 import re
+from itertools import repeat
 from langchain_core.tools import tool
-from typing import Dict, Any
+from typing import Dict, Any, List
 from pydantic import BaseModel, Field
 from app.core.shared_state import set_current_processed_data
 
@@ -12,6 +13,92 @@ class NLPProcessInput(BaseModel):
     metadata: Dict[str, Any] = Field(..., description="Metadados iniciais")
     source_type: str = Field(..., description="Tipo da fonte")
 
+# Padrões e vocabulário pré-compilados (usados em todos os documentos)
+_DISALLOWED_CHARS = re.compile(r'[^\w\s.,;:!?()-]+')
+_WORD = re.compile(r'\w+')
+
+# A detecção de idioma olha apenas o início do texto
+LANGUAGE_PREFIX_CHARS = 1000
+LANGUAGE_PREFIX_WORDS = 100
+_PT_STOPWORDS = frozenset([
+    "de", "da", "do", "das", "dos", "para", "com", "que", "não", "uma", "um",
+    "os", "as", "em", "no", "na", "nos", "nas", "por", "se", "ao", "é", "são", "como",
+])
+_EN_STOPWORDS = frozenset([
+    "the", "of", "and", "to", "in", "is", "for", "that", "with", "on", "are",
+    "this", "by", "we", "be", "an", "from", "it", "as", "which", "our",
+])
+
+def content_hash_of(normalized_content: str) -> str:
+    """Hash do conteúdo normalizado (blake2b de 128 bits, 32 caracteres hex)."""
+    return hashlib.blake2b(normalized_content.encode(), digest_size=16).hexdigest()
+
+# +1 por stopword de português, -1 por stopword de inglês (uma única passada)
+_LANGUAGE_WEIGHTS = {
+    **{w: -1 for w in _EN_STOPWORDS},
+    **{w: 1 for w in _PT_STOPWORDS},
+    **{w: 0 for w in _PT_STOPWORDS & _EN_STOPWORDS},
+}
+
+def _language_of(tokens: List[str]) -> str:
+    score = sum(map(_LANGUAGE_WEIGHTS.get, tokens, repeat(0, len(tokens))))
+    return "pt" if score > 0 else "en"
+
+def detect_language(text: str) -> str:
+    """Conta stopwords de português e inglês nas palavras do prefixo do texto."""
+    return _language_of(_WORD.findall(text[:LANGUAGE_PREFIX_CHARS].lower()))
+
+def _process_one(raw_content: str, metadata: Dict[str, Any], source_type: str, processed_at: str) -> Dict[str, Any]:
+    # Normalização: remove caracteres fora do conjunto permitido e colapsa
+    # espaços; as palavras já separadas dão a contagem
+    words = _DISALLOWED_CHARS.sub('', raw_content).split()
+    normalized_content = " ".join(words)
+
+    # Gera hash único
+    content_hash = content_hash_of(normalized_content)
+
+    # Enriquece metadados
+    enhanced_metadata = {
+        **metadata,
+        "word_count": len(words),
+        "char_count": len(normalized_content),
+        # reaproveita as palavras já separadas (pontuação colada só faz perder alguma stopword)
+        "language": _language_of(" ".join(words[:LANGUAGE_PREFIX_WORDS]).lower().split()),
+        "processed_at": processed_at
+    }
+
+    return {
+        "content": normalized_content,
+        "metadata": enhanced_metadata,
+        "source_type": source_type,
+        "content_hash": content_hash
+    }
+
+def process_content(raw_content: str, metadata: Dict[str, Any], source_type: str) -> Dict[str, Any]:
+    """
+    Normaliza um conteúdo e devolve o registro processado,
+    sem alterar o estado compartilhado.
+    """
+    return _process_one(raw_content, metadata, source_type, datetime.now().isoformat())
+
+def nlp_process_batch(documents: List[Dict[str, Any]], source_type: str) -> List[Dict[str, Any]]:
+    """
+    Processa um lote de documentos brutos ({"raw_content", "metadata"}).
+
+    Returns:
+        list: um item por documento, na mesma ordem, com o registro
+        processado em "data" ou a mensagem de falha em "error".
+    """
+    processed_at = datetime.now().isoformat()
+    results = []
+    for doc in documents:
+        try:
+            data = _process_one(doc["raw_content"], doc.get("metadata", {}), source_type, processed_at)
+            results.append({"data": data, "error": None})
+        except Exception as e:
+            results.append({"data": None, "error": f"❌ Erro no processamento NLP: {str(e)}"})
+    return results
+
 # @tool("nlp_process", args_schema=NLPProcessInput)
 def nlp_process(raw_content: str, metadata: Dict[str, Any], source_type: str) -> str:
     """
@@ -21,36 +108,14 @@ def nlp_process(raw_content: str, metadata: Dict[str, Any], source_type: str) ->
     - Preparação para indexação
     """
     try:
-        # Normalização básica
-        normalized_content = re.sub(r'\s+', ' ', raw_content.strip())
-        normalized_content = re.sub(r'[^\w\s.,;:!?()-]', '', normalized_content)
-
-        # Extração de metadados adicionais
-        word_count = len(normalized_content.split())
-        char_count = len(normalized_content)
-
-        # Gera hash único
-        content_hash = hashlib.md5(normalized_content.encode()).hexdigest()
-
-        # Enriquece metadados
-        enhanced_metadata = {
-            **metadata,
-            "word_count": word_count,
-            "char_count": char_count,
-            "language": "pt" if any(word in normalized_content.lower() for word in ["de", "da", "do", "para", "com"]) else "en",
-            "processed_at": datetime.now().isoformat()
-        }
-
-        # Define os dados processados no estado compartilhado
-        processed_data = {
-            "content": normalized_content,
-            "metadata": enhanced_metadata,
-            "source_type": source_type,
-            "content_hash": content_hash
-        }
-        set_current_processed_data(processed_data)
-
-        return f"✅ NLP processado: {word_count} palavras, hash: {content_hash[:8]}"
+        processed_data = process_content(raw_content, metadata, source_type)
+
+        # Abre o contexto desta execução do pipeline
+        pipeline_id = set_current_processed_data(processed_data)
+
+        word_count = processed_data["metadata"]["word_count"]
+        content_hash = processed_data["content_hash"]
+        return f"✅ NLP processado: {word_count} palavras, hash: {content_hash[:8]}, pipeline_id: {pipeline_id}"
 
     except Exception as e:
-        return f"❌ Erro no processamento NLP: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro no processamento NLP: {str(e)}"
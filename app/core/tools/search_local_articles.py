@@ -0,0 +1,32 @@
+from typing import Optional
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+from app.core.retrieval import search_articles, format_results
+
+# --- CONSULTA À BASE LOCAL ---
+class LocalSearchInput(BaseModel):
+    query: str = Field(..., description="Consulta em linguagem natural")
+    k: int = Field(5, description="Número máximo de artigos retornados")
+    source: Optional[str] = Field(None, description="Filtrar por fonte: arxiv ou web_search")
+    year: Optional[str] = Field(None, description="Filtrar por ano de publicação (ex.: 2023)")
+    authors: Optional[str] = Field(None, description="Filtrar por nome (ou parte do nome) de autor")
+
+@tool("search_local_articles", args_schema=LocalSearchInput)
+def search_local_articles(
+    query: str,
+    k: int = 5,
+    source: Optional[str] = None,
+    year: Optional[str] = None,
+    authors: Optional[str] = None,
+) -> str:
+    """
+    Consulta os artigos já armazenados no ChromaDB, sem coleta na rede:
+    - Busca por similaridade semântica
+    - Filtros por fonte, ano e autores
+    - Re-ranqueamento MMR para resultados diversos
+    """
+    try:
+        docs = search_articles(query, k=k, source=source, year=year, authors=authors)
+        return format_results(docs)
+    except Exception as e:
+        return f"❌ Erro na consulta à base local: {str(e)}"
@@ -1,49 +1,128 @@
+import logging
+import os
 import re
+import threading
+import time
+from typing import Optional
 from langchain_core.tools import tool
-from app.core.config import scheduler, active_jobs
-from datetime import datetime, timedelta
+from app.core.config import get_scheduler, SchedulerUnavailable
 import uuid
-from app.core.tools.simple_arxiv_search import arxiv_search_collect
+from app.core.research_queue import research_queue
+from app.core.scheduler_store import get_scheduler_store
 from app.core.shared_state import add_scheduler_result
 
+logger = logging.getLogger(__name__)
+
+# intervalo em que o dono do scheduler aplica agendamentos/cancelamentos feitos em outros workers
+SYNC_INTERVAL = int(os.getenv("SAPIEN_SCHEDULER_SYNC", "5"))
+SYNC_JOB_ID = "sapien_sync_jobs"
+
+# Gramáticas dos comandos (também usadas pelo roteador rápido em services)
+SCHEDULE_PATTERN = re.compile(
+    r"pesquise sobre (.*?) durante (\d+) minutos?.*?a cada (\d+) segundos?",
+    re.IGNORECASE
+)
+CANCEL_PATTERN = re.compile(r"cancelar busca sobre (.+)", re.IGNORECASE)
+
+def _start_job(scheduler, tema: str, job_id: str, int_seg: int, fim: float) -> None:
+    """Cria no APScheduler o job de um agendamento gravado no scheduler_store."""
+
+    def tarefa():
+        if not get_scheduler_store().has_job(job_id):
+            # cancelado (ou substituído) por qualquer worker
+            if scheduler.get_job(job_id):
+                scheduler.remove_job(job_id)
+            return
+        if time.time() >= fim:
+            scheduler.remove_job(job_id)
+            get_scheduler_store().remove_job(tema, job_id)
+            final_msg = f"🛑 Tarefa '{tema}' finalizada."
+            logger.info(final_msg)
+            add_scheduler_result(final_msg)
+            return
+        logger.info("buscando '%s'", tema)
+        # A busca roda no pool de pesquisas; o tick só enfileira.
+        # O cursor persistido do tópico faz cada tick trazer só artigos novos.
+        research_queue.submit(tema, 3, publicar, incremental=True)
+
+    def publicar(tema: str, resultado: str):
+        logger.info(resultado)
+        # Adiciona resultado para notificação do usuário
+        add_scheduler_result(f"🔍 [{tema}] {resultado}")
+
+    if scheduler.get_job(job_id):
+        scheduler.remove_job(job_id)
+    scheduler.add_job(tarefa, 'interval', seconds=int_seg, id=job_id, max_instances=1, coalesce=True)
+
+def sync_jobs(scheduler) -> None:
+    """
+    Alinha os jobs do APScheduler com o scheduler_store: cria os agendados em
+    outros workers (ou antes de este processo assumir o scheduler) e remove
+    os que não estão mais na tabela.
+    """
+    wanted = {job["job_id"]: job for job in get_scheduler_store().jobs()}
+    for job in scheduler.get_jobs():
+        if job.id != SYNC_JOB_ID and job.id not in wanted:
+            scheduler.remove_job(job.id)
+    for job_id, job in wanted.items():
+        if scheduler.get_job(job_id) is None:
+            _start_job(scheduler, job["topic"], job_id, job["interval_seconds"], job["ends_at"])
+
+def _owned_scheduler():
+    """Scheduler deste processo; SchedulerUnavailable se outro worker for o dono."""
+    scheduler = get_scheduler()
+    if scheduler.get_job(SYNC_JOB_ID) is None:
+        sync_jobs(scheduler)
+        scheduler.add_job(
+            sync_jobs, 'interval', args=[scheduler], seconds=SYNC_INTERVAL,
+            id=SYNC_JOB_ID, max_instances=1, coalesce=True, replace_existing=True,
+        )
+    return scheduler
+
+def watch_scheduler_ownership(interval: float = SYNC_INTERVAL, stop: Optional[threading.Event] = None) -> bool:
+    """
+    Tenta assumir o scheduler e, enquanto outro worker for o dono, tenta de
+    novo a cada `interval` segundos. A trava some quando o dono cai, então um
+    dos workers restantes assume e recria os jobs gravados no scheduler_store,
+    sem esperar um novo agendamento. Devolve True ao assumir, False se `stop`
+    for sinalizado antes.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            _owned_scheduler()
+            logger.info("scheduler ativo neste worker (pid %d)", os.getpid())
+            return True
+        except SchedulerUnavailable:
+            pass
+        except Exception as e:
+            logger.warning("falha ao iniciar o scheduler: %s", e)
+        stop.wait(interval)
+    return False
+
 # --- FERRAMENTAS DE AGENDAMENTO ---
 @tool
 def schedule_research(mensagem: str) -> str:
     """
     Comando: pesquise sobre X durante N minutos a cada M segundos
     """
-    padrao = re.compile(
-        r"pesquise sobre (.*?) durante (\d+) minutos?.*?a cada (\d+) segundos?",
-        re.IGNORECASE
-    )
-    m = padrao.search(mensagem)
+    m = SCHEDULE_PATTERN.search(mensagem)
     if not m:
         return "Use: 'pesquise sobre [tema] durante [N] minutos a cada [M] segundos'."
     tema, dur_min, int_seg = m.groups()
     dur_min, int_seg = int(dur_min), int(int_seg)
     job_id = f"job_{tema.replace(' ','_')}_{uuid.uuid4().hex[:6]}"
-    fim = datetime.now() + timedelta(minutes=dur_min)
-    start_idx = {"value": 0}
-
-    def tarefa():
-        if datetime.now() >= fim:
-            scheduler.remove_job(job_id)
-            active_jobs.pop(tema, None)
-            final_msg = f"🛑 Tarefa '{tema}' finalizada."
-            print(final_msg)
-            add_scheduler_result(final_msg)
-            return
-        print(f"[Scheduler] buscando '{tema}' (start={start_idx['value']})")
-        resultado = arxiv_search_collect(tema, 3)
-        start_idx["value"] += 3
-        print(resultado)
-        # Adiciona resultado para notificação do usuário
-        add_scheduler_result(f"🔍 [{tema}] {resultado}")
+    fim = time.time() + dur_min * 60
 
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-    scheduler.add_job(tarefa, 'interval', seconds=int_seg, id=job_id)
-    active_jobs[tema] = job_id
+    # a tabela é compartilhada; se o scheduler estiver em outro worker, ele cria o job
+    replaced = get_scheduler_store().save_job(tema, job_id, int_seg, fim)
+    try:
+        scheduler = _owned_scheduler()
+    except SchedulerUnavailable:
+        return f"✅ Agendada: '{tema}' por {dur_min}min a cada {int_seg}s (início em até {SYNC_INTERVAL}s)."
+    if replaced and scheduler.get_job(replaced):
+        scheduler.remove_job(replaced)
+    _start_job(scheduler, tema, job_id, int_seg, fim)
     return f"✅ Agendada: '{tema}' por {dur_min}min a cada {int_seg}s."
 
 @tool
@@ -51,15 +130,20 @@ def cancel_research(mensagem: str) -> str:
     """
     Comando: cancelar busca sobre X
     """
-    m = re.search(r"cancelar busca sobre (.+)", mensagem, re.IGNORECASE)
+    m = CANCEL_PATTERN.search(mensagem)
     if not m:
         return "Use: 'cancelar busca sobre [tema]'."
     tema = m.group(1).strip()
-    jid = active_jobs.get(tema)
+    jid = get_scheduler_store().remove_job(tema)
     if not jid:
         return f"Nenhuma tarefa ativa para '{tema}'."
-    scheduler.remove_job(jid)
-    del active_jobs[tema]
+    try:
+        scheduler = _owned_scheduler()
+    except SchedulerUnavailable:
+        # o dono do scheduler remove o job no próximo tick ou sincronização
+        return f"❌ Tarefa para '{tema}' cancelada."
+    if scheduler.get_job(jid):
+        scheduler.remove_job(jid)
     return f"❌ Tarefa para '{tema}' cancelada."
 
 @tool
@@ -67,13 +151,11 @@ def check_scheduler_results() -> str:
     """
     Verifica os resultados das pesquisas agendadas
     """
-    from app.core.shared_state import get_scheduler_results, clear_scheduler_results
-    
-    results = get_scheduler_results()
+    from app.core.shared_state import take_scheduler_results
+
+    # lidos e removidos de uma vez: cada resultado é exibido uma só vez
+    results = take_scheduler_results()
     if not results:
         return "Nenhum resultado de pesquisa agendada disponível."
-    
-    # Limpa os resultados após exibir
-    clear_scheduler_results()
-    
+
     return "📋 Resultados das pesquisas agendadas:\n\n" + "\n".join(results)
\ No newline at end of file
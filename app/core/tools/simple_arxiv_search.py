@@ -1,92 +1,84 @@
+import logging
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-import requests
-from app.core.tools.nlp_process import nlp_process
-from .store_in_chromadb import store_in_chromadb
-from .validate_content import validate_content
-import xml.etree.ElementTree as ET
-from app.core.config import adicionados_arxiv_links
+from .ingest_pipeline import ingest_documents
+from .arxiv_client import ARXIV_API_URL, ArxivFetchError, cached_fetch_arxiv_documents, parse_arxiv_entries
+from app.core.dedup_index import get_dedup_index, LINK
+
+logger = logging.getLogger(__name__)
 
 # --- esquema de entrada (mantenha ou re-declare se já existir) ---
 class ArxivIngestInput(BaseModel):
     query: str = Field(..., description="Termo de pesquisa para artigos no arXiv")
     max_results: int = Field(3, description="Número máximo de artigos a buscar")
 
-def arxiv_search_collect(query: str, max_results: int = 3) -> str:
+def filter_new_arxiv_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Busca artigos no arXiv e processa através do fluxo padronizado:
-    Coleta -> NLP -> Validação -> ChromaDB
+    Descarta artigos já armazenados (e links repetidos no próprio lote). Os
+    links só são registrados depois do armazenamento (ver add_stored_records).
     """
-    url = (
-        "http://export.arxiv.org/api/query?"
-        f"search_query=all:{query}&max_results={max_results}"
-    )
-    r = requests.get(url)
-    if r.status_code != 200:
-        return f"Erro ao acessar arXiv: {r.status_code}"
-
-    root = ET.fromstring(r.content)
-    entries = root.findall("{http://www.w3.org/2005/Atom}entry")
-    if not entries:
-        return "Nenhum artigo encontrado no arXiv."
-
-    results = []
-    for e in entries:
-        link = e.find("{http://www.w3.org/2005/Atom}id").text.strip()
-        if link in adicionados_arxiv_links:
+    links = [doc["metadata"]["link"] for doc in documents]
+    seen = get_dedup_index().contains_many(LINK, links)
+    new_documents = []
+    new_links = set()
+    for doc, link, already in zip(documents, links, seen):
+        if already or link in new_links:
             continue
+        new_links.add(link)
+        new_documents.append(doc)
+    return new_documents
+
+# Threshold mais flexível para arXiv
+ARXIV_SIMILARITY_THRESHOLD = 0.3
 
-        title = e.find("{http://www.w3.org/2005/Atom}title").text.strip()
-        published = e.find("{http://www.w3.org/2005/Atom}published").text.strip()
-        year = published[:4]
-        summary = e.find("{http://www.w3.org/2005/Atom}summary").text.strip()
-        authors = [
-            a.find("{http://www.w3.org/2005/Atom}name").text.strip()
-            for a in e.findall("{http://www.w3.org/2005/Atom}author")
-        ]
-
-        meta = {
-            "title": title,
-            "authors": ", ".join(authors),
-            "year": year,
-            "link": link,
-            "source": "arxiv"
-        }
-
-        adicionados_arxiv_links.add(link)
-
-        # Processa cada artigo individualmente através do pipeline completo
-        try:
-            # NLP -> Validação -> ChromaDB (fluxo completo)
-            nlp_result = nlp_process(
-                raw_content=summary,
-                metadata=meta,
-                source_type="arxiv"
-            )
-            
-            if "✅" in nlp_result:
-                # Validação semântica
-                validation_result = validate_content.invoke({
-                    "use_current_data": True,
-                    "similarity_threshold": 0.3  # Threshold mais flexível para arXiv
-                })
-                if "✅" in validation_result:
-                    # Armazenamento
-                    storage_result = store_in_chromadb.invoke({"use_current_data": True})
-                    results.append(f"📄 {title} ({year}) - {storage_result}")
-                else:
-                    results.append(f"📄 {title} ({year}) - {validation_result}")
-            else:
-                results.append(f"📄 {title} ({year}) - {nlp_result}")
-                
-        except Exception as e:
-            results.append(f"📄 {title} ({year}) - ❌ Erro no pipeline: {str(e)}")
+def format_arxiv_outcomes(documents: List[Dict[str, Any]], outcomes: List[Any], error: str = None) -> str:
+    """Formata o resumo do processamento de artigos (outcomes na ordem de `documents`)."""
+    labels = [f"📄 {d['metadata']['title']} ({d['metadata']['year']})" for d in documents]
+    if error is not None:
+        results = [f"{label} - ❌ Erro no pipeline: {error}" for label in labels]
+    else:
+        results = [f"{label} - {o.message}" for label, o in zip(labels, outcomes)]
 
     if not results:
         return "Nenhum artigo novo foi processado."
 
     return "Artigos processados pelo fluxo padronizado:\n\n" + "\n".join(results)
 
+def ingest_arxiv_documents(documents: List[Dict[str, Any]]) -> str:
+    """Envia artigos novos pelo fluxo NLP -> Validação -> ChromaDB e formata o resumo."""
+    # NLP -> Validação -> ChromaDB em lote
+    try:
+        outcomes = ingest_documents(documents, source_type="arxiv", similarity_threshold=ARXIV_SIMILARITY_THRESHOLD)
+    except Exception as e:
+        return format_arxiv_outcomes(documents, [], error=str(e))
+    return format_arxiv_outcomes(documents, outcomes)
+
+def arxiv_search_collect(
+    query: str,
+    max_results: int = 3,
+    start: int = 0,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None,
+    since: Optional[str] = None,
+) -> str:
+    """
+    Busca artigos no arXiv e processa através do fluxo padronizado:
+    Coleta -> NLP -> Validação -> ChromaDB
+
+    `start`, `sort_by`/`sort_order` e `since` permitem paginar e buscar
+    apenas artigos submetidos a partir de uma data.
+    """
+    try:
+        entries = cached_fetch_arxiv_documents(query, max_results, start, sort_by, sort_order, since)
+    except ArxivFetchError as e:
+        return f"Erro ao acessar arXiv: {e.status_code}"
+
+    if not entries:
+        return "Nenhum artigo encontrado no arXiv."
+
+    return ingest_arxiv_documents(filter_new_arxiv_documents(entries))
+
 
 @tool("simple_arxiv_search", args_schema=ArxivIngestInput)
 def simple_arxiv_search(*args, **kwargs) -> str:
@@ -98,8 +90,8 @@ def simple_arxiv_search(*args, **kwargs) -> str:
       - simple_arxiv_search("texto de busca", 3)
       - chamadas do agent que incluem objetos extras (run_manager, parent_run_id, ...)
     """
-    # (opcional) debug para ver o que o agent passa - descomente para inspecionar
-    # print("DEBUG simple_arxiv_search args:", args, "kwargs:", kwargs)
+    # debug para ver o que o agent passa (SAPIEN_LOG_LEVEL=DEBUG)
+    logger.debug("simple_arxiv_search args: %s kwargs: %s", args, kwargs)
 
     query = None
     max_results = None
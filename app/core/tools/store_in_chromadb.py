@@ -1,17 +1,63 @@
+import logging
 from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
 from langchain_core.tools import tool
-from app.core.vectorestore import vectorstore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from app.core.write_buffer import write_buffer
 from pydantic import BaseModel, Field
-from app.core.shared_state import get_current_processed_data, clear_current_processed_data
+from app.core.pipeline_context import resolve_processed_data, close_context
+from app.core.shared_state import add_stored_records
+from .chunking import chunk_record
+
+logger = logging.getLogger(__name__)
+
+def store_documents_batch(records: List[Dict[str, Any]], signatures: Optional[List[np.ndarray]] = None) -> List[int]:
+    """
+    Enfileira um lote de registros validados no buffer de escrita, que os
+    grava no Chroma em lotes maiores (ver app/core/write_buffer.py). Depois
+    que o journal do buffer aceitou o lote, hashes, links e assinaturas
+    MinHash (`signatures`, calculadas na validação) entram nos índices de
+    deduplicação.
+
+    Returns:
+        list: número de chunks gerados para cada registro, na mesma ordem.
+    """
+    stored_at = datetime.now().isoformat()
+    all_docs = []
+    all_ids = []
+    seen_ids = set()
+    chunk_counts = []
+    for data in records:
+        docs, ids = chunk_record(data, stored_at)
+        chunk_counts.append(len(docs))
+        for doc, doc_id in zip(docs, ids):
+            if doc_id not in seen_ids:
+                seen_ids.add(doc_id)
+                all_docs.append(doc)
+                all_ids.append(doc_id)
+
+    # ids determinísticos: reingestões fazem upsert em vez de duplicar
+    write_buffer.add(all_docs, all_ids)
+    try:
+        add_stored_records(records, signatures)
+    except Exception as e:
+        # os chunks já estão no journal; na pior hipótese serão regravados (upsert)
+        logger.warning("falha ao registrar %d documentos na deduplicação: %s", len(records), e)
+
+    return chunk_counts
 
 # --- AGENTE CHROMADB ---
 class ChromaDBStoreInput(BaseModel):
+    processed_data: Optional[Dict[str, Any]] = Field(None, description="Registro validado (content, metadata, source_type, content_hash)")
+    pipeline_id: Optional[str] = Field(None, description="pipeline_id retornado pelo nlp_process")
     use_current_data: bool = Field(True, description="Usar dados validados atuais")
 
 @tool("store_in_chromadb", args_schema=ChromaDBStoreInput)
-def store_in_chromadb(use_current_data: bool = True) -> str:
+def store_in_chromadb(
+    processed_data: Optional[Dict[str, Any]] = None,
+    pipeline_id: Optional[str] = None,
+    use_current_data: bool = True,
+) -> str:
     """
     Armazena conteúdo validado no ChromaDB:
     - Cria embeddings vetoriais
@@ -19,38 +65,22 @@ def store_in_chromadb(use_current_data: bool = True) -> str:
     - Persiste dados
     """
     try:
-        current_processed_data = get_current_processed_data()
+        current_processed_data = resolve_processed_data(processed_data, pipeline_id)
         if not current_processed_data:
             return "❌ Nenhum dado validado disponível para armazenamento"
 
-        content = current_processed_data["content"]
-        metadata = current_processed_data["metadata"]
         content_hash = current_processed_data["content_hash"]
+        docs, ids = chunk_record(current_processed_data)
 
-        # Prepara documento
-        enhanced_metadata = {
-            **metadata,
-            "content_hash": content_hash,
-            "stored_at": datetime.now().isoformat()
-        }
-
-        document = Document(page_content=content, metadata=enhanced_metadata)
-
-        # Divide em chunks se necessário
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        docs = splitter.split_documents([document])
-
-        # Armazena no ChromaDB
-        vectorstore.add_documents(docs)
-        vectorstore.persist()
+        # Armazena no ChromaDB (via buffer de escrita com journal)
+        write_buffer.add(docs, ids)
+        add_stored_records([current_processed_data])
 
-        # Limpa dados temporários
-        clear_current_processed_data()
+        # Encerra o contexto desta execução
+        if not processed_data:
+            close_context(pipeline_id)
 
         return f"✅ Armazenado no ChromaDB: {len(docs)} chunks, hash: {content_hash[:8]}"
 
     except Exception as e:
-        return f"❌ Erro no armazenamento ChromaDB: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro no armazenamento ChromaDB: {str(e)}"
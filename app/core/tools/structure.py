@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
 
 # --- Estruturas de Dados Padronizadas ---
@@ -9,3 +9,10 @@ class ProcessedContent(BaseModel):
     source_type: str = Field(..., description="Tipo da fonte (arxiv, web, etc.)")
     content_hash: str = Field(..., description="Hash único do conteúdo")
     processing_timestamp: str = Field(..., description="Timestamp do processamento")
+
+class IngestOutcome(BaseModel):
+    """Resultado da ingestão de um documento pelo pipeline em lote"""
+    title: str = Field(..., description="Título do documento")
+    status: str = Field(..., description="stored, rejected ou error")
+    message: str = Field(..., description="Mensagem da etapa que decidiu o destino do documento")
+    content_hash: Optional[str] = Field(None, description="Hash do conteúdo normalizado, se processado")
@@ -1,22 +1,21 @@
 # --- AGENTE DE VALIDAÇÃO COM SIMILARIDADE SEMÂNTICA ---
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-from app.core.shared_state import get_current_processed_data, is_hash_processed, add_processed_hash
+from app.core.shared_state import is_hash_processed, are_hashes_processed
+from app.core.pipeline_context import resolve_processed_data
+import logging
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from app.core.embedding_service import get_embedding_service
+from app.core.topic_index import topic_index
+from app.core.near_duplicate import get_near_duplicate_index
 
-# Modelo de embeddings para similaridade semântica
-_embedding_model = None
+logger = logging.getLogger(__name__)
 
 def get_embedding_model():
-    """Carrega o modelo de embeddings uma única vez."""
-    global _embedding_model
-    if _embedding_model is None:
-        _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-    return _embedding_model
+    """Retorna o serviço de embeddings compartilhado (modelo único com cache)."""
+    return get_embedding_service()
 
 def calculate_semantic_similarity(text: str, topic: str, threshold: float = 0.6) -> tuple[float, bool]:
     """
@@ -33,12 +32,11 @@ def calculate_semantic_similarity(text: str, topic: str, threshold: float = 0.6)
     try:
         model = get_embedding_model()
         
-        # Gera embeddings para o texto e tópico
+        # Gera o embedding do texto; o do tópico vem do índice pré-calculado
         text_embedding = model.encode([text])
-        topic_embedding = model.encode([topic])
         
         # Calcula similaridade de cosseno
-        similarity = cosine_similarity(text_embedding, topic_embedding)[0][0]
+        similarity = topic_index.similarities(text_embedding, [topic])[0]
         
         # Verifica se passa no threshold
         is_relevant = similarity >= threshold
@@ -46,7 +44,7 @@ def calculate_semantic_similarity(text: str, topic: str, threshold: float = 0.6)
         return float(similarity), is_relevant
         
     except Exception as e:
-        print(f"Erro no cálculo de similaridade: {e}")
+        logger.warning("Erro no cálculo de similaridade: %s", e)
         # Fallback: aceita se não conseguir calcular
         return 0.5, True
 
@@ -99,12 +97,129 @@ def validate_content_semantic(content: str, metadata: Dict[str, Any], threshold:
         message = f"⚠️ Erro na validação semântica, aceitando conteúdo: {str(e)}"
         return 0.5, True, message
 
+def check_basic_consistency(processed_data: Dict[str, Any], is_duplicate: Optional[bool] = None) -> Optional[str]:
+    """
+    Executa as validações que não dependem de embeddings.
+
+    Args:
+        processed_data: registro produzido pelo NLP
+        is_duplicate: resultado já consultado no índice de deduplicação, se houver
+
+    Returns:
+        Optional[str]: mensagem de rejeição, ou None se o conteúdo passou.
+    """
+    content_hash = processed_data["content_hash"]
+    if is_duplicate is None:
+        is_duplicate = is_hash_processed(content_hash)
+
+    # Verifica duplicatas
+    if is_duplicate:
+        return f"❌ Conteúdo duplicado detectado (hash: {content_hash[:8]})"
+
+    # Validações básicas de consistência
+    if len(processed_data["content"].strip()) < 50:
+        return "❌ Conteúdo muito curto para ser relevante"
+
+    if not processed_data["metadata"].get("title"):
+        return "❌ Metadados incompletos: título ausente"
+
+    return None
+
+def _near_duplicate_message(match_hash: str, jaccard: float) -> str:
+    return f"❌ Conteúdo quase duplicado detectado (similar a {match_hash[:8]}, jaccard≈{jaccard:.2f})"
+
+def validate_batch(records: List[Dict[str, Any]], threshold: float = 0.6) -> List[Dict[str, Any]]:
+    """
+    Valida um lote de registros processados de uma só vez.
+
+    Todos os textos do lote são codificados numa única chamada a `encode` e
+    comparados aos vetores do índice de tópicos com um produto matriz-vetor
+    por tópico. Antes de qualquer embedding, quase-duplicatas (MinHash/LSH)
+    de conteúdos já armazenados ou do próprio lote são rejeitadas.
+
+    Nada é registrado nos índices de deduplicação aqui: isso acontece só
+    depois do armazenamento (ver add_stored_records).
+
+    Returns:
+        list: um item por registro, com "valid", "similarity" e "message";
+        os aprovados levam também a assinatura MinHash em "signature".
+    """
+    outcomes: List[Dict[str, Any]] = [None] * len(records)
+    pending = []
+    seen_hashes = set()
+    duplicates = are_hashes_processed([data["content_hash"] for data in records])
+
+    for i, (data, is_duplicate) in enumerate(zip(records, duplicates)):
+        rejection = check_basic_consistency(data, is_duplicate)
+        if rejection is None and data["content_hash"] in seen_hashes:
+            rejection = f"❌ Conteúdo duplicado detectado (hash: {data['content_hash'][:8]})"
+        if rejection:
+            outcomes[i] = {"valid": False, "similarity": 0.0, "message": rejection}
+            continue
+        seen_hashes.add(data["content_hash"])
+        pending.append(i)
+
+    # Quase-duplicatas: índice LSH + comparação com as assinaturas do próprio lote
+    signatures: Dict[int, np.ndarray] = {}
+    batch_hashes: List[str] = []
+    batch_signatures: List[np.ndarray] = []
+    unique_pending = []
+    near_duplicate_index = get_near_duplicate_index()
+    for i in pending:
+        signature = near_duplicate_index.signature(records[i]["content"])
+        match = near_duplicate_index.query(signature)
+        if match is None and batch_signatures:
+            jaccards = (np.vstack(batch_signatures) == signature).mean(axis=1)
+            best = int(jaccards.argmax())
+            if jaccards[best] >= near_duplicate_index.threshold:
+                match = (batch_hashes[best], float(jaccards[best]))
+        if match is not None:
+            outcomes[i] = {"valid": False, "similarity": 0.0, "message": _near_duplicate_message(*match)}
+            continue
+        signatures[i] = signature
+        batch_hashes.append(records[i]["content_hash"])
+        batch_signatures.append(signature)
+        unique_pending.append(i)
+    pending = unique_pending
+
+    if not pending:
+        return outcomes
+
+    topics = [extract_topic_from_metadata(records[i]["metadata"]) for i in pending]
+
+    try:
+        model = get_embedding_model()
+        text_embeddings = model.encode([records[i]["content"] for i in pending])
+        scores = topic_index.similarities(text_embeddings, topics).tolist()
+    except Exception as e:
+        logger.warning("Erro no cálculo de similaridade: %s", e)
+        # Fallback: aceita se não conseguir calcular
+        scores = [0.5] * len(pending)
+
+    for i, similarity in zip(pending, scores):
+        content_hash = records[i]["content_hash"]
+        if similarity >= threshold:
+            message = f"✅ Validação aprovada: similaridade {similarity:.3f}, hash: {content_hash[:8]}"
+            outcomes[i] = {"valid": True, "similarity": similarity, "message": message, "signature": signatures[i]}
+        else:
+            message = f"⚠️ Baixa similaridade semântica: {similarity:.3f} (threshold: {threshold})"
+            outcomes[i] = {"valid": False, "similarity": similarity, "message": message}
+
+    return outcomes
+
 class ValidationInput(BaseModel):
+    processed_data: Optional[Dict[str, Any]] = Field(None, description="Registro produzido pelo NLP (content, metadata, source_type, content_hash)")
+    pipeline_id: Optional[str] = Field(None, description="pipeline_id retornado pelo nlp_process")
     use_current_data: bool = Field(True, description="Usar dados do processamento atual")
     similarity_threshold: float = Field(0.6, description="Limiar de similaridade semântica (0.0-1.0)")
 
 @tool("validate_content", args_schema=ValidationInput)
-def validate_content(use_current_data: bool = True, similarity_threshold: float = 0.6) -> str:
+def validate_content(
+    processed_data: Optional[Dict[str, Any]] = None,
+    pipeline_id: Optional[str] = None,
+    use_current_data: bool = True,
+    similarity_threshold: float = 0.6,
+) -> str:
     """
     Valida conteúdo através do Agente de Validação com similaridade semântica:
     - Verifica duplicatas
@@ -112,7 +227,7 @@ def validate_content(use_current_data: bool = True, similarity_threshold: float
     - Valida relevância baseada em similaridade
     """
     try:
-        current_processed_data = get_current_processed_data()
+        current_processed_data = resolve_processed_data(processed_data, pipeline_id)
         if not current_processed_data:
             return "❌ Nenhum dado processado disponível para validação"
 
@@ -120,16 +235,15 @@ def validate_content(use_current_data: bool = True, similarity_threshold: float
         content_hash = current_processed_data["content_hash"]
         metadata = current_processed_data["metadata"]
 
-        # Verifica duplicatas
-        if is_hash_processed(content_hash):
-            return f"❌ Conteúdo duplicado detectado (hash: {content_hash[:8]})"
+        rejection = check_basic_consistency(current_processed_data)
+        if rejection:
+            return rejection
 
-        # Validações básicas de consistência
-        if len(processed_content.strip()) < 50:
-            return "❌ Conteúdo muito curto para ser relevante"
-
-        if not metadata.get("title"):
-            return "❌ Metadados incompletos: título ausente"
+        near_duplicate_index = get_near_duplicate_index()
+        signature = near_duplicate_index.signature(processed_content)
+        match = near_duplicate_index.query(signature)
+        if match is not None:
+            return _near_duplicate_message(*match)
 
         # Validação semântica
         similarity, is_valid, message = validate_content_semantic(
@@ -139,9 +253,7 @@ def validate_content(use_current_data: bool = True, similarity_threshold: float
         if not is_valid:
             return message
 
-        # Adiciona ao cache de processados
-        add_processed_hash(content_hash)
-
+        # os índices de processados são atualizados pelo store_in_chromadb
         return f"✅ Validação aprovada: similaridade {similarity:.3f}, hash: {content_hash[:8]}"
 
     except Exception as e:
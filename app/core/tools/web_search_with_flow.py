@@ -1,7 +1,90 @@
 from datetime import datetime, timedelta
 import re
+import threading
+from typing import Dict, Any, List
 from langchain_core.tools import tool
 from langchain_tavily import TavilySearch
+from app.core.metrics import timed
+from app.core.search_cache import search_cache
+
+# Threshold mais flexível para web
+WEB_SIMILARITY_THRESHOLD = 0.4
+
+TAVILY_SITES = "site:arxiv.org OR site:nature.com OR site:science.org OR site:acm.org OR site:ieee.org"
+
+# Cliente Tavily compartilhado entre chamadas
+_tavily_tool = None
+_tavily_lock = threading.Lock()
+
+def get_tavily_tool() -> TavilySearch:
+    """Cria o cliente Tavily uma única vez."""
+    global _tavily_tool
+    if _tavily_tool is None:
+        with _tavily_lock:
+            if _tavily_tool is None:
+                _tavily_tool = TavilySearch(max_results=8, search_depth="advanced", include_answer=False)
+    return _tavily_tool
+
+def _tavily_invoke(query: str) -> Any:
+    # Dê uma dica à Tavily para obter melhores resultados científicos/tecnológicos
+    with timed("fetch_web"):
+        return get_tavily_tool().invoke({"query": f"{query} {TAVILY_SITES}"})
+
+def tavily_search_raw(query: str) -> Any:
+    """Executa a busca na Tavily (via cache de buscas) e devolve a resposta bruta."""
+    return search_cache.get_or_fetch("web_search", query, lambda: _tavily_invoke(query))
+
+def parse_web_results(search_results: Any, query: str) -> List[Dict[str, Any]]:
+    """
+    Converte a resposta da Tavily em documentos brutos
+    ({"raw_content", "metadata"}) prontos para o pipeline de ingestão.
+    """
+    if not search_results:
+        return []
+
+    # Tavily retorna uma lista de dicionários diretamente
+    if isinstance(search_results, list):
+        results_list = search_results
+    else:
+        # Se retornar um dicionário com 'results', extrair a lista
+        results_list = search_results.get('results', [])
+
+    documents = []
+    for result in results_list:
+        title = result.get('title', 'Sem título')
+        content = result.get('content', '')
+        url = result.get('url', '')
+
+        if not content or len(content.strip()) < 20:
+            continue
+
+        # Metadados iniciais
+        meta = {
+            "title": title,
+            "url": url,
+            "source": "web_search",
+            "query": query
+        }
+        documents.append({"raw_content": content, "metadata": meta})
+    return documents
+
+def ingest_web_documents(documents: List[Dict[str, Any]]) -> str:
+    """Envia resultados web pelo fluxo NLP -> Validação -> ChromaDB e formata o resumo."""
+    from .ingest_pipeline import ingest_documents
+
+    labels = [f"🌐 {d['metadata']['title']}" for d in documents]
+
+    # Processa o lote pelo fluxo completo: NLP -> Validação -> ChromaDB
+    try:
+        outcomes = ingest_documents(documents, source_type="web_search", similarity_threshold=WEB_SIMILARITY_THRESHOLD)
+        results = [f"{label} - {o.message}" for label, o in zip(labels, outcomes)]
+    except Exception as proc_error:
+        results = [f"{label} - ❌ Erro no pipeline: {str(proc_error)}" for label in labels]
+
+    if not results:
+        return "Nenhum conteúdo web foi processado com sucesso."
+
+    return "Resultados web processados pelo fluxo padronizado:\n\n" + "\n".join(results)
 
 # Ferramenta para busca web com fluxo padronizado
 @tool
@@ -11,75 +94,12 @@ def web_search_with_flow(query: str) -> str:
     Coleta -> NLP -> Validação -> ChromaDB
     """
     try:
-        tavily_tool = TavilySearch(max_results=8, search_depth="advanced", include_answer=False)
-        # Dê uma dica à Tavily para obter melhores resultados científicos/tecnológicos
-        search_results = tavily_tool.invoke({
-            "query": f"{query} site:arxiv.org OR site:nature.com OR site:science.org OR site:acm.org OR site:ieee.org"
-        })
+        search_results = tavily_search_raw(query)
 
         if not search_results:
             return "Nenhum resultado encontrado na busca web."
 
-        # Tavily retorna uma lista de dicionários diretamente
-        if isinstance(search_results, list):
-            results_list = search_results
-        else:
-            # Se retornar um dicionário com 'results', extrair a lista
-            results_list = search_results.get('results', [])
-
-        results = []
-        for result in results_list:
-            title = result.get('title', 'Sem título')
-            content = result.get('content', '')
-            url = result.get('url', '')
-
-            if not content or len(content.strip()) < 20:
-                continue
-
-            # Metadados iniciais
-            meta = {
-                "title": title,
-                "url": url,
-                "source": "web_search",
-                "query": query
-            }
-
-            # Processa através do fluxo completo: NLP -> Validação -> ChromaDB
-            try:
-                # Usa o pipeline completo
-                from .nlp_process import nlp_process
-                from .validate_content import validate_content
-                from .store_in_chromadb import store_in_chromadb
-                
-                # NLP Processing
-                nlp_result = nlp_process(
-                    raw_content=content,
-                    metadata=meta,
-                    source_type="web_search"
-                )
-                
-                if "✅" in nlp_result:
-                    # Validação semântica
-                    validation_result = validate_content.invoke({
-                        "use_current_data": True,
-                        "similarity_threshold": 0.4  # Threshold mais flexível para web
-                    })
-                    if "✅" in validation_result:
-                        # Armazenamento
-                        storage_result = store_in_chromadb.invoke({"use_current_data": True})
-                        results.append(f"🌐 {title} - {storage_result}")
-                    else:
-                        results.append(f"🌐 {title} - {validation_result}")
-                else:
-                    results.append(f"🌐 {title} - {nlp_result}")
-
-            except Exception as proc_error:
-                results.append(f"🌐 {title} - ❌ Erro no pipeline: {str(proc_error)}")
-
-        if not results:
-            return "Nenhum conteúdo web foi processado com sucesso."
-
-        return "Resultados web processados pelo fluxo padronizado:\n\n" + "\n".join(results)
+        return ingest_web_documents(parse_web_results(search_results, query))
 
     except Exception as e:
-        return f"Erro na busca web: {str(e)}"
\ No newline at end of file
+        return f"Erro na busca web: {str(e)}"
@@ -0,0 +1,106 @@
+"""
+Índice de vetores de tópicos usados na validação semântica.
+
+O tópico de uma busca web é o mesmo para todos os resultados da consulta, e
+o de um artigo do arXiv (derivado do título) se repete a cada reingestão,
+então o vetor é calculado uma vez, mantido normalizado e reaproveitado. Os
+tópicos de fallback são pré-calculados juntos na primeira utilização. Como
+cada título é um tópico, o índice é um LRU limitado (SAPIEN_TOPIC_INDEX_SIZE).
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.embedding_service import get_embedding_service
+
+TOPIC_INDEX_SIZE = int(os.getenv("SAPIEN_TOPIC_INDEX_SIZE", "4096"))
+
+FALLBACK_TOPICS = [
+    "scientific research artificial intelligence machine learning neural networks",
+]
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_topic(topic: str) -> str:
+    """Chave canônica do tópico: minúsculas e espaços colapsados."""
+    return _WHITESPACE.sub(" ", topic.strip().lower())
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class TopicIndex:
+    """Mapa tópico normalizado -> vetor unitário (LRU com até `max_size` tópicos)."""
+
+    def __init__(self, fallback_topics: List[str] = FALLBACK_TOPICS, max_size: int = TOPIC_INDEX_SIZE):
+        self.max_size = max_size
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fallback_topics = list(fallback_topics)
+        self._fallback_loaded = False
+
+    def _ensure_fallbacks(self) -> None:
+        if not self._fallback_loaded:
+            self._fallback_loaded = True
+            self.warm(self._fallback_topics)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Vetores das chaves (já normalizadas), calculando as ausentes numa única chamada ao modelo."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    found[key] = vector
+        missing = [k for k in keys if k not in found]
+        if missing:
+            vectors = _unit(np.asarray(get_embedding_service().encode(missing), dtype=np.float32))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._vectors[key] = vector
+                    self._vectors.move_to_end(key)
+                    found[key] = vector
+                while len(self._vectors) > self.max_size:
+                    self._vectors.popitem(last=False)
+        return found
+
+    def warm(self, topics: List[str]) -> None:
+        """Calcula, numa única chamada ao modelo, os tópicos ainda ausentes do índice."""
+        self._lookup(list(dict.fromkeys(normalize_topic(t) for t in topics)))
+
+    def vectors(self, topics: List[str]) -> np.ndarray:
+        """Retorna a matriz de vetores unitários dos tópicos, na ordem dada."""
+        self._ensure_fallbacks()
+        keys = [normalize_topic(t) for t in topics]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        return np.vstack([found[k] for k in keys])
+
+    def similarities(self, embeddings: np.ndarray, topics: List[str]) -> np.ndarray:
+        """
+        Similaridade de cosseno entre cada embedding e o tópico correspondente.
+
+        Documentos que compartilham o tópico são resolvidos com um único
+        produto matriz-vetor.
+        """
+        doc_vectors = _unit(np.asarray(embeddings, dtype=np.float32))
+        scores = np.empty(len(topics), dtype=np.float32)
+        groups: Dict[str, List[int]] = {}
+        for i, topic in enumerate(topics):
+            groups.setdefault(topic, []).append(i)
+        unique_topics = list(groups)
+        topic_vectors = self.vectors(unique_topics)
+        for topic, topic_vector in zip(unique_topics, topic_vectors):
+            idx = groups[topic]
+            scores[idx] = doc_vectors[idx] @ topic_vector
+        return scores
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+topic_index = TopicIndex()
@@ -1,9 +1,49 @@
-from langchain.embeddings.huggingface import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vectorstore = Chroma(
-    collection_name="artigos_cientificos",
-    embedding_function=embeddings,
-    persist_directory="./chroma_db"
-)
+import os
+from app.core.embedding_service import embedding_service
+from app.core.registry import registry
+
+embeddings = embedding_service
+
+# Com vários workers do servidor, use um servidor Chroma compartilhado
+# (`chroma run --path ./chroma_db`): cada processo com o banco local
+# manteria o próprio índice em memória e não veria o que os outros gravam.
+CHROMA_HOST = os.getenv("SAPIEN_CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("SAPIEN_CHROMA_PORT", "8000"))
+
+def _build_vectorstore():
+    from langchain.vectorstores import Chroma
+    from app.core.dedup_index import get_dedup_index
+
+    if CHROMA_HOST:
+        import chromadb
+        store = Chroma(
+            collection_name="artigos_cientificos",
+            embedding_function=embeddings,
+            client=chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+        )
+    else:
+        store = Chroma(
+            collection_name="artigos_cientificos",
+            embedding_function=embeddings,
+            persist_directory="./chroma_db"
+        )
+    # índice persistente de deduplicação (links e hashes já armazenados)
+    get_dedup_index().bootstrap_from_vectorstore(store)
+    return store
+
+def _load_embeddings():
+    embeddings.model  # carrega o SentenceTransformer
+    return embeddings
+
+registry.register("embeddings", _load_embeddings)
+registry.register("vectorstore", _build_vectorstore)
+
+def get_vectorstore():
+    """Vectorstore compartilhado, aberto no primeiro uso."""
+    return registry.get("vectorstore")
+
+def __getattr__(name):
+    # compatibilidade: `from app.core.vectorestore import vectorstore`
+    if name == "vectorstore":
+        return get_vectorstore()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,310 @@
+"""
+Buffer de escrita (write-behind) do vectorstore.
+
+Os chunks a gravar entram numa fila em memória e num journal em disco
+(JSON Lines com fsync em grupo: chamadas concorrentes de `add` compartilham
+um único fsync, e cada uma só retorna depois que seus chunks estão no disco),
+e são enviados ao Chroma num único `add_documents`
+quando a fila atinge `max_docs` ou o item mais antigo passa de `max_delay`
+segundos. Na inicialização, o que ficou no journal (ex.: queda do processo)
+é regravado; na saída do processo a fila é descarregada. Como os ids dos
+chunks são determinísticos, regravar é idempotente (upsert).
+
+Cada processo escreve no seu próprio journal (`write_journal.<pid>.jsonl`),
+protegido por uma trava de arquivo; ao iniciar, um processo também recupera
+os journals de processos que já terminaram (vários workers do gunicorn).
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from app.core.metrics import timed
+from app.core.process_lock import ProcessLock
+from app.core.vectorestore import get_vectorstore
+
+logger = logging.getLogger(__name__)
+
+MAX_BUFFERED_DOCS = int(os.getenv("SAPIEN_WRITE_BUFFER_DOCS", "256"))
+MAX_BUFFER_DELAY = float(os.getenv("SAPIEN_WRITE_BUFFER_DELAY", "2.0"))
+JOURNAL_PATH = os.getenv("SAPIEN_WRITE_JOURNAL", "./chroma_db/write_journal.jsonl")
+
+class VectorWriteBuffer:
+    """Fila de chunks com descarga por tamanho/tempo e journal à prova de queda."""
+
+    def __init__(
+        self,
+        get_store: Callable[[], Any],
+        max_docs: int = MAX_BUFFERED_DOCS,
+        max_delay: float = MAX_BUFFER_DELAY,
+        journal_path: Optional[str] = JOURNAL_PATH,
+    ):
+        self._get_store = get_store
+        self.max_docs = max_docs
+        self.max_delay = max_delay
+        self.journal_path = None
+        self._journal_pattern = None
+        if journal_path:
+            base, ext = os.path.splitext(journal_path)
+            self.journal_path = f"{base}.{os.getpid()}{ext}"
+            self._journal_pattern = (f"{base}*{ext}", f"{base}*{ext}.flushing")
+        self._pending: List[Tuple[Document, str]] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # group commit do journal: um líder grava e faz fsync pelos que esperam
+        self._journal_io = threading.RLock()
+        self._journal_cond = threading.Condition()
+        self._journal_queue: List[Tuple[Document, str]] = []
+        self._journal_seq = 0
+        self._journal_synced = 0
+        self._journal_leader = False
+        self._journal_errors: Dict[int, BaseException] = {}
+        self._listeners: List[Callable[[], None]] = []
+        self._timer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {
+            "flushes": 0, "flushed_docs": 0, "failed_flushes": 0, "flush_seconds": 0.0, "journal_syncs": 0,
+        }
+
+        if self.journal_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal_lock = ProcessLock(f"{self.journal_path}.lock")
+            self._journal_lock.acquire()
+            self._recover()
+        atexit.register(self.shutdown)
+
+    # --- journal ---
+    @property
+    def _flushing_path(self) -> str:
+        return f"{self.journal_path}.flushing"
+
+    def _append_journal(self, items: List[Tuple[Document, str]], path: Optional[str] = None) -> None:
+        path = path or self.journal_path
+        if not path or not items:
+            return
+        lines = "".join(
+            json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n"
+            for doc, doc_id in items
+        )
+        # serializa com a troca de arquivo do flush (os.replace do journal)
+        with self._journal_io:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._stats["journal_syncs"] += 1
+
+    def _enqueue(self, items: List[Tuple[Document, str]]) -> None:
+        """
+        Grava `items` no journal e os coloca na fila, em group commit: só
+        retorna depois do fsync que os cobre.
+
+        Quem chega enquanto outro fsync está em andamento espera; ao terminar,
+        o líder acorda os que esperam e o primeiro deles grava, num único
+        fsync, tudo o que se acumulou nesse intervalo.
+        """
+        with self._journal_cond:
+            self._journal_queue.extend(items)
+            self._journal_seq += 1
+            ticket = self._journal_seq
+            while self._journal_leader and self._journal_synced < ticket and ticket not in self._journal_errors:
+                self._journal_cond.wait()
+            if ticket in self._journal_errors:
+                raise self._journal_errors.pop(ticket)
+            if self._journal_synced >= ticket:
+                return
+            self._journal_leader = True
+            batch, self._journal_queue = self._journal_queue, []
+            first, last = self._journal_synced + 1, self._journal_seq
+
+        error = None
+        try:
+            # journal e fila mudam juntos em relação à troca de arquivo do flush
+            with self._journal_io:
+                self._append_journal(batch)
+                with self._lock:
+                    self._pending.extend(batch)
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+        except BaseException as e:
+            error = e
+        with self._journal_cond:
+            self._journal_leader = False
+            self._journal_synced = last
+            if error is not None:
+                # os demais do grupo recebem a mesma falha
+                self._journal_errors.update((t, error) for t in range(first, last + 1) if t != ticket)
+            self._journal_cond.notify_all()
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _read_journal(path: str) -> List[Tuple[Document, str]]:
+        items = []
+        if not os.path.exists(path):
+            return items
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # linha parcial de uma escrita interrompida
+                items.append((Document(page_content=row["page_content"], metadata=row["metadata"]), row["id"]))
+        return items
+
+    def _orphan_journals(self) -> List[str]:
+        """Journals de outros processos que já terminaram (trava livre)."""
+        paths = set()
+        for pattern in self._journal_pattern:
+            for path in glob.glob(pattern):
+                path = path[:-len(".flushing")] if path.endswith(".flushing") else path
+                if os.path.abspath(path) != os.path.abspath(self.journal_path):
+                    paths.add(path)
+        return sorted(paths)
+
+    def _recover(self) -> None:
+        """
+        Recoloca na fila o que ficou nos journals de execuções anteriores; a
+        gravação acontece na próxima descarga, sem abrir o Chroma no import.
+        """
+        items = self._read_journal(self._flushing_path) + self._read_journal(self.journal_path)
+        for path in self._orphan_journals():
+            lock = ProcessLock(f"{path}.lock")
+            if not lock.acquire():
+                continue  # dono ainda está vivo
+            items += self._read_journal(f"{path}.flushing") + self._read_journal(path)
+            for leftover in (f"{path}.flushing", path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            lock.release()
+            os.remove(lock.path)
+        if not items:
+            return
+        logger.info("recuperando %d chunks do journal", len(items))
+        # consolida os dois arquivos num journal só
+        tmp_path = f"{self.journal_path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        self._append_journal(items, tmp_path)
+        os.replace(tmp_path, self.journal_path)
+        if os.path.exists(self._flushing_path):
+            os.remove(self._flushing_path)
+        self._pending = items
+        self._oldest = time.monotonic() - self.max_delay
+        self._ensure_timer()
+
+    # --- escrita ---
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Registra uma função chamada após cada descarga bem-sucedida."""
+        self._listeners.append(callback)
+
+    def add(self, docs: List[Document], ids: List[str]) -> None:
+        """Enfileira chunks; descarrega se o limite de tamanho for atingido."""
+        items = list(zip(docs, ids))
+        if not items:
+            return
+        self._enqueue(items)
+        with self._lock:
+            full = len(self._pending) >= self.max_docs
+        self._ensure_timer()
+        if full:
+            self.flush()
+
+    def _write(self, items: List[Tuple[Document, str]]) -> None:
+        # último valor vence para ids repetidos (upsert)
+        unique = dict((doc_id, doc) for doc, doc_id in items)
+        store = self._get_store()
+        store.add_documents(list(unique.values()), ids=list(unique.keys()))
+        # servidor Chroma (SAPIEN_CHROMA_HOST) persiste sozinho
+        if getattr(store, "_persist_directory", None) and hasattr(store, "persist"):
+            store.persist()
+
+    def flush(self) -> int:
+        """Grava tudo o que está na fila num único lote. Retorna o número de chunks gravados."""
+        with self._flush_lock:
+            with self._journal_io, self._lock:
+                items, self._pending, self._oldest = self._pending, [], None
+                if not items:
+                    return 0
+                # novas entradas passam a ir para um journal novo
+                if self.journal_path and os.path.exists(self.journal_path):
+                    os.replace(self.journal_path, self._flushing_path)
+
+            started = time.perf_counter()
+            try:
+                with timed("chroma_write", len(items)):
+                    self._write(items)
+            except Exception as e:
+                logger.error("falha ao gravar %d chunks: %s", len(items), e)
+                with self._journal_io:
+                    self._append_journal(items)
+                    with self._lock:
+                        self._pending = items + self._pending
+                        self._oldest = self._oldest or time.monotonic()
+                        self._stats["failed_flushes"] += 1
+                if self.journal_path and os.path.exists(self._flushing_path):
+                    os.remove(self._flushing_path)
+                raise
+
+            if self.journal_path and os.path.exists(self._flushing_path):
+                os.remove(self._flushing_path)
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed_docs"] += len(items)
+                self._stats["flush_seconds"] += time.perf_counter() - started
+
+        for callback in self._listeners:
+            callback()
+        return len(items)
+
+    def flush_if_pending(self) -> int:
+        return self.flush() if self._pending else 0
+
+    # --- descarga por tempo ---
+    def _ensure_timer(self) -> None:
+        if self._timer is not None:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name="vector-write-buffer", daemon=True)
+                self._timer.start()
+
+    def _run_timer(self) -> None:
+        interval = max(0.05, self.max_delay / 2)
+        while not self._stop.wait(interval):
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_delay:
+                try:
+                    self.flush()
+                except Exception:
+                    pass  # itens voltaram para a fila; nova tentativa no próximo ciclo
+
+    def shutdown(self) -> None:
+        """Para o temporizador e descarrega a fila (chamado também no atexit)."""
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception:
+            return  # permanece no journal e será recuperado na próxima inicialização
+        if self.journal_path and not os.path.exists(self.journal_path):
+            # nada pendente: remove a trava deste processo
+            self._journal_lock.release()
+            if os.path.exists(self._journal_lock.path):
+                os.remove(self._journal_lock.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["docs_per_flush"] = stats["flushed_docs"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+# Buffer único do processo
+write_buffer = VectorWriteBuffer(get_vectorstore)
@@ -1,7 +1,12 @@
 # app/routes.py
-from flask import Blueprint, render_template, request, jsonify
-from app.core.services import run
-from app.core.shared_state import get_scheduler_results, clear_scheduler_results
+import json
+from flask import Blueprint, Response, render_template, request, jsonify, stream_with_context
+from app.core.registry import registry
+from app.core.metrics import metrics
+
+# app.core.services (agentes, LLM, Chroma) e os índices SQLite (deduplicação,
+# agendamentos) são importados só quando uma rota precisa deles, para que o
+# servidor suba e responda "/" sem esperar esses serviços.
 
 routes_bp = Blueprint("routes_bp", __name__)  # nome e import_name
 
@@ -15,13 +20,77 @@ def chat():
     user_input = data.get("message")
     if not user_input:
         return jsonify({"error": "mensagem ausente"}), 400
-    result = run(user_input)
-    return jsonify({"responses": result})
+    from app.core.services import run, new_thread_id
+    thread_id = data.get("thread_id") or new_thread_id()
+    result = run(user_input, thread_id)
+    return jsonify({"responses": result, "thread_id": thread_id})
+
+@routes_bp.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    data = request.get_json()
+    user_input = data.get("message")
+    if not user_input:
+        return jsonify({"error": "mensagem ausente"}), 400
+
+    thread_id = data.get("thread_id")
+    from app.core.services import stream_events
+
+    def generate():
+        try:
+            for event in stream_events(user_input, thread_id):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            error = {"type": "error", "content": str(e)}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @routes_bp.route("/scheduler/results", methods=["GET"]) 
 def scheduler_results():
-    results = get_scheduler_results()
-    if results:
-        clear_scheduler_results()
-    return jsonify({"results": results})
+    from app.core.shared_state import take_scheduler_results
+    return jsonify({"results": take_scheduler_results()})
+
+@routes_bp.route("/scheduler/stats", methods=["GET"])
+def scheduler_stats():
+    from app.core.research_queue import research_queue
+    return jsonify(research_queue.stats())
+
+
+@routes_bp.route("/embeddings/stats", methods=["GET"])
+def embeddings_stats():
+    from app.core.embedding_service import get_embedding_service
+    return jsonify(get_embedding_service().stats())
+
+
+@routes_bp.route("/search/stats", methods=["GET"])
+def search_cache_stats():
+    from app.core.search_cache import search_cache
+    return jsonify(search_cache.stats())
+
+
+@routes_bp.route("/llm/cache/stats", methods=["GET"])
+def llm_cache_stats():
+    import app.core.config  # noqa: F401  (registra o cache)
+    cache = registry.get("llm_cache")
+    return jsonify(cache.stats() if cache is not None else {"mode": "off"})
+
+
+@routes_bp.route("/checkpoints/stats", methods=["GET"])
+def checkpoints_stats():
+    from app.core.services import checkpointer
+    return jsonify(checkpointer.stats())
+
+
+@routes_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@routes_bp.route("/services/stats", methods=["GET"])
+def services_stats():
+    return jsonify(registry.stats())
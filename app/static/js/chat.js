@@ -2,8 +2,10 @@ const chatHistory = document.getElementById('chat-history');
 const chatInput = document.getElementById('chat-input');
 const sendBtn = document.getElementById('send-btn');
 const typing = document.getElementById('typing');
+// thread da conversa atual (continuidade entre mensagens)
+let threadId = null;
 
-// Função para adicionar mensagem ao chat
+// Função para adicionar mensagem ao chat (retorna o <span> do texto)
 function addMessage(text, sender='bot') {
     const messageDiv = document.createElement('div');
     messageDiv.classList.add('message', sender);
@@ -16,9 +18,50 @@ function addMessage(text, sender='bot') {
     `;
     chatHistory.appendChild(messageDiv);
     chatHistory.scrollTop = chatHistory.scrollHeight; // scroll automático
+    return messageDiv.querySelector('span');
 }
 
-// Enviar mensagem
+// Erro HTTP ou resposta que não é SSE: devolve a mensagem a exibir
+async function responseError(res) {
+  const contentType = res.headers.get('Content-Type') || '';
+  if (res.ok && contentType.startsWith('text/event-stream')) return null;
+  let detail = `HTTP ${res.status}`;
+  try {
+    if (contentType.includes('application/json')) {
+      const body = await res.json();
+      if (body.error) detail = body.error;
+    }
+  } catch (e) {
+    // corpo ilegível: fica o código HTTP
+  }
+  return res.ok ? `resposta inesperada do servidor (${detail})` : detail;
+}
+
+// Lê um stream SSE e chama onEvent(tipo, dados) para cada evento
+async function readEventStream(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let type = 'message';
+      let data = '';
+      frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (data) onEvent(type, JSON.parse(data));
+    }
+  }
+}
+
+// Enviar mensagem (resposta chega incrementalmente via /chat/stream)
 function sendMessage() {
   const msg = chatInput.value.trim();
   if (!msg) return;
@@ -27,17 +70,48 @@ function sendMessage() {
   chatInput.value = '';
   typing.classList.remove('hidden');
 
-  fetch('/chat', {
+  let bubble = null;
+  let partial = '';
+
+  fetch('/chat/stream', {
     method: 'POST',
     headers: {'Content-Type': 'application/json'},
-    body: JSON.stringify({ message: msg })
+    body: JSON.stringify({ message: msg, thread_id: threadId })
   })
-  .then(res => res.json())
-  .then(data => {
-    typing.classList.add('hidden');
-    if (data && data.responses) {
-      addMessage(data.responses, 'bot');
+  .then(async res => {
+    const error = await responseError(res);
+    if (error) {
+      typing.classList.add('hidden');
+      // texto vindo do servidor: textContent, não innerHTML
+      addMessage('', 'bot').textContent = `⚠️ Erro ao processar a mensagem: ${error}`;
+      return;
     }
+    await readEventStream(res, (type, data) => {
+      if (type === 'token') {
+        typing.classList.add('hidden');
+        partial += data.content;
+        if (!bubble) bubble = addMessage('', 'bot');
+        bubble.textContent = partial;
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+      } else if (type === 'message' && data.role === 'ai') {
+        // nova mensagem de agente: o próximo token abre outro trecho
+        partial = '';
+      } else if (type === 'final') {
+        typing.classList.add('hidden');
+        if (data.thread_id) threadId = data.thread_id;
+        if (data.content) {
+          if (!bubble) bubble = addMessage('', 'bot');
+          bubble.textContent = data.content;
+        } else if (bubble) {
+          bubble.parentElement.remove();
+        }
+      } else if (type === 'error') {
+        typing.classList.add('hidden');
+        addMessage('⚠️ Erro ao processar a mensagem.', 'bot');
+      }
+    });
+    // stream encerrado sem evento final
+    typing.classList.add('hidden');
   })
   .catch(err => {
     typing.classList.add('hidden');
@@ -61,6 +135,7 @@ function startSchedulerPolling() {
   schedulerPoller = setInterval(async () => {
     try {
       const res = await fetch('/scheduler/results');
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
       const data = await res.json();
       if (Array.isArray(data.results) && data.results.length) {
         data.results.forEach(txt => addMessage(txt, 'bot'));
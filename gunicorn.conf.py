@@ -0,0 +1,59 @@
+"""
+Configuração do gunicorn para servir o SAPIEN em produção:
+
+    gunicorn -c gunicorn.conf.py run:app
+
+Cada mensagem de chat passa a maior parte do tempo esperando o LLM e as APIs
+de busca, então várias threads por worker (gthread) atendem conversas em
+paralelo compartilhando um único modelo de embeddings, cliente Chroma,
+scheduler e pool de pesquisas por processo.
+
+Mais de um worker (SAPIEN_WEB_WORKERS > 1) exige estado compartilhado entre
+processos: um servidor Chroma (SAPIEN_CHROMA_HOST) e o checkpointer em SQLite
+(SAPIEN_CHECKPOINT_DB, definido aqui por padrão). O scheduler roda em um
+único worker, escolhido por trava de arquivo: cada worker tenta obtê-la ao
+subir (create_app) e a cada SAPIEN_SCHEDULER_SYNC segundos, então outro
+assume se o dono cair. Agendamentos e resultados ficam em SQLite
+(SAPIEN_SCHEDULER_DB) e valem para todos os workers.
+"""
+import logging
+import os
+import sys
+
+workers = int(os.getenv("SAPIEN_WEB_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("SAPIEN_WEB_THREADS", "16"))
+bind = os.getenv("SAPIEN_WEB_BIND", "0.0.0.0:5000")
+
+# uma conversa com coleta e vários agentes pode levar minutos
+timeout = int(os.getenv("SAPIEN_WEB_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+
+# Não pré-carrega o app no master: threads (aquecimento, scheduler, buffer de
+# escrita) e conexões SQLite não sobrevivem ao fork; cada worker cria os seus.
+preload_app = False
+
+accesslog = "-"
+loglevel = os.getenv("SAPIEN_LOG_LEVEL", "info").lower()
+if loglevel == "off":
+    loglevel = "critical"
+
+if workers > 1:
+    # histórico das conversas visível em qualquer worker
+    os.environ.setdefault("SAPIEN_CHECKPOINT_DB", "./chroma_db/checkpoints.sqlite3")
+    if not os.getenv("SAPIEN_CHROMA_HOST"):
+        logging.getLogger("gunicorn.error").warning(
+            "SAPIEN_WEB_WORKERS=%d sem SAPIEN_CHROMA_HOST: cada worker terá seu próprio "
+            "índice Chroma em memória e não verá artigos gravados pelos outros.", workers
+        )
+
+def worker_exit(server, worker):
+    # descarrega o buffer de escrita do Chroma antes de o worker sair
+    module = sys.modules.get("app.core.write_buffer")
+    if module is None:
+        return
+    try:
+        module.write_buffer.shutdown()
+    except Exception as e:
+        server.log.warning("falha ao descarregar o buffer de escrita: %s", e)
@@ -0,0 +1,271 @@
+"""
+Backfill em lote do ChromaDB, sem passar pelo chat nem pelo supervisor.
+
+Lê um arquivo de consultas (uma por linha) ou um diretório de respostas
+salvas (feeds Atom .xml/.atom do arXiv e respostas .json da Tavily) e
+executa Coleta -> NLP -> Validação -> ChromaDB com busca paralela e
+embeddings em lote. O progresso é gravado num checkpoint, de modo que uma
+execução interrompida continua de onde parou.
+
+Exemplos:
+    python ingest.py --queries consultas.txt --max-results 2000
+    python ingest.py --queries consultas.txt --source web_search
+    python ingest.py --responses-dir respostas_salvas/
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app import configure_logging
+from app.core.vectorestore import get_vectorstore
+from app.core.write_buffer import write_buffer
+from app.core.tools.arxiv_client import ArxivFeedParser
+from app.core.tools.async_collector import STREAM_CHUNK_BYTES, AsyncCollector, CollectorConfig
+from app.core.tools.ingest_pipeline import StageStats, ingest_documents
+from app.core.tools.simple_arxiv_search import filter_new_arxiv_documents, ARXIV_SIMILARITY_THRESHOLD
+from app.core.tools.web_search_with_flow import parse_web_results, WEB_SIMILARITY_THRESHOLD
+
+DEFAULT_CHECKPOINT = ".ingest_checkpoint.json"
+THRESHOLDS = {"arxiv": ARXIV_SIMILARITY_THRESHOLD, "web_search": WEB_SIMILARITY_THRESHOLD}
+
+# Unidade de trabalho: (chave no checkpoint, fonte, consulta, start ou caminho)
+Unit = Tuple[str, str, str, Any]
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return set(json.load(f).get("done", []))
+
+def save_checkpoint(path: str, done: Set[str]) -> None:
+    """Grava o checkpoint de forma atômica (arquivo temporário + rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"done": sorted(done)}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def query_units(queries: List[str], source: str, max_results: int, page_size: int) -> List[Unit]:
+    units = []
+    for query in queries:
+        if source == "arxiv":
+            for start in range(0, max_results, page_size):
+                units.append((f"arxiv|{query}|{start}", "arxiv", query, start))
+        else:
+            units.append((f"web_search|{query}", "web_search", query, None))
+    return units
+
+def file_units(directory: str) -> List[Unit]:
+    units = []
+    for path in sorted(Path(directory).iterdir()):
+        suffix = path.suffix.lower()
+        query = path.stem.replace("_", " ")
+        if suffix in (".xml", ".atom"):
+            units.append((f"file|{path}", "arxiv", query, str(path)))
+        elif suffix == ".json":
+            units.append((f"file|{path}", "web_search", query, str(path)))
+    return units
+
+def read_web_file(query: str, path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and data.get("query"):
+        query = data["query"]
+    return parse_web_results(data, query)
+
+async def unit_documents(collector: AsyncCollector, unit: Unit, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Documentos de uma unidade à medida que são lidos: feeds do arXiv (da
+    rede ou de arquivo) passam pelo parser incremental em pedaços, sem
+    carregar a resposta inteira.
+    """
+    key, source, query, target = unit
+    if key.startswith("file|") and source == "arxiv":
+        parser = ArxivFeedParser(query)
+        with open(target, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                documents = parser.feed(chunk)
+                if documents:
+                    yield documents
+        documents = parser.close()
+        if documents:
+            yield documents
+    elif key.startswith("file|"):
+        yield await asyncio.to_thread(read_web_file, query, target)
+    elif source == "arxiv":
+        async for documents in collector.stream_arxiv(query, page_size, target):
+            yield documents
+    else:
+        yield await collector.fetch_web(query)
+
+def ingest_batch(source: str, documents: List[Dict[str, Any]], batch_size: int, stats: StageStats) -> Dict[str, int]:
+    """Deduplica e ingere um lote de uma unidade; devolve a contagem por status."""
+    if source == "arxiv":
+        with stats.measure("dedup", len(documents)):
+            documents = filter_new_arxiv_documents(documents)
+    outcomes = ingest_documents(
+        documents, source_type=source, similarity_threshold=THRESHOLDS[source],
+        batch_size=batch_size, stats=stats
+    )
+    counts: Dict[str, int] = {}
+    for outcome in outcomes:
+        counts[outcome.status] = counts.get(outcome.status, 0) + 1
+    return counts
+
+def _log_unit(unit: Unit, fetched: int, counts: Dict[str, int]) -> None:
+    key = unit[0]
+    summary = ", ".join(f"{status}={n}" for status, n in sorted(counts.items())) or "nada novo"
+    print(f"[ingest] {key}: {fetched} documentos ({summary})")
+
+async def run_units(
+    units: List[Unit],
+    args: argparse.Namespace,
+    stats: StageStats,
+    done: Set[str],
+    totals: Dict[str, int],
+) -> None:
+    """
+    Busca as unidades em paralelo e ingere os documentos em lotes de
+    `batch_size` assim que chegam, sem esperar a unidade inteira. A fila
+    limitada entre busca e ingestão aplica backpressure às buscas.
+
+    Retomada segura: os links de cada lote são registrados só depois de o
+    lote estar no journal do buffer de escrita (add_stored_records), e a
+    unidade só entra no checkpoint quando todos os seus lotes foram
+    gravados sem erro. Se o processo cair no meio, a unidade é buscada de
+    novo e os artigos já gravados são descartados pela deduplicação.
+    """
+    # itens: ("docs", unidade, lote), ("done", unidade, None) ou ("failed", unidade, erro)
+    results: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=args.concurrency * 2)
+    limit = asyncio.Semaphore(args.concurrency)
+    config = CollectorConfig(per_host_limit=args.concurrency, tavily_concurrency=args.concurrency)
+
+    async with AsyncCollector(config) as collector:
+        async def produce(unit: Unit) -> None:
+            key, source, query, target = unit
+            stage = "read" if key.startswith("file|") else "fetch"
+            async with limit:
+                pending: List[Dict[str, Any]] = []
+                started = time.perf_counter()
+                waiting = 0.0
+                read = 0
+                try:
+                    async for documents in unit_documents(collector, unit, args.page_size):
+                        read += len(documents)
+                        pending.extend(documents)
+                        while len(pending) >= args.batch_size:
+                            batch, pending = pending[:args.batch_size], pending[args.batch_size:]
+                            put_started = time.perf_counter()
+                            await results.put(("docs", unit, batch))
+                            waiting += time.perf_counter() - put_started
+                except Exception as e:
+                    await results.put(("failed", unit, e))
+                    return
+                finally:
+                    stats.add(stage, time.perf_counter() - started - waiting, read)
+            if pending:
+                await results.put(("docs", unit, pending))
+            await results.put(("done", unit, None))
+
+        async def consume() -> None:
+            progress: Dict[str, Dict[str, int]] = {}
+            while True:
+                item = await results.get()
+                if item is None:
+                    return
+                kind, unit, payload = item
+                counts = progress.setdefault(unit[0], {})
+                if kind == "docs":
+                    try:
+                        batch_counts = await asyncio.to_thread(ingest_batch, unit[1], payload, args.batch_size, stats)
+                    except Exception as e:
+                        print(f"[ingest] {unit[0]}: ❌ erro no lote: {e}")
+                        batch_counts = {"error": len(payload)}
+                    for status, n in batch_counts.items():
+                        counts[status] = counts.get(status, 0) + n
+                        totals[status] = totals.get(status, 0) + n
+                    counts["fetched"] = counts.get("fetched", 0) + len(payload)
+                    totals["fetched"] = totals.get("fetched", 0) + len(payload)
+                    continue
+                progress.pop(unit[0], None)
+                fetched = counts.pop("fetched", 0)
+                if kind == "failed":
+                    print(f"[ingest] {unit[0]}: ❌ {payload} (será tentado novamente na próxima execução)")
+                    continue
+                if counts.get("error"):
+                    # os lotes gravados já estão no journal e com links registrados;
+                    # na próxima execução só os que falharam são ingeridos de novo
+                    _log_unit(unit, fetched, counts)
+                    print(f"[ingest] {unit[0]}: será tentado novamente na próxima execução")
+                    continue
+                done.add(unit[0])
+                save_checkpoint(args.checkpoint, done)
+                _log_unit(unit, fetched, counts)
+
+        consumer = asyncio.ensure_future(consume())
+        await asyncio.gather(*(produce(unit) for unit in units))
+        await results.put(None)
+        await consumer
+
+def print_report(stats: StageStats, totals: Dict[str, int], elapsed: float) -> None:
+    print("\n=== Vazão por etapa ===")
+    for stage, row in stats.report().items():
+        print(f"{stage:>10}: {row['items']:>8} docs em {row['seconds']:>9.2f}s -> {row['docs_per_s']:>8.1f} docs/s")
+    fetched = totals.get("fetched", 0)
+    rate = fetched / elapsed if elapsed else 0.0
+    print(f"\nTotal: {fetched} documentos em {elapsed:.1f}s ({rate:.1f} docs/s)")
+    print("Status: " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items()) if k != "fetched"))
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill em lote do ChromaDB (arXiv/Tavily).")
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument("--queries", help="arquivo com uma consulta por linha")
+    inputs.add_argument("--responses-dir", help="diretório com feeds Atom (.xml/.atom) e respostas Tavily (.json) salvos")
+    parser.add_argument("--source", choices=["arxiv", "web_search"], default="arxiv", help="fonte das consultas (padrão: arxiv)")
+    parser.add_argument("--max-results", type=int, default=1000, help="artigos do arXiv por consulta")
+    parser.add_argument("--page-size", type=int, default=200, help="artigos por página da API do arXiv")
+    parser.add_argument("--concurrency", type=int, default=4, help="buscas simultâneas")
+    parser.add_argument("--batch-size", type=int, default=64, help="documentos por lote de embeddings/gravação")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="arquivo de progresso")
+    parser.add_argument("--restart", action="store_true", help="ignora o checkpoint existente")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    configure_logging()
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        units = query_units(queries, args.source, args.max_results, args.page_size)
+    else:
+        units = file_units(args.responses_dir)
+
+    done = set() if args.restart else load_checkpoint(args.checkpoint)
+    pending = [u for u in units if u[0] not in done]
+    print(f"[ingest] {len(pending)} de {len(units)} unidades pendentes")
+
+    # abre o Chroma e sincroniza o índice de deduplicação antes de coletar
+    get_vectorstore()
+
+    stats = StageStats()
+    totals: Dict[str, int] = {}
+    started = time.perf_counter()
+    try:
+        asyncio.run(run_units(pending, args, stats, done, totals))
+    except KeyboardInterrupt:
+        print("\n[ingest] interrompido; execute novamente para continuar do checkpoint.")
+    with stats.measure("flush", write_buffer.stats()["pending"]):
+        write_buffer.flush()
+    print_report(stats, totals, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
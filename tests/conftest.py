@@ -0,0 +1,51 @@
+"""
+Configuração comum dos testes.
+
+Os módulos do app abrem arquivos de estado (índice de deduplicação, journal
+do buffer de escrita, cursores, caches) ao serem importados; aqui todos
+apontam para um diretório temporário, antes de qualquer import do app.
+"""
+import os
+import tempfile
+
+import pytest
+
+STATE_DIR = tempfile.mkdtemp(prefix="sapien-tests-")
+
+_ENV = {
+    "TAVILY_API_KEY": "test",
+    "ANTHROPIC_API_KEY": "test",
+    "SAPIEN_WARMUP": "0",
+    "SAPIEN_DEDUP_DB": os.path.join(STATE_DIR, "dedup_index.sqlite3"),
+    "SAPIEN_WRITE_JOURNAL": os.path.join(STATE_DIR, "write_journal.jsonl"),
+    "SAPIEN_ARXIV_CURSOR_DB": os.path.join(STATE_DIR, "arxiv_cursors.sqlite3"),
+    "SAPIEN_LLM_CACHE_MODE": "off",
+    "SAPIEN_LLM_CACHE_DB": os.path.join(STATE_DIR, "llm_cache.sqlite3"),
+    "SAPIEN_SCHEDULER_LOCK": os.path.join(STATE_DIR, "scheduler.lock"),
+    "SAPIEN_SCHEDULER_DB": os.path.join(STATE_DIR, "scheduler.sqlite3"),
+    "SAPIEN_SCHEDULER_AUTOSTART": "0",
+    "SAPIEN_SEARCH_CACHE_DB": "",
+    "SAPIEN_CHECKPOINT_DB": "",
+    "SAPIEN_LOG_LEVEL": "WARNING",
+}
+for _name, _value in _ENV.items():
+    os.environ[_name] = _value
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    """
+    Embeddings determinísticos (HashingEncoder) e vectorstore em memória no
+    buffer de escrita compartilhado; devolve o vectorstore.
+    """
+    from app.core.embedding_service import embedding_service
+    from app.core.write_buffer import write_buffer
+    from fakes import HashingEncoder, RecordingVectorStore
+
+    store = RecordingVectorStore()
+    monkeypatch.setattr(embedding_service, "_model", HashingEncoder())
+    monkeypatch.setattr(write_buffer, "_get_store", lambda: store)
+    embedding_service.clear_cache()
+    yield store
+    write_buffer.flush()
+    embedding_service.clear_cache()
@@ -0,0 +1,204 @@
+"""
+Dublês locais usados pelos testes: servidor HTTP que imita a API do arXiv,
+codificador de embeddings determinístico, vectorstore em memória e chat
+model com respostas roteirizadas.
+"""
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+ATOM_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+ATOM_FOOTER = b"</feed>\n"
+
+def atom_entry(link: str, title: str, summary: str, published: str, authors: List[str]) -> bytes:
+    names = "".join(f"<author><name>{escape(a)}</name></author>" for a in authors)
+    return (
+        f"<entry><id>{escape(link)}</id><published>{published}</published>"
+        f"<title>{escape(title)}</title><summary>{escape(summary)}</summary>{names}</entry>\n"
+    ).encode("utf-8")
+
+def atom_feed(query: str, count: int, start: int = 0) -> bytes:
+    """Feed Atom com `count` entradas determinísticas para a consulta."""
+    slug = "-".join(query.lower().split())
+    parts = [ATOM_HEADER]
+    for i in range(start, start + count):
+        parts.append(atom_entry(
+            link=f"http://arxiv.org/abs/{slug}-{i:05d}v1",
+            title=f"{query} paper {i}",
+            summary=f"Abstract {i} about {query}. " * 20,
+            published=f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00Z",
+            authors=[f"Author {i}", f"Coauthor {i}"],
+        ))
+    parts.append(ATOM_FOOTER)
+    return b"".join(parts)
+
+class StubArxivServer:
+    """
+    Servidor local que responde como a API do arXiv (`/api/query`).
+
+    - `delay`: segundos de espera antes de cada resposta
+    - `fail_first`: as primeiras N requisições recebem `fail_status`
+    Registra o número de requisições e o pico de requisições simultâneas.
+    """
+
+    def __init__(self, delay: float = 0.0, fail_first: int = 0, fail_status: int = 503):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/query"
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if number <= self.fail_first:
+                handler.send_response(self.fail_status)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            params = parse_qs(urlsplit(handler.path).query)
+            query = params.get("search_query", ["all:x"])[0].split(" AND ")[0].removeprefix("all:")
+            count = int(params.get("max_results", ["3"])[0])
+            start = int(params.get("start", ["0"])[0])
+            body = atom_feed(query, count, start)
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/atom+xml")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def __enter__(self) -> "StubArxivServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # backlog padrão (5) descarta conexões simultâneas e o cliente reenvia após 1 s
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class HashingEncoder:
+    """
+    Substituto do SentenceTransformer: saco de palavras com hashing,
+    normalizado. Textos que compartilham palavras têm cosseno alto.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        self.calls += 1
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class RecordingVectorStore:
+    """Vectorstore em memória com a parte da API do Chroma usada pelo app."""
+
+    def __init__(self, fail: bool = False, embedding=None):
+        self.fail = fail
+        # com `embedding`, os vetores são calculados na gravação, como no Chroma
+        self.embedding = embedding
+        self.docs: Dict[str, Any] = {}
+        self.add_calls = 0
+        self._lock = threading.Lock()
+
+    def add_documents(self, docs, ids):
+        if self.fail:
+            raise RuntimeError("vectorstore indisponível")
+        if self.embedding is not None:
+            self.embedding.embed_documents([doc.page_content for doc in docs])
+        with self._lock:
+            self.add_calls += 1
+            for doc, doc_id in zip(docs, ids):
+                self.docs[doc_id] = doc
+        return ids
+
+    def get(self, include=None, limit=None, offset=0):
+        with self._lock:
+            items = list(self.docs.items())[offset:offset + limit if limit else None]
+        page = {"ids": [doc_id for doc_id, _ in items], "metadatas": [d.metadata for _, d in items]}
+        if include and "documents" in include:
+            page["documents"] = [d.page_content for _, d in items]
+        return page
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model local: `script(messages, tools)` devolve a próxima AIMessage,
+    onde `tools` são os nomes das ferramentas vinculadas (identifica quem
+    chama: supervisor, agente...). Guarda as entradas de cada chamada e
+    informa o uso de tokens de forma aproximada.
+    """
+
+    script: Callable[[List[BaseMessage], List[str]], AIMessage]
+    calls: List[Dict[str, Any]] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        names = [getattr(t, "name", None) or t.__name__ for t in tools]
+        return self.bind(tool_names=names)
+
+    def _generate(self, messages, stop=None, run_manager=None, tool_names=(), **kwargs: Any) -> ChatResult:
+        self.calls.append({"messages": list(messages), "tools": list(tool_names)})
+        message = self.script(list(messages), list(tool_names))
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message = message.model_copy(update={"usage_metadata": {
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+        }})
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,150 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+from langgraph_supervisor import create_supervisor
+
+from app.core import agents
+from app.core.callbacks import LLMCallLimitExceeded, LLMCallLimitHandler, MetricsCallbackHandler
+from app.core.llm_cache import SQLiteLLMCache
+from app.core.llm_client import LLMGuard, ResilientChatModel, TokenBucket
+
+from fakes import ScriptedChatModel
+
+ANSWER = "Encontrei três artigos sobre redes neurais em grafos na base local, de 2021 a 2024."
+
+def _guard() -> LLMGuard:
+    return LLMGuard(bucket=TokenBucket(rate=0), sleep=lambda s: None)
+
+def _script(messages, tools):
+    if "transfer_to_retrieval_agent" in tools:
+        # supervisor: encaminha a pergunta e depois resume a resposta do agente
+        if any(m.type == "ai" and m.content == ANSWER for m in messages):
+            return AIMessage(f"Resumo: {ANSWER}")
+        return AIMessage("", tool_calls=[{"name": "transfer_to_retrieval_agent", "args": {}, "id": "call-transfer"}])
+    return AIMessage(ANSWER)
+
+def _history(turns: int) -> list:
+    filler = "graph neural networks for molecular property prediction " * 20
+    messages = []
+    for n in range(turns):
+        messages += [HumanMessage(f"pergunta {n}: {filler}"), AIMessage(f"resposta {n}: {filler}")]
+    return messages
+
+def test_supervisor_sees_the_agent_answer_after_trimming(monkeypatch):
+    monkeypatch.setattr(agents, "MAX_HISTORY_TOKENS", 400)
+    fake = ScriptedChatModel(script=_script)
+    monkeypatch.setattr(agents, "get_llm", lambda: ResilientChatModel(inner=fake, guard=_guard()))
+    supervisor = agents._build_supervisor()
+
+    usage = MetricsCallbackHandler()
+    messages = _history(20) + [HumanMessage("Quais artigos sobre grafos temos na base?")]
+    result = supervisor.invoke({"messages": messages}, config={"callbacks": [usage, LLMCallLimitHandler()]})
+
+    supervisor_inputs = [c["messages"] for c in fake.calls if "transfer_to_retrieval_agent" in c["tools"]]
+    print(f"\n{usage.llm_calls} chamadas ao LLM, {sum(usage.tokens.values())} tokens")
+    assert len(supervisor_inputs) == 2
+    assert any(m.content == ANSWER for m in supervisor_inputs[1])
+    # o histórico antigo foi cortado antes de ir ao modelo
+    assert len(supervisor_inputs[1]) < len(messages)
+    assert result["messages"][-1].content == f"Resumo: {ANSWER}"
+    assert usage.llm_calls == 3
+
+    # o hook dos agentes, que termina em pergunta/ferramenta, descartaria a resposta
+    agent_view = agents.trim_history({"messages": result["messages"][:-1]})["llm_input_messages"]
+    assert not any(m.content == ANSWER for m in agent_view)
+
+def test_call_limit_ignores_cache_hits():
+    fake = ScriptedChatModel(script=lambda messages, tools: AIMessage(f"eco: {messages[-1].content}"))
+    model = ResilientChatModel(inner=fake, guard=_guard(), cache=SQLiteLLMCache(":memory:", mode="cache"))
+    limit = LLMCallLimitHandler(max_calls=1)
+    config = {"callbacks": [limit]}
+
+    assert model.invoke("pergunta repetida", config=config).content == "eco: pergunta repetida"
+    assert model.invoke("pergunta repetida", config=config).content == "eco: pergunta repetida"
+    assert limit.calls == 1
+    assert len(fake.calls) == 1
+
+    with pytest.raises(LLMCallLimitExceeded):
+        model.invoke("pergunta nova", config=config)
+    assert len(fake.calls) == 1
+
+# --- antes x depois: supervisor com os agentes de etapa do pipeline (nlp, validação, chromadb) ---
+
+# ordem em que o supervisor antigo encadeava os agentes numa coleta
+_LEGACY_FLOW = ["arxiv_agent", "nlp_agent", "validation_agent", "chromadb_agent"]
+_AGENT_TOOLS = {
+    "simple_arxiv_search": "arxiv_agent", "nlp_process": "nlp_agent",
+    "validate_content": "validation_agent", "store_in_chromadb": "chromadb_agent",
+}
+
+def _stub_tool(name: str):
+    @tool(name)
+    def stub(query: str) -> str:
+        """Etapa simulada do pipeline."""
+        return f"{name}: 3 artigos sobre '{query}' (pipeline_id p-1)"
+    return stub
+
+def _collection_script(flow):
+    def script(messages, tools):
+        supervisor = [t.removeprefix("transfer_to_") for t in tools if t.startswith("transfer_to_")]
+        if supervisor:
+            done = {m.content.split(":")[0] for m in messages if m.type == "ai" and m.content.endswith("concluído.")}
+            pending = [agent for agent in flow if agent not in done]
+            if not pending:
+                return AIMessage("Coleta concluída: 3 artigos sobre grafos armazenados.")
+            return AIMessage("", tool_calls=[{"name": f"transfer_to_{pending[0]}", "args": {}, "id": f"call-{pending[0]}"}])
+        [name] = [t for t in tools if t in _AGENT_TOOLS]
+        # a última mensagem também é "tool" logo após o handoff (transfer_to_*)
+        if messages[-1].type == "tool" and messages[-1].name == name:
+            return AIMessage(f"{_AGENT_TOOLS[name]}: concluído.")
+        return AIMessage("", tool_calls=[{"name": name, "args": {"query": "grafos"}, "id": f"call-{name}"}])
+    return script
+
+def _legacy_supervisor(llm):
+    """Supervisor de antes da mudança: sete agentes, histórico completo, sem corte."""
+    def agent(name, tools, prompt):
+        return create_react_agent(model=llm, tools=tools, prompt=prompt, name=name)
+
+    members = [
+        agent("retrieval_agent", [agents.search_local_articles], "You answer questions using articles already stored in ChromaDB with search_local_articles."),
+        agent("tavily_agent", [agents.web_search_with_flow], "You perform web searches and process results through the standardized flow: NLP -> Validation -> ChromaDB"),
+        agent("arxiv_agent", [_stub_tool("simple_arxiv_search")], "You search arXiv papers using simple_arxiv_search tool. Pass the search query as parameters."),
+        agent("scheduler_agent", [agents.schedule_research, agents.cancel_research, agents.check_scheduler_results], "You schedule or cancel periodic arXiv searches, and can check results from scheduled searches."),
+        agent("nlp_agent", [_stub_tool("nlp_process")], "You are the NLP Agent. Process content through linguistic normalization, metadata extraction, and preparation for indexing."),
+        agent("validation_agent", [_stub_tool("validate_content")], "You are the Validation Agent. Use semantic similarity with embeddings to validate content relevance. Always pass the pipeline_id returned by nlp_process."),
+        agent("chromadb_agent", [_stub_tool("store_in_chromadb")], "You are the ChromaDB Agent. Store validated content with vectorized embeddings optimized for semantic search. Always pass the pipeline_id of the validated content."),
+    ]
+    return create_supervisor(
+        model=llm,
+        agents=members,
+        prompt=(
+            "Você é um supervisor que coordena um sistema multi-agente de pesquisas científicas.\n"
+            "FLUXO COMPLETO: Toda informação coletada segue: Coleta -> NLP -> Validação Semântica -> ChromaDB\n"
+            "Sempre gere UMA mensagem final clara ao usuário."
+        ),
+        add_handoff_messages=True,
+        add_handoff_back_messages=True,
+        output_mode="full_history",
+    ).compile()
+
+def test_collection_costs_fewer_llm_calls_and_tokens_than_before(monkeypatch):
+    monkeypatch.setattr(agents, "simple_arxiv_search", _stub_tool("simple_arxiv_search"))
+    messages = _history(10) + [HumanMessage("Colete artigos recentes do arXiv sobre grafos")]
+    usage = {}
+    for label, flow, build in (
+        ("antes", _LEGACY_FLOW, _legacy_supervisor),
+        ("depois", ["arxiv_agent"], lambda llm: agents._build_supervisor()),
+    ):
+        llm = ResilientChatModel(inner=ScriptedChatModel(script=_collection_script(flow)), guard=_guard())
+        monkeypatch.setattr(agents, "get_llm", lambda: llm)
+        handler = MetricsCallbackHandler()
+        result = build(llm).invoke({"messages": messages}, config={"callbacks": [handler], "recursion_limit": 100})
+        assert result["messages"][-1].content == "Coleta concluída: 3 artigos sobre grafos armazenados."
+        usage[label] = (handler.llm_calls, sum(handler.tokens.values()))
+        print(f"\n{label}: {usage[label][0]} chamadas ao LLM, {usage[label][1]} tokens")
+
+    (calls_before, tokens_before), (calls_after, tokens_after) = usage["antes"], usage["depois"]
+    # supervisor + 4 agentes (2 chamadas cada) antes; supervisor + arxiv_agent depois
+    assert (calls_before, calls_after) == (13, 4)
+    assert tokens_after < tokens_before / 3
@@ -0,0 +1,92 @@
+from app.core.arxiv_cursor import ArxivCursorStore, arxiv_cursors
+from app.core.research_queue import ResearchQueue, ResearchRequest
+from app.core.write_buffer import write_buffer
+
+from fakes import StubArxivServer
+
+def _entry(link: str, published: str) -> dict:
+    return {"raw_content": "", "metadata": {"link": link, "published": published}}
+
+def _links(entries) -> list:
+    return [doc["metadata"]["link"] for doc in entries]
+
+def test_same_minute_entries_before_the_watermark_are_kept():
+    store = ArxivCursorStore(":memory:")
+    store.advance("topic", [_entry("a", "2024-05-01T10:00:30Z")])
+
+    entries = [
+        _entry("old", "2024-05-01T09:59:59Z"),
+        _entry("a", "2024-05-01T10:00:30Z"),
+        _entry("late", "2024-05-01T10:00:10Z"),
+        _entry("next", "2024-05-01T10:01:00Z"),
+    ]
+    assert _links(store.new_entries("topic", entries)) == ["late", "next"]
+
+def test_cursor_is_persisted_when_nothing_is_found():
+    store = ArxivCursorStore(":memory:")
+    assert store.advance("quiet topic", []) == 0
+
+    cursor = store.get("quiet topic")
+    assert cursor is not None
+    params = store.request_params("quiet topic", 3)
+    assert params["sort_order"] == "ascending"
+    assert params["since"] == cursor["last_published"]
+
+def test_advance_stops_at_the_first_failed_entry():
+    store = ArxivCursorStore(":memory:")
+    entries = [
+        _entry("a", "2024-05-01T10:01:00Z"),
+        _entry("b", "2024-05-01T10:02:00Z"),
+        _entry("c", "2024-05-01T10:03:00Z"),
+    ]
+    assert store.advance("topic", store.new_entries("topic", entries), failed_links={"b"}) == 1
+    assert store.get("topic")["last_published"] == "2024-05-01T10:01:00Z"
+    assert _links(store.new_entries("topic", entries)) == ["b", "c"]
+
+    # o minuto da marca volta inteiro: pede-se a mais o que já foi visto nele
+    assert store.request_params("topic", 3)["max_results"] == 4
+
+def test_first_tick_failure_does_not_create_the_cursor():
+    store = ArxivCursorStore(":memory:")
+    entries = [_entry("a", "2024-05-01T10:01:00Z")]
+    assert store.advance("topic", entries, failed_links={"a"}) == 0
+    assert store.get("topic") is None
+
+def test_queue_advances_cursor_only_after_store(fake_backends, monkeypatch):
+    topic = "cursor queue topic"
+    results = []
+    queue = ResearchQueue(pool_kind="async", workers=2)
+    request = ResearchRequest(topic, 3, lambda t, summary: results.append(summary), incremental=True)
+    original_add = write_buffer.add
+
+    def broken_add(docs, ids):
+        raise OSError("disco cheio")
+
+    with StubArxivServer() as server:
+        queue._arxiv_url = server.url
+        try:
+            monkeypatch.setattr(write_buffer, "add", broken_add)
+            queue._process([request])
+            assert arxiv_cursors.get(topic) is None
+
+            monkeypatch.setattr(write_buffer, "add", original_add)
+            queue._process([request])
+            assert "✅ Armazenado" in results[-1]
+            assert arxiv_cursors.get(topic)["last_published"] == "2024-01-03T02:02:00Z"
+
+            # o stub ignora `since`: os já tratados voltam e são descartados pelo cursor
+            queue._process([request])
+            assert "paper 3" in results[-1]
+            assert "paper 0" not in results[-1]
+        finally:
+            queue._close_collector()
+
+def test_queue_reports_when_topic_is_up_to_date(monkeypatch):
+    queue = ResearchQueue(pool_kind="async", workers=2)
+    results = []
+    request = ResearchRequest("up to date topic", 3, lambda t, summary: results.append(summary), incremental=True)
+    monkeypatch.setattr(queue, "_fetch_all", lambda batch: [[]])
+    queue._process([request])
+
+    assert results == ["Nenhum artigo novo desde a última busca."]
+    assert arxiv_cursors.get("up to date topic") is not None
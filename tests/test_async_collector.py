@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.research_queue import ResearchQueue, ResearchRequest
+from app.core.tools import arxiv_client
+from app.core.tools.async_collector import AsyncCollector, CollectorConfig, CollectorError
+
+from fakes import StubArxivServer
+
+def _collector(server: StubArxivServer, **config) -> AsyncCollector:
+    config.setdefault("backoff_base", 0.01)
+    return AsyncCollector(CollectorConfig(**config), arxiv_url=server.url)
+
+async def _fetch_all(collector: AsyncCollector, queries, max_results: int = 3):
+    async with collector:
+        return await asyncio.gather(*(collector.fetch_arxiv(q, max_results, use_cache=False) for q in queries))
+
+def test_fetch_arxiv_parses_documents():
+    with StubArxivServer() as server:
+        [docs] = asyncio.run(_fetch_all(_collector(server), ["graph networks"], max_results=5))
+
+    assert len(docs) == 5
+    meta = docs[0]["metadata"]
+    assert meta["link"] == "http://arxiv.org/abs/graph-networks-00000v1"
+    assert meta["source"] == "arxiv"
+    assert meta["search_query"] == "graph networks"
+    assert meta["authors"] == "Author 0, Coauthor 0"
+    assert docs[0]["raw_content"].startswith("Abstract 0 about graph networks.")
+
+def test_concurrent_fetch_beats_serial_path(monkeypatch):
+    queries = [f"topic {i}" for i in range(8)]
+    with StubArxivServer(delay=0.2) as server:
+        started = time.perf_counter()
+        results = asyncio.run(_fetch_all(_collector(server, per_host_limit=8), queries))
+        concurrent = time.perf_counter() - started
+
+        # caminho anterior: uma consulta depois da outra com o cliente síncrono
+        monkeypatch.setattr(arxiv_client, "ARXIV_API_URL", server.url)
+        started = time.perf_counter()
+        serial_results = [arxiv_client.fetch_arxiv_documents(q, 3) for q in queries]
+        serial = time.perf_counter() - started
+
+    assert [len(r) for r in results] == [3] * len(queries)
+    assert results == serial_results
+    print(f"\n8 consultas: concorrente {concurrent:.2f}s, serial {serial:.2f}s ({serial / concurrent:.1f}x)")
+    assert serial >= 8 * 0.2
+    assert concurrent < serial / 3
+
+def test_per_host_limit_caps_simultaneous_requests():
+    with StubArxivServer(delay=0.05) as server:
+        asyncio.run(_fetch_all(_collector(server, per_host_limit=2), [f"q{i}" for i in range(6)]))
+    assert server.requests == 6
+    assert server.max_in_flight <= 2
+
+def test_retries_transient_errors_with_backoff():
+    with StubArxivServer(fail_first=2, fail_status=503) as server:
+        [docs] = asyncio.run(_fetch_all(_collector(server, retries=3), ["retry"]))
+    assert len(docs) == 3
+    assert server.requests == 3
+
+def test_does_not_retry_client_errors():
+    with StubArxivServer(fail_first=10, fail_status=404) as server:
+        with pytest.raises(CollectorError):
+            asyncio.run(_fetch_all(_collector(server, retries=3), ["missing"]))
+    assert server.requests == 1
+
+def test_research_queue_fans_out_batch_on_async_collector():
+    queue = ResearchQueue(pool_kind="async", workers=8)
+    batch = [ResearchRequest(f"scheduled {i}", 3, lambda topic, result: None, incremental=False) for i in range(6)]
+    with StubArxivServer(delay=0.2) as server:
+        queue._arxiv_url = server.url
+        try:
+            started = time.perf_counter()
+            results = queue._fetch_all(batch)
+            elapsed = time.perf_counter() - started
+            # o coletor (e suas conexões) é reaproveitado entre lotes
+            assert queue._fetch_all(batch[:1])[0] == results[0]
+        finally:
+            queue._close_collector()
+
+    assert all(isinstance(r, list) and len(r) == 3 for r in results)
+    assert server.max_in_flight > 1
+    assert elapsed < 6 * 0.2 / 2
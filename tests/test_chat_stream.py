@@ -0,0 +1,97 @@
+import json
+import re
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app import create_app
+from app.core import router, services
+
+from fakes import ScriptedChatModel
+
+ANSWER = "Encontrei três artigos sobre redes neurais em grafos na base local."
+
+class _StreamingChatModel(ScriptedChatModel):
+    """ScriptedChatModel que entrega a resposta palavra a palavra, como o streaming do provedor."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages, stop, None, **kwargs).generations[0].message
+        words = re.findall(r"\S+\s*", message.content)
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word, usage_metadata=message.usage_metadata if last else None
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+def _supervisor(model):
+    """Subgrafo no lugar do supervisor; `finish` devolve o histórico inteiro, como o full_history."""
+    def agent(state):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    def finish(state):
+        return {"messages": state["messages"]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("finish", finish)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", "finish")
+    return graph.compile()
+
+def _events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if not block.strip():
+            continue
+        name, data = block.split("\n", 1)
+        event = json.loads(data.removeprefix("data: "))
+        assert name == f"event: {event['type']}"
+        events.append(event)
+    return events
+
+def test_stream_sends_tokens_then_messages_then_one_final(monkeypatch):
+    model = _StreamingChatModel(script=lambda messages, tools: AIMessage(ANSWER))
+    graph = services._build_graph(_supervisor(model))
+    monkeypatch.setattr(services, "get_compiled", lambda: graph)
+    client = create_app().test_client()
+
+    response = client.post("/chat/stream", json={"message": "Quais artigos sobre grafos temos?", "thread_id": "t-sse"})
+    assert response.mimetype == "text/event-stream"
+    events = _events(response)
+
+    types = [e["type"] for e in events]
+    assert types[-1] == "final" and types.count("final") == 1
+    tokens = [e for e in events if e["type"] == "token"]
+    assert len(tokens) == len(ANSWER.split())
+    assert "".join(e["content"] for e in tokens) == ANSWER
+    assert types.index("message") > types.index("token")
+    # a resposta volta no histórico devolvido por `finish`, mas sai uma vez só
+    answers = [e for e in events if e["type"] == "message" and e["content"] == ANSWER]
+    assert len(answers) == 1 and answers[0]["role"] == "ai"
+    assert events[-1] == {"type": "final", "content": ANSWER, "thread_id": "t-sse"}
+    assert len(model.calls) == 1
+
+def test_fast_path_turns_are_kept_in_the_thread_history(monkeypatch):
+    model = _StreamingChatModel(script=lambda messages, tools: AIMessage(ANSWER))
+    graph = services._build_graph(_supervisor(model))
+    monkeypatch.setattr(services, "get_compiled", lambda: graph)
+    results_tool = type("Tool", (), {"invoke": staticmethod(lambda args: "📭 Nenhum resultado de pesquisa agendada.")})
+    monkeypatch.setattr(router, "check_scheduler_results", results_tool)
+    client = create_app().test_client()
+
+    events = _events(client.post("/chat/stream", json={"message": "ver resultados", "thread_id": "t-fast"}))
+    assert events == [{"type": "final", "content": "📭 Nenhum resultado de pesquisa agendada.", "thread_id": "t-fast"}]
+    assert model.calls == []
+
+    client.post("/chat/stream", json={"message": "E sobre grafos, o que temos?", "thread_id": "t-fast"})
+    # a próxima mensagem da thread vê o comando e a resposta do roteador
+    seen = [(m.type, m.content) for m in model.calls[0]["messages"]]
+    assert seen == [
+        ("human", "ver resultados"),
+        ("ai", "📭 Nenhum resultado de pesquisa agendada."),
+        ("human", "E sobre grafos, o que temos?"),
+    ]
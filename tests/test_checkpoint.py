@@ -0,0 +1,117 @@
+import operator
+import sys
+import time
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from app.core.checkpoint import BoundedMemorySaver, check_backend, create_checkpointer
+
+class _State(TypedDict):
+    messages: Annotated[List[str], operator.add]
+
+def _graph(checkpointer):
+    """Grafo mínimo: cada turno acrescenta pergunta e resposta ao histórico."""
+    builder = StateGraph(_State)
+    builder.add_node("reply", lambda state: {"messages": [f"resposta {len(state['messages'])} " + "x" * 200]})
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=checkpointer)
+
+def _chat(graph, thread_id: str) -> None:
+    graph.invoke({"messages": [f"pergunta de {thread_id}"]}, {"configurable": {"thread_id": thread_id}})
+
+def test_memory_stays_flat_over_many_threads():
+    saver = BoundedMemorySaver(max_threads=50, ttl=3600)
+    graph = _graph(saver)
+    samples = []
+    for i in range(3000):
+        _chat(graph, f"soak-{i}")
+        if (i + 1) % 1000 == 0:
+            samples.append(saver.stats())
+
+    print("\n" + "\n".join(f"{(n + 1) * 1000} threads: {s['threads']} ativas, {s['stored_bytes']} bytes" for n, s in enumerate(samples)))
+    assert all(s["threads"] == 50 for s in samples)
+    assert samples[-1]["evicted_threads"] == 3000 - 50
+    assert len(saver.storage) <= 50
+    # platô: depois do primeiro milhar o volume guardado não cresce
+    assert samples[-1]["stored_bytes"] <= samples[0]["stored_bytes"] * 1.05
+
+    # referência: o MemorySaver sem limite guarda todas as threads
+    unbounded = MemorySaver()
+    graph = _graph(unbounded)
+    for i in range(500):
+        _chat(graph, f"unbounded-{i}")
+    assert len(unbounded.storage) == 500
+
+def test_recent_threads_keep_their_history():
+    saver = BoundedMemorySaver(max_threads=3, ttl=3600)
+    graph = _graph(saver)
+    for thread in ("a", "b", "c"):
+        _chat(graph, thread)
+    _chat(graph, "a")  # "a" volta a ser a mais recente
+    _chat(graph, "d")  # descarta "b", a menos usada
+
+    assert len(graph.get_state({"configurable": {"thread_id": "a"}}).values["messages"]) == 4
+    assert "b" not in saver.storage
+    assert saver.stats()["threads"] == 3
+
+def test_idle_threads_expire():
+    saver = BoundedMemorySaver(max_threads=100, ttl=0.05)
+    graph = _graph(saver)
+    _chat(graph, "idle")
+    time.sleep(0.1)
+    _chat(graph, "active")
+
+    assert "idle" not in saver.storage
+    assert saver.stats()["threads"] == 1
+
+def test_sqlite_workers_share_last_access(tmp_path):
+    # dois workers com o mesmo banco de checkpoints
+    path = str(tmp_path / "checkpoints.sqlite3")
+    worker_a = _graph(create_checkpointer(path, max_threads=100, ttl=0.3))
+    saver_b = create_checkpointer(path, max_threads=100, ttl=0.3)
+    worker_b = _graph(saver_b)
+
+    _chat(worker_b, "shared")
+    for _ in range(4):
+        time.sleep(0.1)
+        _chat(worker_a, "shared")  # a conversa continua ativa em outro worker
+    _chat(worker_b, "other")
+
+    history = worker_b.get_state({"configurable": {"thread_id": "shared"}}).values["messages"]
+    assert len(history) == 10
+    assert saver_b.evicted_threads == 0
+
+    time.sleep(0.35)
+    _chat(worker_b, "other")
+    assert worker_a.get_state({"configurable": {"thread_id": "shared"}}).values == {}
+
+def test_sqlite_thread_limit_counts_every_worker(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    worker_a = _graph(create_checkpointer(path, max_threads=3, ttl=3600))
+    saver_b = create_checkpointer(path, max_threads=3, ttl=3600)
+    worker_b = _graph(saver_b)
+
+    for thread in ("a", "b", "c"):
+        _chat(worker_a, thread)
+    _chat(worker_a, "a")
+    _chat(worker_b, "d")  # o worker B descarta "b", a menos usada no conjunto
+
+    assert worker_b.get_state({"configurable": {"thread_id": "b"}}).values == {}
+    assert len(worker_b.get_state({"configurable": {"thread_id": "a"}}).values["messages"]) == 4
+    assert saver_b.stats()["threads"] == 3
+
+def test_configured_sqlite_checkpointer_fails_without_the_package(tmp_path, monkeypatch):
+    # simula o pacote ausente
+    monkeypatch.setitem(sys.modules, "langgraph.checkpoint.sqlite", None)
+    path = str(tmp_path / "checkpoints.sqlite3")
+    with pytest.raises(RuntimeError, match="langgraph-checkpoint-sqlite"):
+        create_checkpointer(path)
+    with pytest.raises(RuntimeError, match="langgraph-checkpoint-sqlite"):
+        check_backend(path)
+    # sem SQLite configurado, memória
+    assert isinstance(create_checkpointer(""), BoundedMemorySaver)
+    check_backend("")
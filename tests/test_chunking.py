@@ -0,0 +1,48 @@
+from collections import Counter
+
+from app.core.tools.chunking import chunk_record
+from app.core.tools.nlp_process import nlp_process_batch
+from app.core.tools.store_in_chromadb import store_documents_batch, store_in_chromadb
+from app.core.write_buffer import write_buffer
+
+def _records():
+    docs = [
+        # página longa: vários chunks
+        {"raw_content": "Graph neural networks aggregate neighbour features in each layer. " * 60,
+         "metadata": {"title": "GNN survey", "url": "http://example.org/gnn"}},
+        {"raw_content": "Message passing generalises convolutions to irregular graphs. " * 5,
+         "metadata": {"title": "Message passing", "url": "http://example.org/mp"}},
+    ]
+    return [item["data"] for item in nlp_process_batch(docs, "web_search")]
+
+def _vectors_per_document(store) -> Counter:
+    return Counter(doc.metadata["content_hash"] for doc in store.docs.values())
+
+def test_storing_the_same_document_twice_upserts_its_chunks(fake_backends):
+    records = _records()
+    expected = {r["content_hash"]: len(chunk_record(r)[0]) for r in records}
+    assert sorted(expected.values())[-1] > 1
+
+    assert store_documents_batch(records) == list(expected.values())
+    write_buffer.flush()
+    assert _vectors_per_document(fake_backends) == expected
+
+    # reingestão (lote seguinte e ferramenta do agente): mesmos ids, nenhum vetor a mais
+    store_documents_batch(records)
+    write_buffer.flush()
+    for record in records:
+        assert store_in_chromadb.invoke({"processed_data": record}).startswith("✅")
+    write_buffer.flush()
+
+    assert fake_backends.add_calls == 3
+    assert _vectors_per_document(fake_backends) == expected
+    assert len(fake_backends.docs) == sum(expected.values())
+
+def test_duplicates_within_a_batch_are_written_once(fake_backends):
+    records = _records()
+    store_documents_batch(records + records)
+    write_buffer.add(*chunk_record(records[0]))
+    write_buffer.flush()
+
+    assert fake_backends.add_calls == 1
+    assert _vectors_per_document(fake_backends) == {r["content_hash"]: len(chunk_record(r)[0]) for r in records}
@@ -0,0 +1,47 @@
+import os
+import random
+import subprocess
+import sys
+
+from app.core.dedup_index import CONTENT_HASH, LINK, DedupIndex
+from app.core.near_duplicate import NearDuplicateIndex
+
+def test_keys_added_by_another_worker_are_seen(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    worker_a, worker_b = DedupIndex(path), DedupIndex(path)
+    assert worker_b.contains_many(LINK, ["http://arxiv.org/abs/1", "http://arxiv.org/abs/2"]) == [False, False]
+
+    worker_a.add_many(LINK, ["http://arxiv.org/abs/1", "http://arxiv.org/abs/3"])
+    worker_a.add(CONTENT_HASH, "abc")
+
+    # o Bloom do worker B é completado com o que o A gravou
+    assert worker_b.contains_many(LINK, ["http://arxiv.org/abs/1", "http://arxiv.org/abs/2"]) == [True, False]
+    assert worker_b.contains(CONTENT_HASH, "abc")
+    assert f"{LINK}:http://arxiv.org/abs/3" in worker_b._bloom
+
+    # chaves repetidas não entram de novo no log
+    worker_b.add_many(LINK, ["http://arxiv.org/abs/1", "http://arxiv.org/abs/2"])
+    log = worker_b._conn.execute("SELECT COUNT(*) FROM seen_log").fetchone()[0]
+    assert log == 4
+    assert worker_a.contains(LINK, "http://arxiv.org/abs/2")
+
+def test_near_duplicates_stored_by_another_worker_are_found(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    worker_a, worker_b = NearDuplicateIndex(path), NearDuplicateIndex(path)
+    rng = random.Random(4)
+    text = " ".join(f"term{rng.randrange(3000)}" for _ in range(150))
+    assert worker_b.query(worker_b.signature(text)) is None
+
+    worker_a.add_many([("hash-a", worker_a.signature(text))])
+    edited = text.replace(text.split()[10], "changed", 1)
+
+    match = worker_b.query(worker_b.signature(edited))
+    assert match is not None and match[0] == "hash-a"
+    assert len(worker_b) == 1
+
+def test_importing_the_module_creates_no_state(tmp_path):
+    path = tmp_path / "dedup.sqlite3"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, SAPIEN_DEDUP_DB=str(path))
+    subprocess.run([sys.executable, "-c", "import app.core.dedup_index, app.core.shared_state"], cwd=root, env=env, check=True)
+    assert not path.exists()
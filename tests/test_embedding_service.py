@@ -0,0 +1,47 @@
+from app import create_app
+from app.core.embedding_service import embedding_service
+from app.core.tools.ingest_pipeline import ingest_documents
+from app.core.write_buffer import write_buffer
+
+from fakes import RecordingVectorStore
+
+def _paper(n: int) -> dict:
+    title = f"Graph neural networks for molecule {n}"
+    return {
+        "raw_content": f"We study graph neural networks for molecule {n} property prediction. " * 4,
+        "metadata": {
+            "title": title, "authors": "Author", "year": "2024",
+            "link": f"http://arxiv.org/abs/embedding-{n}v1", "source": "arxiv", "search_query": title,
+        },
+    }
+
+def test_storage_reuses_the_vectors_computed_by_validation(fake_backends, monkeypatch):
+    encoder = embedding_service.model  # HashingEncoder instalado pela fixture
+    store = RecordingVectorStore(embedding=embedding_service)
+    monkeypatch.setattr(write_buffer, "_get_store", lambda: store)
+    for counter in ("hits", "misses", "evictions"):
+        monkeypatch.setattr(embedding_service, counter, 0)
+
+    outcomes = ingest_documents([_paper(n) for n in range(6)], source_type="arxiv", similarity_threshold=0.3)
+    assert [o.status for o in outcomes] == ["stored"] * 6
+    # validação: conteúdos (e tópicos ainda não vistos) codificados uma vez
+    validation_texts = encoder.texts
+    assert embedding_service.stats()["misses"] == validation_texts
+    assert embedding_service.stats()["hits"] == 0
+
+    # armazenamento: o vectorstore pede os vetores dos mesmos textos (um chunk por artigo)
+    write_buffer.flush()
+    assert len(store.docs) == 6
+    assert encoder.texts == validation_texts
+    assert embedding_service.stats()["hits"] == 6
+
+    # cache cheio: textos novos tiram os mais antigos
+    monkeypatch.setattr(embedding_service, "cache_size", embedding_service.stats()["size"])
+    embedding_service.encode(["texto novo um", "texto novo dois"])
+
+    stats = create_app().test_client().get("/embeddings/stats").get_json()
+    assert stats == embedding_service.stats()
+    assert stats["hits"] == 6
+    assert stats["misses"] == validation_texts + 2
+    assert stats["evictions"] == 2
+    assert encoder.texts == validation_texts + 2
@@ -0,0 +1,119 @@
+import asyncio
+import functools
+import json
+import time
+import tracemalloc
+
+import ingest
+from app.core.tools.arxiv_client import ArxivFeedParser, parse_arxiv_entries
+from app.core.tools.async_collector import AsyncCollector
+from app.core.write_buffer import write_buffer
+
+from fakes import StubArxivServer, atom_feed
+
+def _count_streamed(path: str, query: str) -> int:
+    """Consome a unidade de arquivo como o backfill, sem reter os lotes."""
+    unit = (f"file|{path}", "arxiv", query, path)
+
+    async def read():
+        count = 0
+        async for docs in ingest.unit_documents(None, unit, page_size=0):
+            count += len(docs)
+        return count
+
+    return asyncio.run(read())
+
+def test_feed_parser_matches_full_parse_in_chunks():
+    content = atom_feed("chunked feed", 2000)
+    parser = ArxivFeedParser("chunked feed")
+    yields = []
+    for offset in range(0, len(content), 4096):
+        yields.append(parser.feed(content[offset:offset + 4096]))
+    yields.append(parser.close())
+
+    streamed = [doc for docs in yields for doc in docs]
+    assert streamed == parse_arxiv_entries(content, "chunked feed")
+    # as entradas saem à medida que os pedaços chegam
+    assert sum(1 for docs in yields if docs) > 100
+
+def test_file_units_stream_with_bounded_memory(tmp_path):
+    path = tmp_path / "large_feed.xml"
+    path.write_bytes(atom_feed("large feed", 2000))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    full = parse_arxiv_entries(path.read_bytes(), "large feed")
+    full_seconds = time.perf_counter() - started
+    _, full_peak = tracemalloc.get_traced_memory()
+    del full
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    count = _count_streamed(str(path), "large feed")
+    stream_seconds = time.perf_counter() - started
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"\n2000 entradas: corpo inteiro {full_seconds:.2f}s / pico {full_peak / 1e6:.1f} MB,"
+        f" em pedaços {stream_seconds:.2f}s / pico {stream_peak / 1e6:.1f} MB"
+    )
+    assert count == 2000
+    assert stream_peak < full_peak / 2
+
+def test_backfill_ingests_streamed_pages_in_batches(fake_backends, tmp_path, monkeypatch):
+    queries = tmp_path / "queries.txt"
+    queries.write_text("streamed backfill\n", encoding="utf-8")
+    checkpoint = tmp_path / "checkpoint.json"
+    batches = []
+    ingest_batch = ingest.ingest_batch
+
+    def recording_batch(source, documents, batch_size, stats):
+        batches.append(len(documents))
+        return ingest_batch(source, documents, batch_size, stats)
+
+    monkeypatch.setattr(ingest, "ingest_batch", recording_batch)
+    monkeypatch.setattr(ingest, "get_vectorstore", lambda: fake_backends)
+    with StubArxivServer() as server:
+        monkeypatch.setattr(ingest, "AsyncCollector", functools.partial(AsyncCollector, arxiv_url=server.url))
+        ingest.main([
+            "--queries", str(queries), "--max-results", "400", "--page-size", "200",
+            "--batch-size", "50", "--checkpoint", str(checkpoint),
+        ])
+
+    assert batches == [50] * 8
+    links = {doc.metadata["link"] for doc in fake_backends.docs.values()}
+    assert len(links) == 400
+    assert json.loads(checkpoint.read_text())["done"] == [
+        "arxiv|streamed backfill|0", "arxiv|streamed backfill|200",
+    ]
+
+def test_resume_after_failed_batch_ingests_only_the_missing_documents(fake_backends, tmp_path, monkeypatch, capsys):
+    responses = tmp_path / "responses"
+    responses.mkdir()
+    (responses / "resumed_feed.xml").write_bytes(atom_feed("resumed feed", 200))
+    checkpoint = tmp_path / "checkpoint.json"
+    argv = ["--responses-dir", str(responses), "--batch-size", "50", "--checkpoint", str(checkpoint)]
+    monkeypatch.setattr(ingest, "get_vectorstore", lambda: fake_backends)
+
+    calls = []
+    original_add = write_buffer.add
+
+    def add_failing_third_batch(docs, ids):
+        calls.append(len(docs))
+        if len(calls) == 3:
+            raise OSError("processo encerrado no meio do lote")
+        return original_add(docs, ids)
+
+    monkeypatch.setattr(write_buffer, "add", add_failing_third_batch)
+    ingest.main(argv)
+    assert "error=50" in capsys.readouterr().out
+    assert not checkpoint.exists()
+    assert len(fake_backends.docs) == 150
+
+    monkeypatch.setattr(write_buffer, "add", original_add)
+    ingest.main(argv)
+    out = capsys.readouterr().out
+    # os 150 já gravados são descartados pela deduplicação; só o lote perdido volta
+    assert "200 documentos (stored=50)" in out
+    assert len(fake_backends.docs) == 200
+    assert json.loads(checkpoint.read_text())["done"] == [f"file|{responses / 'resumed_feed.xml'}"]
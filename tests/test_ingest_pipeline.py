@@ -0,0 +1,54 @@
+from app.core.shared_state import are_hashes_processed
+from app.core.tools.ingest_pipeline import ingest_documents
+from app.core.tools.simple_arxiv_search import ARXIV_SIMILARITY_THRESHOLD, filter_new_arxiv_documents
+from app.core.write_buffer import write_buffer
+
+def _paper(slug: str, title: str, summary: str) -> dict:
+    return {
+        "raw_content": summary,
+        "metadata": {
+            "title": title,
+            "authors": "Author",
+            "year": "2024",
+            "link": f"http://arxiv.org/abs/{slug}v1",
+            "source": "arxiv",
+            "search_query": title,
+        },
+    }
+
+def _on_topic(slug: str) -> dict:
+    title = f"Quantum annealing schedules {slug}"
+    return _paper(slug, title, f"We study quantum annealing schedules {slug} in detail. " * 8)
+
+def _off_topic(slug: str) -> dict:
+    return _paper(slug, f"Quantum annealing schedules {slug}", "Bread dough needs flour, water, salt and yeast to rise. " * 8)
+
+def _ingest(docs):
+    return ingest_documents(docs, source_type="arxiv", similarity_threshold=ARXIV_SIMILARITY_THRESHOLD)
+
+def test_only_stored_documents_are_marked_as_processed(fake_backends):
+    stored, rejected = _on_topic("mark-stored"), _off_topic("mark-rejected")
+    outcomes = _ingest([stored, rejected])
+
+    assert [o.status for o in outcomes] == ["stored", "rejected"]
+    assert are_hashes_processed([o.content_hash for o in outcomes]) == [True, False]
+    # o artigo rejeitado pode ser tentado de novo; o armazenado não
+    assert filter_new_arxiv_documents([stored, rejected]) == [rejected]
+
+def test_failed_store_leaves_documents_retryable(fake_backends, monkeypatch):
+    doc = _on_topic("store-fails")
+    original_add = write_buffer.add
+
+    def broken_add(docs, ids):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(write_buffer, "add", broken_add)
+    [outcome] = _ingest([doc])
+
+    assert outcome.status == "error"
+    assert are_hashes_processed([outcome.content_hash]) == [False]
+    assert filter_new_arxiv_documents([doc]) == [doc]
+
+    monkeypatch.setattr(write_buffer, "add", original_add)
+    [outcome] = _ingest([doc])
+    assert outcome.status == "stored"
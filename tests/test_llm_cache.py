@@ -0,0 +1,40 @@
+import logging
+
+from langchain_core.messages import AIMessage
+
+from app.core.embedding_service import embedding_service
+from app.core.llm_cache import SQLiteLLMCache
+from app.core.llm_client import LLMGuard, ResilientChatModel, TokenBucket
+
+from fakes import ScriptedChatModel
+
+def _model():
+    fake = ScriptedChatModel(script=lambda messages, tools: AIMessage(f"resposta {len(fake.calls)}"))
+    cache = SQLiteLLMCache(":memory:", mode="cache", semantic=True, threshold=0.8)
+    guard = LLMGuard(bucket=TokenBucket(rate=0), sleep=lambda s: None)
+    return fake, ResilientChatModel(inner=fake, guard=guard, cache=cache)
+
+def test_similar_question_in_the_same_context_is_a_semantic_hit(fake_backends):
+    fake, model = _model()
+    assert model.invoke([("user", "quais artigos sobre redes neurais em grafos temos")]).content == "resposta 1"
+    # mesma pergunta com outra pontuação e caixa: vetor igual
+    assert model.invoke([("user", "Quais artigos sobre redes neurais em grafos temos?")]).content == "resposta 1"
+    assert model.invoke([("user", "como está o tempo hoje")]).content == "resposta 2"
+    assert len(fake.calls) == 2
+
+def test_embedding_failure_is_a_miss_not_an_error(fake_backends, monkeypatch, caplog):
+    fake, model = _model()
+    model.invoke([("user", "quais artigos sobre redes neurais em grafos temos")])
+
+    def broken_encode(texts):
+        raise RuntimeError("modelo de embeddings indisponível")
+
+    monkeypatch.setattr(embedding_service, "encode", broken_encode)
+    with caplog.at_level(logging.WARNING, logger="app.core.llm_cache"):
+        answer = model.invoke([("user", "Quais artigos sobre redes neurais em grafos temos?")])
+
+    assert answer.content == "resposta 2"
+    assert len(fake.calls) == 2
+    assert "cache semântico do LLM indisponível" in caplog.text
+    # o cache exato continua respondendo
+    assert model.invoke([("user", "quais artigos sobre redes neurais em grafos temos")]).content == "resposta 1"
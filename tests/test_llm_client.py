@@ -0,0 +1,155 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core.llm_client import CircuitBreaker, LLMGuard, LLMUnavailableError, ResilientChatModel, TokenBucket
+
+from fakes import ScriptedChatModel
+
+class _APIError(Exception):
+    """Erro no formato dos clientes HTTP da Anthropic (status_code e headers da resposta)."""
+
+    def __init__(self, status: int, retry_after: str = None):
+        super().__init__(f"Error code: {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(status_code=status, headers={"retry-after": retry_after} if retry_after else {})
+
+def _failing(errors, answer: str = "ok"):
+    """Script que levanta os erros da lista, um por chamada, e depois responde."""
+    errors = list(errors)
+    lock = threading.Lock()
+
+    def script(messages, tools):
+        with lock:
+            error = errors.pop(0) if errors else None
+        if error is not None:
+            raise error
+        return AIMessage(answer)
+    return script
+
+def _model(script, sleeps=None, **guard_options):
+    guard_options.setdefault("bucket", TokenBucket(rate=0))
+    guard = LLMGuard(sleep=(sleeps.append if sleeps is not None else (lambda s: None)), **guard_options)
+    fake = ScriptedChatModel(script=script)
+    return fake, ResilientChatModel(inner=fake, guard=guard)
+
+def test_overloaded_calls_are_retried_with_backoff():
+    sleeps = []
+    fake, model = _model(_failing([_APIError(529), _APIError(429)]), sleeps, max_retries=4)
+
+    assert model.invoke("oi").content == "ok"
+    assert len(fake.calls) == 3
+    # exponencial com jitter: entre metade e o valor cheio de 1s, 2s
+    assert 0.5 <= sleeps[0] <= 1.0
+    assert 1.0 <= sleeps[1] <= 2.0
+
+def test_retry_after_is_respected():
+    sleeps = []
+    _, model = _model(_failing([_APIError(429, retry_after="7")]), sleeps)
+    model.invoke("oi")
+    assert sleeps[0] >= 7
+
+def test_request_errors_are_not_retried_nor_open_the_breaker():
+    sleeps = []
+    breaker = CircuitBreaker(failure_threshold=1)
+    fake, model = _model(_failing([_APIError(400)]), sleeps, breaker=breaker)
+
+    with pytest.raises(_APIError):
+        model.invoke("oi")
+    assert len(fake.calls) == 1
+    assert sleeps == []
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_breaker_fails_fast_and_recovers_after_probe():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    fake, model = _model(_failing([_APIError(529)] * 3), max_retries=0, breaker=breaker)
+
+    for _ in range(3):
+        with pytest.raises(_APIError):
+            model.invoke("oi")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # circuito aberto: falha na hora, sem chamar a API
+    started = time.perf_counter()
+    with pytest.raises(LLMUnavailableError):
+        model.invoke("oi")
+    assert time.perf_counter() - started < 0.05
+    assert len(fake.calls) == 3
+
+    time.sleep(0.12)
+    assert model.invoke("oi").content == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_breaker_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    breaker.before_call()  # chamada de teste
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_concurrency_is_bounded_and_queue_timeout_fails_fast():
+    running = []
+    peak = []
+    release = threading.Event()
+    lock = threading.Lock()
+
+    def slow(messages, tools):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        release.wait(2)
+        with lock:
+            running.pop()
+        return AIMessage("ok")
+
+    _, model = _model(slow, max_concurrency=2, queue_timeout=0.2)
+    results = []
+
+    def call():
+        try:
+            results.append(model.invoke("oi").content)
+        except LLMUnavailableError as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert results.count("ok") == 2
+    # as que esperaram além de queue_timeout falharam sem chegar à API
+    assert sum(isinstance(r, LLMUnavailableError) for r in results) == 3
+
+def test_throttled_burst_succeeds_with_retries():
+    # a API recusa as 10 primeiras chamadas da rajada com 529
+    fake, model = _model(_failing([_APIError(529)] * 10), max_retries=10, max_concurrency=4)
+    model.guard.breaker = CircuitBreaker(failure_threshold=100)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(model.invoke("oi").content)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ok"] * 8
+    assert len(fake.calls) == 18
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=50, capacity=2)
+    started = time.perf_counter()
+    for _ in range(7):
+        assert bucket.acquire()
+    # 2 da rajada e 5 a 50/s
+    assert time.perf_counter() - started >= 0.09
+    empty = TokenBucket(rate=1, capacity=1)
+    empty.acquire()
+    assert not empty.acquire(timeout=0.01)
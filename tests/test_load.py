@@ -0,0 +1,96 @@
+"""
+Teste de carga do /chat com um LLM falso.
+
+O app sobe num servidor WSGI com threads (como os workers gthread do
+gunicorn) e recebe conversas de 1, 8 e 32 usuários simultâneos; cada
+chamada ao LLM falso leva LLM_LATENCY segundos. Imprime p50/p99 e
+requisições por segundo em cada nível:
+
+    python -m pytest tests/test_load.py -s
+"""
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.messages import AIMessage
+from werkzeug.serving import make_server
+
+from app import create_app
+from app.core import agents, services
+from app.core.llm_client import LLMGuard, ResilientChatModel, TokenBucket
+
+from fakes import ScriptedChatModel
+
+LLM_LATENCY = 0.05
+ANSWER = "Encontrei três artigos sobre redes neurais em grafos na base local, de 2021 a 2024."
+# (usuários simultâneos, mensagens por usuário)
+LEVELS = [(1, 12), (8, 6), (32, 3)]
+
+def _script(messages, tools):
+    time.sleep(LLM_LATENCY)
+    if "transfer_to_retrieval_agent" in tools:
+        if any(m.type == "ai" and m.content == ANSWER for m in messages):
+            return AIMessage(f"Resumo: {ANSWER}")
+        return AIMessage("", tool_calls=[{"name": "transfer_to_retrieval_agent", "args": {}, "id": "call-transfer"}])
+    return AIMessage(ANSWER)
+
+def _post(url: str, message: str) -> float:
+    request = urllib.request.Request(
+        url, data=json.dumps({"message": message}).encode(), headers={"Content-Type": "application/json"}
+    )
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        body = json.loads(response.read())
+    elapsed = time.perf_counter() - started
+    assert body["responses"] == f"Resumo: {ANSWER}"
+    return elapsed
+
+def _level(url: str, users: int, per_user: int) -> dict:
+    def user(n):
+        return [_post(url, f"Quais artigos sobre grafos temos na base? (usuário {n})") for _ in range(per_user)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        latencies = [t for times in pool.map(user, range(users)) for t in times]
+    wall = time.perf_counter() - started
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "rps": len(latencies) / wall,
+    }
+
+def test_chat_throughput_at_1_8_32_users(monkeypatch):
+    fake = ScriptedChatModel(script=_script)
+    guard = LLMGuard(bucket=TokenBucket(rate=0), max_concurrency=64, sleep=lambda s: None)
+    monkeypatch.setattr(agents, "get_llm", lambda: ResilientChatModel(inner=fake, guard=guard))
+    graph = services._build_graph(agents._build_supervisor())
+    monkeypatch.setattr(services, "get_compiled", lambda: graph)
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}/chat"
+    try:
+        _post(url, "aquecimento")
+        results = [_level(url, users, per_user) for users, per_user in LEVELS]
+    finally:
+        server.shutdown()
+        thread.join()
+
+    print(f"\nLLM falso: {LLM_LATENCY * 1000:.0f} ms por chamada, 3 chamadas por mensagem")
+    for r in results:
+        print(
+            f"{r['users']:>2} usuários: {r['requests']:>3} req, p50 {r['p50'] * 1000:.0f} ms,"
+            f" p99 {r['p99'] * 1000:.0f} ms, {r['rps']:.1f} req/s"
+        )
+    by_users = {r["users"]: r for r in results}
+    # as conversas são atendidas em paralelo, não uma de cada vez
+    assert by_users[8]["rps"] > 3 * by_users[1]["rps"]
+    # com 32 usuários um processo satura na CPU (GIL): a vazão se mantém, a latência cresce;
+    # acima disso, mais workers (SAPIEN_WEB_WORKERS)
+    assert by_users[32]["rps"] >= 0.7 * by_users[8]["rps"]
@@ -0,0 +1,118 @@
+import json
+import math
+import re
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app import create_app
+from app.core import metrics as metrics_module
+from app.core import services
+from app.core.metrics import MetricsRegistry, timed
+
+from fakes import ScriptedChatModel
+
+_SAMPLE = re.compile(r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$")
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+def _parse(text: str):
+    """Amostras do formato texto do Prometheus: (nome, rótulos, valor); falha em linhas inválidas."""
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+            continue
+        if line.startswith("# HELP ") or not line:
+            continue
+        m = _SAMPLE.match(line)
+        assert m, f"linha inválida: {line!r}"
+        labels = dict(_LABEL.findall(m.group("labels") or ""))
+        samples.append((m.group("name"), labels, float(m.group("value"))))
+    return types, samples
+
+def _series(samples, name, **labels):
+    return [(l, v) for n, l, v in samples if n == name and all(l.get(k) == w for k, w in labels.items())]
+
+def test_histogram_buckets_are_cumulative_and_labels_escaped():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Duração.", ["stage"], buckets=(0.1, 1.0))
+    counter = registry.counter("test_total", "Total.", ["stage"])
+    stage = 'tool:"busca"\nnova'
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, stage=stage)
+    counter.inc(3, stage=stage)
+
+    types, samples = _parse(registry.render_prometheus())
+    assert types == {"test_seconds": "histogram", "test_total": "counter"}
+    buckets = _series(samples, "test_seconds_bucket")
+    # o limite do bucket é inclusivo (le): 0.1 cai em le="0.1"
+    assert [(l["le"], v) for l, v in buckets] == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    # o valor escapado volta ao original
+    assert all(l["stage"].encode().decode("unicode_escape") == stage for l, _ in buckets)
+    assert _series(samples, "test_seconds_count") == [({"stage": buckets[0][0]["stage"]}, 4)]
+    assert math.isclose(_series(samples, "test_seconds_sum")[0][1], 5.65)
+    assert _series(samples, "test_total")[0][1] == 3
+
+def _graph():
+    model = ScriptedChatModel(script=lambda messages, tools: AIMessage("Encontrei três artigos sobre grafos na base local."))
+
+    def call_model(state):
+        with timed("embeddings", items=2):
+            pass
+        return {"messages": [model.invoke(state["messages"])]}
+
+    supervisor = StateGraph(MessagesState)
+    supervisor.add_node("agent", call_model)
+    supervisor.add_edge(START, "agent")
+    graph = StateGraph(MessagesState)
+    graph.add_node("supervisor", supervisor.compile())
+    graph.add_edge(START, "supervisor")
+    return graph.compile()
+
+def test_metrics_endpoint_and_trace_dump(monkeypatch, tmp_path):
+    monkeypatch.setattr(services, "get_compiled", _graph)
+    monkeypatch.setattr(metrics_module, "TRACE_ENABLED", True)
+    monkeypatch.setattr(metrics_module, "TRACE_DIR", str(tmp_path))
+    client = create_app().test_client()
+
+    response = client.post("/chat", json={"message": "Quais artigos sobre grafos temos?", "thread_id": "t-metrics"})
+    assert response.get_json()["responses"].startswith("Encontrei")
+    client.post("/chat", json={"message": "ver resultados"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain" and "version=0.0.4" in response.content_type
+    types, samples = _parse(response.get_data(as_text=True))
+    assert types["sapien_stage_seconds"] == "histogram"
+    assert types["sapien_chat_requests_total"] == "counter"
+
+    # toda série de histograma: `le` crescente, terminando em +Inf igual a _count
+    for name in (n for n, kind in types.items() if kind == "histogram"):
+        by_series = {}
+        for labels, value in _series(samples, f"{name}_bucket"):
+            key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+            by_series.setdefault(key, []).append((float(labels["le"]), value))
+        for key, buckets in by_series.items():
+            assert [le for le, _ in buckets] == sorted(le for le, _ in buckets)
+            assert buckets[-1][0] == math.inf
+            assert [v for _, v in buckets] == sorted(v for _, v in buckets)
+            assert _series(samples, f"{name}_count", **dict(key))[0][1] == buckets[-1][1]
+
+    assert _series(samples, "sapien_chat_requests_total", path="fast")[0][1] >= 1
+    assert _series(samples, "sapien_chat_seconds_bucket", path="graph", le="+Inf")[0][1] >= 1
+    assert _series(samples, "sapien_stage_seconds_count", stage="llm")[0][1] >= 1
+    assert _series(samples, "sapien_llm_calls_total", agent="agent")[0][1] >= 1
+
+    # um arquivo por mensagem em SAPIEN_TRACE_DIR
+    traces = [json.loads(p.read_text(encoding="utf-8")) for p in tmp_path.glob("*.json")]
+    assert len(traces) == 2
+    [graph_trace] = [t for t in traces if t["thread_id"] == "t-metrics"]
+    assert graph_trace["name"] == "chat" and graph_trace["seconds"] > 0
+    assert [s["stage"] for s in graph_trace["spans"]] == ["embeddings", "llm"]
+    embeddings, llm = graph_trace["spans"]
+    assert embeddings["items"] == 2
+    assert llm["agent"] == "agent" and llm["input"] > 0 and llm["output"] > 0
+    [fast_trace] = [t for t in traces if t["thread_id"] != "t-metrics"]
+    assert fast_trace["spans"] == []
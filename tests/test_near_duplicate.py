@@ -0,0 +1,115 @@
+import random
+import sqlite3
+import time
+
+import numpy as np
+
+from app.core.embedding_service import embedding_service
+from app.core.near_duplicate import NearDuplicateIndex
+from app.core.tools import validate_content as validate_module
+from app.core.tools.nlp_process import nlp_process_batch
+from app.core.tools.validate_content import validate_batch
+
+_VOCABULARY = [f"term{i}" for i in range(3000)]
+
+def _text(rng: random.Random, words: int = 150) -> str:
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+
+def _edit(rng: random.Random, text: str, changes: int = 3) -> str:
+    """Versão levemente editada (ex.: v2 de um resumo), com algumas palavras trocadas."""
+    words = text.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(_VOCABULARY)
+    return " ".join(words)
+
+def _index_with(texts) -> NearDuplicateIndex:
+    index = NearDuplicateIndex(":memory:")
+    index.add_many([(f"orig-{i}", index.signature(t)) for i, t in enumerate(texts)])
+    return index
+
+def test_lsh_finds_edited_copies_without_false_positives():
+    rng = random.Random(1)
+    originals = [_text(rng) for _ in range(500)]
+    index = _index_with(originals)
+
+    edited = [(i, _edit(rng, originals[i])) for i in rng.sample(range(500), 200)]
+    hits = [index.query(index.signature(text)) for _, text in edited]
+    recall = sum(1 for (i, _), hit in zip(edited, hits) if hit and hit[0] == f"orig-{i}") / len(edited)
+
+    fresh = [_text(rng) for _ in range(200)]
+    false_positives = sum(1 for text in fresh if index.query(index.signature(text)) is not None)
+
+    print(f"\nrevocação {recall:.1%}, falsos positivos {false_positives}/200")
+    assert recall >= 0.95
+    assert false_positives == 0
+
+def _records(texts, slug):
+    docs = [
+        {"raw_content": text, "metadata": {"title": "term1 term2", "link": f"http://example.org/{slug}-{i}"}}
+        for i, text in enumerate(texts)
+    ]
+    return [item["data"] for item in nlp_process_batch(docs, "web_search")]
+
+def _search_seconds(matrix: np.ndarray, queries: np.ndarray, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        np.argsort(-(queries @ matrix.T), axis=1)[:, :5]
+    return (time.perf_counter() - started) / repeat
+
+def test_near_duplicates_are_rejected_before_embedding(fake_backends, monkeypatch):
+    rng = random.Random(2)
+    stored = [_text(rng) for _ in range(600)]
+    # lote novo: 200 inéditos e 200 cópias editadas de artigos já armazenados
+    incoming = [_text(rng) for _ in range(200)] + [_edit(rng, t) for t in rng.sample(stored, 200)]
+    records = _records(incoming, "incoming")
+    encoder = embedding_service.model  # HashingEncoder instalado pela fixture
+
+    accepted = {}
+    embedded = {}
+    for label, index in (("sem MinHash", NearDuplicateIndex(":memory:", threshold=1.01)), ("com MinHash", _index_with(stored))):
+        monkeypatch.setattr(validate_module, "get_near_duplicate_index", lambda: index)
+        embedding_service.clear_cache()
+        texts = encoder.texts
+        started = time.perf_counter()
+        outcomes = validate_batch(records, threshold=0.0)
+        seconds = time.perf_counter() - started
+        accepted[label] = [r for r, o in zip(records, outcomes) if o["valid"]]
+        embedded[label] = encoder.texts - texts
+        print(
+            f"\n{label}: {len(accepted[label])} aceitos de {len(records)},"
+            f" {embedded[label]} textos codificados, {seconds * 1000:.0f} ms"
+        )
+
+    assert len(accepted["sem MinHash"]) == 400
+    assert len(accepted["com MinHash"]) <= 205
+    # as cópias são descartadas antes do embedding
+    assert embedded["com MinHash"] <= embedded["sem MinHash"] - 195
+    # os aceitos são os inéditos (os 200 primeiros do lote)
+    assert all(int(r["metadata"]["link"].rsplit("-", 1)[1]) < 200 for r in accepted["com MinHash"])
+
+    # espaço da coleção e tempo de busca por similaridade (força bruta) após a ingestão
+    base = encoder.encode(stored)
+    queries = encoder.encode([_text(rng) for _ in range(200)])
+    for label, records_in in accepted.items():
+        matrix = np.vstack([base, encoder.encode([r["content"] for r in records_in])])
+        print(
+            f"{label}: {len(matrix)} vetores, {matrix.nbytes / 1024:.0f} KiB,"
+            f" busca {_search_seconds(matrix, queries) * 1000:.1f} ms"
+        )
+
+def test_signatures_stored_before_the_bucket_table_are_indexed(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    rng = random.Random(3)
+    text = _text(rng)
+    # arquivo da versão anterior: só a tabela de assinaturas
+    signature = NearDuplicateIndex(":memory:").signature(text)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE minhash (content_hash TEXT PRIMARY KEY, signature BLOB NOT NULL)")
+    conn.execute("INSERT INTO minhash VALUES (?, ?)", ("old-hash", signature.tobytes()))
+    conn.commit()
+    conn.close()
+
+    index = NearDuplicateIndex(path)
+    match = index.query(index.signature(_edit(rng, text)))
+    assert match is not None and match[0] == "old-hash"
+    assert len(index) == 1
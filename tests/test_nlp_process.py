@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import random
+import re
+import time
+
+from app.core.dedup_index import BOOTSTRAP_VERSION, CONTENT_HASH, LINK, DedupIndex, join_chunks
+from app.core.tools.chunking import chunk_record
+from app.core.tools.nlp_process import content_hash_of, detect_language, nlp_process_batch, process_content
+
+from fakes import RecordingVectorStore
+
+_WORDS = (
+    "graph neural networks learn representations of nodes and edges we propose a method "
+    "that improves the accuracy on benchmark datasets with fewer parameters than previous work"
+).split()
+
+def _abstract(rng: random.Random, words: int = 180) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return f"{text}.\n\n  Results: {rng.random():.4f} — see §3 (µ-scale)."
+
+def _legacy_process(raw_content: str) -> dict:
+    """Implementação anterior do nlp_process (MD5 e idioma por substring)."""
+    normalized = re.sub(r'\s+', ' ', raw_content.strip())
+    normalized = re.sub(r'[^\w\s.,;:!?()-]', '', normalized)
+    return {
+        "content": normalized,
+        "word_count": len(normalized.split()),
+        "content_hash": hashlib.md5(normalized.encode()).hexdigest(),
+        "language": "pt" if any(word in normalized.lower() for word in ["de", "da", "do", "para", "com"]) else "en",
+    }
+
+def test_batch_nlp_beats_previous_implementation_on_10k_abstracts():
+    rng = random.Random(7)
+    documents = [{"raw_content": _abstract(rng), "metadata": {"title": f"paper {i}"}} for i in range(10_000)]
+
+    started = time.perf_counter()
+    legacy = [_legacy_process(d["raw_content"]) for d in documents]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = nlp_process_batch(documents, "arxiv")
+    batch_seconds = time.perf_counter() - started
+
+    print(f"\n10k resumos: anterior {legacy_seconds:.2f}s, em lote {batch_seconds:.2f}s ({legacy_seconds / batch_seconds:.1f}x)")
+    assert all(r["error"] is None for r in results)
+    assert [r["data"]["metadata"]["word_count"] for r in results] == [l["word_count"] for l in legacy]
+    assert {r["data"]["metadata"]["language"] for r in results} == {"en"}
+    assert batch_seconds < legacy_seconds
+
+def test_language_detection_uses_whole_tokens():
+    assert detect_language("The model is trained on data from the dataset and evaluated") == "en"
+    assert detect_language("O modelo é treinado com os dados para a avaliação de desempenho") == "pt"
+
+def test_join_chunks_restores_split_content():
+    rng = random.Random(3)
+    for _ in range(50):
+        record = process_content(_abstract(rng, words=rng.randint(200, 900)), {"link": "x"}, "web_search")
+        docs, _ = chunk_record(record)
+        assert join_chunks([d.page_content for d in docs]) == record["content"]
+
+def _legacy_store(rng: random.Random, store: RecordingVectorStore, slug: str, words: int) -> str:
+    """Grava um documento como a versão com MD5 gravava; devolve o hash que o mesmo texto recebe hoje."""
+    raw = _abstract(rng, words)
+    legacy = _legacy_process(raw)
+    record = {
+        "content": legacy["content"],
+        "content_hash": legacy["content_hash"],
+        "metadata": {"link": f"http://example.org/{slug}"},
+        "source_type": "web_search",
+    }
+    docs, ids = chunk_record(record)
+    store.add_documents(docs, ids)
+    return process_content(raw, {}, "web_search")["content_hash"]
+
+def test_bootstrap_rehashes_legacy_md5_content():
+    rng = random.Random(11)
+    store = RecordingVectorStore()
+    current_hashes = [_legacy_store(rng, store, f"doc-{i}", words=rng.choice([60, 700])) for i in range(20)]
+    fresh = process_content(_abstract(rng), {"link": "http://example.org/fresh"}, "web_search")
+    store.add_documents(*chunk_record(fresh))
+    current_hashes.append(fresh["content_hash"])
+
+    index = DedupIndex(":memory:")
+    assert index.bootstrap_from_vectorstore(store, page_size=7) == len(store.docs)
+
+    # o mesmo texto processado hoje é reconhecido como já armazenado
+    assert index.contains_many(CONTENT_HASH, current_hashes) == [True] * len(current_hashes)
+    assert index.contains(LINK, "http://example.org/doc-0")
+    assert index.bootstrap_from_vectorstore(store) == 0
+
+def test_bootstrap_groups_chunks_returned_out_of_order(caplog):
+    rng = random.Random(13)
+    legacy = RecordingVectorStore()
+    current_hashes = [_legacy_store(rng, legacy, f"doc-{i}", words=700) for i in range(10)]
+    broken_hash = _legacy_store(rng, legacy, "broken", words=700)
+
+    # o Chroma não garante os chunks de um documento em sequência; um documento perdeu um chunk
+    items = [
+        (doc_id, doc) for doc_id, doc in legacy.docs.items()
+        if not (doc.metadata["link"] == "http://example.org/broken" and doc.metadata["chunk_index"] == 1)
+    ]
+    rng.shuffle(items)
+    store = RecordingVectorStore()
+    store.docs = dict(items)
+
+    index = DedupIndex(":memory:")
+    with caplog.at_level(logging.WARNING, logger="app.core.dedup_index"):
+        index.bootstrap_from_vectorstore(store, page_size=5)
+
+    assert index.contains_many(CONTENT_HASH, current_hashes) == [True] * len(current_hashes)
+    assert not index.contains(CONTENT_HASH, broken_hash)
+    assert "1 documentos não puderam ser re-hasheados" in caplog.text
+
+def test_version_one_index_is_completed_with_new_hashes():
+    rng = random.Random(5)
+    store = RecordingVectorStore()
+    current_hash = _legacy_store(rng, store, "old", words=700)
+
+    index = DedupIndex(":memory:")
+    index._conn.execute("INSERT INTO meta (name, value) VALUES ('bootstrapped', '1')")
+    assert not index.contains(CONTENT_HASH, current_hash)
+
+    index.bootstrap_from_vectorstore(store)
+    assert index.contains(CONTENT_HASH, current_hash)
+    version = index._conn.execute("SELECT value FROM meta WHERE name = 'bootstrapped'").fetchone()[0]
+    assert version == BOOTSTRAP_VERSION
+
+def test_content_hash_is_blake2b():
+    assert content_hash_of("abc") == hashlib.blake2b(b"abc", digest_size=16).hexdigest()
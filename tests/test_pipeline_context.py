@@ -0,0 +1,71 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.tools.nlp_process import nlp_process
+from app.core.tools.store_in_chromadb import store_in_chromadb
+from app.core.tools.validate_content import validate_content
+from app.core.write_buffer import write_buffer
+
+THREADS = 16
+DOCS_PER_THREAD = 8
+
+def _document(variant: str, worker: int, n: int) -> dict:
+    marker = f"marker{variant}{worker}x{n}"
+    return {
+        "raw_content": f"Spectral clustering {marker} of sparse graphs and community detection. " * 6,
+        "metadata": {
+            "title": f"Spectral clustering {marker}",
+            "authors": "Author",
+            "year": "2024",
+            "link": f"http://arxiv.org/abs/{marker}v1",
+            "source": "arxiv",
+        },
+    }
+
+def _run_pipeline(worker: int, barrier: threading.Barrier, use_ids: bool) -> list:
+    variant = "id" if use_ids else "ctx"
+    results = []
+    for n in range(DOCS_PER_THREAD):
+        doc = _document(variant, worker, n)
+        nlp = nlp_process(doc["raw_content"], doc["metadata"], "arxiv")
+        pipeline_id = re.search(r"pipeline_id: (\w+)", nlp).group(1)
+        # todas as threads com contexto aberto antes de qualquer validação
+        barrier.wait()
+        args = {"pipeline_id": pipeline_id} if use_ids else {}
+        validation = validate_content.invoke({**args, "similarity_threshold": 0.3})
+        barrier.wait()
+        stored = store_in_chromadb.invoke(args)
+        results.append((doc, nlp, validation, stored))
+    return results
+
+def _stress(use_ids: bool, store) -> None:
+    barrier = threading.Barrier(THREADS)
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        futures = [pool.submit(_run_pipeline, w, barrier, use_ids) for w in range(THREADS)]
+        results = [r for f in futures for r in f.result()]
+    write_buffer.flush()
+
+    for doc, nlp, validation, stored in results:
+        content_hash = re.search(r"hash: (\w{8})", nlp).group(1)
+        assert validation.startswith("✅"), validation
+        assert stored.startswith("✅"), stored
+        # cada etapa viu o registro da própria execução
+        assert f"hash: {content_hash}" in validation
+        assert f"hash: {content_hash}" in stored
+
+    by_link = {}
+    for doc_id, chunk in store.docs.items():
+        marker = re.search(r"marker\w+?\d+x\d+", chunk.page_content).group(0)
+        assert chunk.metadata["link"] == f"http://arxiv.org/abs/{marker}v1"
+        by_link.setdefault(chunk.metadata["link"], set()).add(doc_id.rsplit("-", 1)[0])
+    expected = {doc["metadata"]["link"] for doc, *_ in results}
+    assert set(by_link) == expected
+    assert all(len(hashes) == 1 for hashes in by_link.values())
+
+def test_concurrent_pipelines_by_pipeline_id(fake_backends):
+    _stress(use_ids=True, store=fake_backends)
+
+def test_concurrent_pipelines_by_thread_context(fake_backends):
+    # sem pipeline_id cada etapa usa o contexto aberto pelo nlp_process da própria thread
+    _stress(use_ids=False, store=fake_backends)
@@ -0,0 +1,112 @@
+"""
+Carga sintética das pesquisas agendadas: 50 tópicos, três ticks cada,
+contra o servidor local que imita o arXiv.
+
+    python -m pytest tests/test_research_load.py -s
+"""
+import threading
+import time
+
+from app.core import research_queue as research_queue_module
+from app.core.arxiv_cursor import arxiv_cursors
+from app.core.research_queue import ResearchQueue
+from app.core.write_buffer import write_buffer
+
+from fakes import StubArxivServer
+
+TOPICS = [f"synthetic load topic {i:02d}" for i in range(50)]
+QUEUE_SIZE = 40
+
+def _wait_for(condition, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tempo esgotado esperando o despachante"
+        time.sleep(0.01)
+
+def test_fifty_topics_are_coalesced_bounded_and_cursored_after_store(fake_backends, monkeypatch):
+    events = []
+    results = {}
+    lock = threading.Lock()
+
+    def publish(topic, summary):
+        with lock:
+            results.setdefault(topic, []).append(summary)
+
+    # ordem das gravações no buffer e dos avanços de cursor
+    original_add, original_advance = write_buffer.add, arxiv_cursors.advance
+
+    def recording_add(docs, ids):
+        events.append(("store", {d.metadata.get("search_query") for d in docs}))
+        return original_add(docs, ids)
+
+    def recording_advance(topic, entries, failed_links=()):
+        events.append(("cursor", topic))
+        return original_advance(topic, entries, failed_links)
+
+    monkeypatch.setattr(arxiv_cursors, "advance", recording_advance)
+
+    queue = ResearchQueue(max_size=QUEUE_SIZE, pool_kind="async", workers=8, batch_window=0.05, max_batch=50)
+    # o primeiro lote fica preso até todos os ticks chegarem: a fila enche como num despachante lento
+    blocked, release = threading.Event(), threading.Event()
+    process = queue._process
+
+    def gated_process(batch):
+        blocked.set()
+        release.wait(timeout=30)
+        process(batch)
+
+    monkeypatch.setattr(queue, "_process", gated_process)
+
+    with StubArxivServer(delay=0.05) as server:
+        queue._arxiv_url = server.url
+        try:
+            # rodada 1: a gravação falha
+            monkeypatch.setattr(write_buffer, "add", lambda docs, ids: (_ for _ in ()).throw(OSError("disco cheio")))
+            assert queue.submit("synthetic load blocker", 3, publish)
+            assert blocked.wait(timeout=30)
+            started = time.perf_counter()
+            accepted = [queue.submit(topic, 3, publish) for _ in range(3) for topic in TOPICS]
+            stats = queue.stats()
+            assert stats["queue_size"] == QUEUE_SIZE
+            # um pedido por tópico na fila; os demais ticks do tópico são coalescidos
+            assert sum(accepted) == QUEUE_SIZE
+            assert stats["coalesced"] == 2 * QUEUE_SIZE
+            # backpressure: tópicos além do limite são descartados, sem acumular trabalho
+            assert stats["dropped"] == 3 * (len(TOPICS) - QUEUE_SIZE)
+            release.set()
+            _wait_for(lambda: queue.stats()["processed"] == QUEUE_SIZE + 1)
+            first_round = time.perf_counter() - started
+
+            assert set(results) == set(TOPICS[:QUEUE_SIZE]) | {"synthetic load blocker"}
+            assert all(len(r) == 1 for r in results.values())
+            assert server.requests == QUEUE_SIZE + 1
+            # nada armazenado: nenhum cursor criado, a próxima busca repete a inicial
+            assert all(arxiv_cursors.get(topic) is None for topic in TOPICS)
+
+            # rodada 2: a gravação volta
+            monkeypatch.setattr(write_buffer, "add", recording_add)
+            events.clear()
+            # em dois ticks, cada um dentro do limite da fila
+            for tick in (TOPICS[:25], TOPICS[25:]):
+                assert all(queue.submit(topic, 3, publish) for topic in tick)
+                _wait_for(lambda: queue.stats()["queue_size"] == 0)
+            _wait_for(lambda: queue.stats()["processed"] == QUEUE_SIZE + 1 + len(TOPICS))
+        finally:
+            queue.shutdown()
+            queue._close_collector()
+
+    stats = queue.stats()
+    print(
+        f"\n{len(TOPICS)} tópicos: {stats['batches']} lotes, {server.requests} requisições,"
+        f" rodada 1 em {first_round * 1000:.0f} ms, latência média {stats['avg_latency'] * 1000:.0f} ms,"
+        f" máxima {stats['max_latency'] * 1000:.0f} ms"
+    )
+    assert server.requests == QUEUE_SIZE + 1 + len(TOPICS)
+    # blocker, os 40 da fila e os dois ticks da rodada 2 (mesma janela ou não)
+    assert 3 <= stats["batches"] <= 4
+    assert all(arxiv_cursors.get(topic) is not None for topic in TOPICS)
+    # cada cursor avança depois da gravação que contém os artigos do tópico
+    stores = [i for i, (kind, _) in enumerate(events) if kind == "store"]
+    for topic in TOPICS:
+        cursor = events.index(("cursor", topic))
+        assert any(i < cursor and topic in events[i][1] for i in stores), topic
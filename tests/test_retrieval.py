@@ -0,0 +1,69 @@
+import time
+
+from langchain.schema import Document
+
+from app.core import retrieval
+from app.core.retrieval import QueryResultCache, query_cache, search_articles
+from app.core.write_buffer import write_buffer
+
+class _SearchStore:
+    """Vectorstore de consulta: devolve os documentos fixos e conta as buscas."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.searches = 0
+
+    def max_marginal_relevance_search(self, query, k, fetch_k, lambda_mult, filter=None):
+        self.searches += 1
+        return self.docs[:k]
+
+    def similarity_search(self, query, k, filter=None):
+        self.searches += 1
+        return self.docs[:k]
+
+def _doc(n: int) -> Document:
+    return Document(page_content=f"chunk {n}", metadata={"content_hash": f"hash-{n}", "title": f"Artigo {n}"})
+
+def test_cache_hits_expire_after_ttl_and_are_bounded():
+    cache = QueryResultCache(max_size=2, ttl=0.05)
+    cache.put(("a",), [_doc(1)])
+    assert cache.get(("a",)) == [_doc(1)]
+    time.sleep(0.06)
+    assert cache.get(("a",)) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+    for key in ("a", "b", "c"):
+        cache.put((key,), [])
+    # LRU: o mais antigo sai
+    assert cache.get(("a",)) is None
+    assert cache.stats()["size"] == 2
+
+def test_results_computed_before_an_invalidation_are_not_cached():
+    cache = QueryResultCache()
+    generation = cache.generation
+    cache.invalidate()  # descarga no meio da consulta
+    cache.put(("a",), [_doc(1)], generation)
+    assert cache.get(("a",)) is None
+
+def test_search_does_not_flush_and_a_flush_invalidates_the_cache(fake_backends, monkeypatch):
+    store = _SearchStore([_doc(1), _doc(2)])
+    monkeypatch.setattr(retrieval, "get_vectorstore", lambda: store)
+    write_buffer.flush()
+    query_cache.invalidate()
+
+    assert len(search_articles("redes neurais em grafos", k=2)) == 2
+    search_articles("Redes  neurais em grafos", k=2)
+    assert store.searches == 1
+
+    # gravação pendente: a consulta não força a descarga do buffer
+    write_buffer.add([_doc(3)], ["hash-3-0"])
+    search_articles("redes neurais em grafos", k=2)
+    assert write_buffer.stats()["pending"] == 1
+    assert fake_backends.docs == {}
+    assert store.searches == 1
+
+    # a descarga (por tamanho ou tempo) avisa o cache
+    write_buffer.flush()
+    assert query_cache.stats()["size"] == 0
+    search_articles("redes neurais em grafos", k=2)
+    assert store.searches == 2
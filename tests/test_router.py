@@ -0,0 +1,42 @@
+import pytest
+
+from app.core import router
+from app.core.router import match_route
+
+@pytest.mark.parametrize("message, route, query", [
+    ("pesquise sobre grafos durante 5 minutos a cada 30 segundos", "schedule_research", None),
+    ("  Pesquise sobre redes neurais durante 1 minuto a cada 10 segundos. ", "schedule_research", None),
+    ("cancelar busca sobre grafos", "cancel_research", None),
+    ("Cancelar busca sobre redes neurais!", "cancel_research", None),
+    ("ver resultados", "check_scheduler_results", None),
+    ("mostrar resultados das pesquisas agendadas?", "check_scheduler_results", None),
+    ("buscar no arxiv: graph neural networks", "arxiv_search", "graph neural networks"),
+    ("Pesquise na web - LLM agents", "web_search", "LLM agents"),
+    ("consultar base local: transformers", "search_local_articles", "transformers"),
+    ("busque na base: quantum annealing", "search_local_articles", "quantum annealing"),
+])
+def test_commands_take_the_fast_path(message, route, query):
+    name, _, m = match_route(message)
+    assert name == route
+    if query is not None:
+        assert m.group("query") == query
+
+@pytest.mark.parametrize("message", [
+    # só mencionam os comandos: vão ao supervisor
+    "Como faço para cancelar busca sobre grafos?",
+    "Ontem pedi: pesquise sobre grafos durante 5 minutos a cada 30 segundos. Deu certo?",
+    "Se eu disser 'cancelar busca sobre grafos', o que acontece?",
+    "pesquise sobre grafos durante 5 minutos a cada 30 segundos e depois me explique os resultados",
+    "quero ver resultados de 2023 sobre grafos",
+    "o que tem no arxiv sobre grafos?",
+    "Quais artigos sobre grafos temos na base?",
+    "Olá!",
+])
+def test_other_messages_go_to_the_supervisor(message):
+    assert match_route(message) is None
+
+def test_cancel_command_passes_the_topic_without_punctuation(monkeypatch):
+    received = []
+    monkeypatch.setattr(router, "cancel_research", type("Tool", (), {"invoke": staticmethod(lambda args: received.append(args) or "ok")}))
+    assert router.route("cancelar busca sobre grafos.") == "ok"
+    assert received == [{"mensagem": "cancelar busca sobre grafos"}]
@@ -0,0 +1,153 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.core.config import SchedulerUnavailable
+from app.core.process_lock import ProcessLock
+from app.core.scheduler_store import SchedulerStore
+from app.core.tools import sheduler_tools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# processo que segura a trava do scheduler até ser encerrado
+_HOLD_LOCK = """
+import sys, time
+from app.core.process_lock import ProcessLock
+lock = ProcessLock(sys.argv[1])
+assert lock.acquire()
+print("locked", flush=True)
+time.sleep(60)
+"""
+
+@pytest.fixture
+def workers(tmp_path):
+    """Dois workers: cada um com sua conexão ao mesmo arquivo; só o primeiro tem o scheduler."""
+    path = str(tmp_path / "scheduler.sqlite3")
+    owner_store, other_store = SchedulerStore(path), SchedulerStore(path)
+    scheduler = BackgroundScheduler()
+    scheduler.start(paused=True)  # os ticks são disparados à mão
+    yield scheduler, owner_store, other_store
+    scheduler.shutdown(wait=False)
+
+def _as_owner(monkeypatch, scheduler, store):
+    monkeypatch.setattr(sheduler_tools, "get_scheduler_store", lambda: store)
+    monkeypatch.setattr(sheduler_tools, "get_scheduler", lambda: scheduler)
+
+def _as_other_worker(monkeypatch, store):
+    def unavailable():
+        raise SchedulerUnavailable("o scheduler está ativo em outro worker")
+
+    monkeypatch.setattr(sheduler_tools, "get_scheduler_store", lambda: store)
+    monkeypatch.setattr(sheduler_tools, "get_scheduler", unavailable)
+
+def _topic_jobs(scheduler):
+    return [job for job in scheduler.get_jobs() if job.id != sheduler_tools.SYNC_JOB_ID]
+
+def test_schedule_and_cancel_from_a_worker_without_the_scheduler(workers, monkeypatch):
+    scheduler, owner_store, other_store = workers
+
+    _as_other_worker(monkeypatch, other_store)
+    reply = sheduler_tools.schedule_research.invoke({"mensagem": "pesquise sobre grafos durante 5 minutos a cada 30 segundos"})
+    assert reply.startswith("✅ Agendada: 'grafos'")
+    assert _topic_jobs(scheduler) == []
+
+    # o dono do scheduler cria o job na sincronização
+    _as_owner(monkeypatch, scheduler, owner_store)
+    sheduler_tools.sync_jobs(scheduler)
+    [job] = _topic_jobs(scheduler)
+    assert job.trigger.interval.total_seconds() == 30
+
+    submitted = []
+    monkeypatch.setattr(sheduler_tools.research_queue, "submit", lambda *args, **kwargs: submitted.append(args[0]))
+    job.func()
+    assert submitted == ["grafos"]
+
+    # cancelado no outro worker: o próximo tick do dono remove o job
+    _as_other_worker(monkeypatch, other_store)
+    assert sheduler_tools.cancel_research.invoke({"mensagem": "cancelar busca sobre grafos"}).startswith("❌")
+    job.func()
+    assert _topic_jobs(scheduler) == []
+    assert submitted == ["grafos"]
+    assert sheduler_tools.cancel_research.invoke({"mensagem": "cancelar busca sobre grafos"}).startswith("Nenhuma tarefa")
+
+def test_rescheduling_a_topic_replaces_its_job(workers, monkeypatch):
+    scheduler, owner_store, _ = workers
+    _as_owner(monkeypatch, scheduler, owner_store)
+    for interval in (30, 60):
+        sheduler_tools.schedule_research.invoke({"mensagem": f"pesquise sobre grafos durante 5 minutos a cada {interval} segundos"})
+
+    [job] = _topic_jobs(scheduler)
+    assert job.trigger.interval.total_seconds() == 60
+    assert [j["job_id"] for j in owner_store.jobs()] == [job.id]
+
+def test_new_owner_takes_over_stored_jobs(workers, monkeypatch):
+    scheduler, owner_store, other_store = workers
+    _as_other_worker(monkeypatch, other_store)
+    sheduler_tools.schedule_research.invoke({"mensagem": "pesquise sobre redes durante 5 minutos a cada 10 segundos"})
+
+    # o worker que assume o scheduler (ex.: após a queda do dono) recria os jobs da tabela
+    _as_owner(monkeypatch, scheduler, owner_store)
+    sheduler_tools._owned_scheduler()
+    assert [job.id for job in _topic_jobs(scheduler)] == [j["job_id"] for j in owner_store.jobs()]
+    assert scheduler.get_job(sheduler_tools.SYNC_JOB_ID) is not None
+
+def test_results_are_shared_and_delivered_once(workers):
+    _, owner_store, other_store = workers
+    owner_store.add_result("🔍 [grafos] 2 artigos armazenados")
+    owner_store.add_result("🛑 Tarefa 'grafos' finalizada.")
+
+    assert other_store.results() == ["🔍 [grafos] 2 artigos armazenados", "🛑 Tarefa 'grafos' finalizada."]
+    assert len(other_store.take_results()) == 2
+    assert owner_store.take_results() == []
+
+def test_stored_jobs_run_after_restart_without_a_new_command(tmp_path, monkeypatch):
+    path = str(tmp_path / "scheduler.sqlite3")
+    SchedulerStore(path).save_job("grafos", "job_grafos_abc123", 1, time.time() + 300)
+
+    # o dono antigo ainda segura a trava; os agendamentos seguem na tabela
+    lock_path = str(tmp_path / "scheduler.lock")
+    owner = subprocess.Popen(
+        [sys.executable, "-c", _HOLD_LOCK, lock_path], cwd=ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    assert owner.stdout.readline().strip() == "locked"
+
+    scheduler = BackgroundScheduler()
+    lock = ProcessLock(lock_path)
+
+    def get_scheduler():
+        if not lock.acquire():
+            raise SchedulerUnavailable("o scheduler está ativo em outro worker")
+        if not scheduler.running:
+            scheduler.start()
+        return scheduler
+
+    submitted = []
+    monkeypatch.setattr(sheduler_tools, "get_scheduler_store", lambda: SchedulerStore(path))
+    monkeypatch.setattr(sheduler_tools, "get_scheduler", get_scheduler)
+    monkeypatch.setattr(sheduler_tools.research_queue, "submit", lambda *args, **kwargs: submitted.append(args[0]))
+
+    # worker novo, subindo como em create_app
+    stop = threading.Event()
+    watcher = threading.Thread(target=sheduler_tools.watch_scheduler_ownership, args=(0.05, stop))
+    watcher.start()
+    try:
+        time.sleep(0.3)
+        assert not lock.held
+        owner.kill()  # o dono cai
+        owner.wait()
+        deadline = time.time() + 5
+        while not submitted and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        watcher.join()
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        lock.release()
+
+    assert submitted and submitted[0] == "grafos"
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.search_cache import SearchResultCache
+from app.core.tools import arxiv_client, async_collector
+from app.core.tools.async_collector import AsyncCollector, CollectorConfig
+
+from fakes import StubArxivServer
+
+class _Backend:
+    """Busca falsa: conta as chamadas e devolve a consulta com o número da chamada."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        return [{"query": query, "call": call}]
+
+    async def afetch(self, query: str):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [{"query": query, "call": self.calls}]
+
+def test_entries_expire_after_ttl():
+    cache = SearchResultCache(ttl=0.05)
+    backend = _Backend()
+    assert cache.get_or_fetch("arxiv", "Grafos", lambda: backend("grafos")) == [{"query": "grafos", "call": 1}]
+    # consulta normalizada: mesma chave
+    assert cache.get_or_fetch("arxiv", " grafos ", lambda: backend("grafos"))[0]["call"] == 1
+    time.sleep(0.06)
+    assert cache.get_or_fetch("arxiv", "grafos", lambda: backend("grafos"))[0]["call"] == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchResultCache(max_size=2)
+    backend = _Backend()
+    for query in ("a", "b"):
+        cache.get_or_fetch("arxiv", query, lambda: backend(query))
+    cache.get_or_fetch("arxiv", "a", lambda: backend("a"))  # "a" passa a ser o mais recente
+    cache.get_or_fetch("arxiv", "c", lambda: backend("c"))
+
+    assert cache.stats()["size"] == 2
+    assert cache.get_or_fetch("arxiv", "a", lambda: backend("a"))[0]["call"] == 1
+    assert cache.get_or_fetch("arxiv", "b", lambda: backend("b"))[0]["call"] == 4
+
+def test_sqlite_cache_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "search_cache.sqlite3")
+    backend = _Backend()
+    SearchResultCache(path=path).get_or_fetch("arxiv", "grafos", lambda: backend("grafos"), max_results=3)
+
+    reopened = SearchResultCache(path=path)
+    assert reopened.get_or_fetch("arxiv", "grafos", lambda: backend("grafos"), max_results=3)[0]["call"] == 1
+    # outros parâmetros de paginação são outra chave
+    assert reopened.get_or_fetch("arxiv", "grafos", lambda: backend("grafos"), max_results=5)[0]["call"] == 2
+    assert backend.calls == 2
+
+    expired = SearchResultCache(path=path, ttl=0.0)
+    time.sleep(0.01)
+    assert expired.get_or_fetch("arxiv", "grafos", lambda: backend("grafos"), max_results=3)[0]["call"] == 3
+
+def test_errors_are_not_cached():
+    cache = SearchResultCache()
+
+    def failing():
+        raise RuntimeError("429")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("web_search", "grafos", failing)
+    assert cache.get_or_fetch("web_search", "grafos", lambda: ["ok"]) == ["ok"]
+
+def test_concurrent_identical_queries_fetch_once_across_threads():
+    cache = SearchResultCache()
+    backend = _Backend(delay=0.1)
+    barrier = threading.Barrier(16)
+    results = []
+
+    def search():
+        barrier.wait()
+        results.append(cache.get_or_fetch("arxiv", "grafos", lambda: backend("grafos")))
+
+    threads = [threading.Thread(target=search) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.calls == 1
+    assert results == [[{"query": "grafos", "call": 1}]] * 16
+    assert cache.stats()["coalesced"] == 15
+
+def test_concurrent_identical_queries_fetch_once_across_tasks():
+    cache = SearchResultCache()
+    backend = _Backend(delay=0.1)
+
+    async def main():
+        return await asyncio.gather(*(
+            cache.aget_or_fetch("arxiv", "grafos", lambda: backend.afetch("grafos")) for _ in range(16)
+        ))
+
+    results = asyncio.run(main())
+    assert backend.calls == 1
+    assert all(r == [{"query": "grafos", "call": 1}] for r in results)
+
+def test_stub_arxiv_server_is_hit_once_by_threads_and_tasks(monkeypatch):
+    cache = SearchResultCache()
+    monkeypatch.setattr(arxiv_client, "search_cache", cache)
+    monkeypatch.setattr(async_collector, "search_cache", cache)
+    with StubArxivServer(delay=0.1) as server:
+        monkeypatch.setattr(arxiv_client, "ARXIV_API_URL", server.url)
+        barrier = threading.Barrier(8)
+        results = []
+
+        def search():
+            barrier.wait()
+            results.append(arxiv_client.cached_fetch_arxiv_documents("graph networks", max_results=3))
+
+        threads = [threading.Thread(target=search) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.requests == 1
+        assert all(len(docs) == 3 for docs in results)
+
+        async def collect(query):
+            async with AsyncCollector(CollectorConfig(), arxiv_url=server.url) as collector:
+                return await asyncio.gather(*(collector.fetch_arxiv(query, 3) for _ in range(8)))
+
+        # mesma chave das ferramentas síncronas: já está no cache
+        asyncio.run(collect("graph networks"))
+        assert server.requests == 1
+        # consulta nova: 8 tarefas, uma requisição
+        asyncio.run(collect("molecules"))
+        assert server.requests == 2
@@ -0,0 +1,52 @@
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app.core import services
+from app.core.llm_cache import SQLiteLLMCache
+from app.core.llm_client import LLMGuard, ResilientChatModel, TokenBucket
+
+from fakes import ScriptedChatModel
+
+def _graph(model):
+    """Grafo principal com um subgrafo de um nó no lugar do supervisor, como em services."""
+    def call_model(state):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    supervisor = StateGraph(MessagesState)
+    supervisor.add_node("agent", call_model)
+    supervisor.add_edge(START, "agent")
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("supervisor", supervisor.compile())
+    graph.add_edge(START, "supervisor")
+    return graph.compile()
+
+@pytest.fixture
+def replay_model():
+    fake = ScriptedChatModel(script=lambda messages, tools: AIMessage("resposta gravada no cache para esta pergunta"))
+    cache = SQLiteLLMCache(":memory:", mode="replay")
+    guard = LLMGuard(bucket=TokenBucket(rate=0), sleep=lambda s: None)
+    return fake, ResilientChatModel(inner=fake, guard=guard, cache=cache)
+
+def test_replay_miss_ends_the_stream_with_a_message(replay_model, monkeypatch):
+    fake, model = replay_model
+    monkeypatch.setattr(services, "get_compiled", lambda: _graph(model))
+
+    events = list(services._stream_graph("pergunta não gravada", "thread-replay"))
+
+    assert events[-1]["type"] == "final"
+    assert "replay" in events[-1]["content"]
+    assert fake.calls == []
+
+def test_replay_answers_recorded_calls(replay_model, monkeypatch):
+    fake, model = replay_model
+    model.cache.mode = "record"
+    model.invoke([("user", "pergunta gravada com bastante contexto")])
+    model.cache.mode = "replay"
+    monkeypatch.setattr(services, "get_compiled", lambda: _graph(model))
+
+    events = list(services._stream_graph("pergunta gravada com bastante contexto", "thread-replay"))
+
+    assert events[-1]["content"] == "resposta gravada no cache para esta pergunta"
+    assert len(fake.calls) == 1
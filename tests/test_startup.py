@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from app.core.registry import ServiceRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+response = app.test_client().get("/")
+elapsed = time.perf_counter() - started
+from app.core.registry import registry
+print(json.dumps({
+    "seconds": elapsed,
+    "status": response.status_code,
+    "ready": [name for name, s in registry.stats().items() if s["ready"]],
+    "heavy": [m for m in ("app.core.agents", "app.core.services", "langchain_anthropic", "sentence_transformers", "chromadb") if m in sys.modules],
+    # índices de deduplicação/quase-duplicatas e agendamentos: abertos só no primeiro uso
+    "stores": [m for m in ("app.core.shared_state", "app.core.dedup_index", "app.core.near_duplicate", "app.core.scheduler_store") if m in sys.modules],
+}))
+"""
+
+def test_cold_start_serves_home_without_building_services(tmp_path):
+    state = tmp_path / "state"
+    env = dict(
+        os.environ, SAPIEN_WARMUP="0",
+        SAPIEN_DEDUP_DB=str(state / "dedup_index.sqlite3"), SAPIEN_SCHEDULER_DB=str(state / "scheduler.sqlite3"),
+    )
+    runs = []
+    for _ in range(3):
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_START], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    best = min(run["seconds"] for run in runs)
+    timings = ", ".join(f"{run['seconds'] * 1000:.0f} ms" for run in runs)
+    print(f"\nimport + create_app + GET /: {timings}")
+    assert all(run["status"] == 200 for run in runs)
+    # nada de LLM, embeddings, Chroma ou agentes antes do primeiro uso
+    assert runs[0]["ready"] == []
+    assert runs[0]["heavy"] == []
+    assert runs[0]["stores"] == []
+    assert not state.exists()
+    assert best < 1.0
+
+def test_service_is_built_once_under_concurrent_first_use():
+    registry = ServiceRegistry()
+    builds = []
+
+    def factory():
+        builds.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    registry.register("slow", factory)
+    barrier = threading.Barrier(16)
+    values = []
+
+    def use():
+        barrier.wait()
+        values.append(registry.get("slow"))
+
+    threads = [threading.Thread(target=use) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(value) for value in values}) == 1
+    assert registry.stats()["slow"]["ready"]
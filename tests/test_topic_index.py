@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+
+from app.core.embedding_service import embedding_service
+from app.core.topic_index import TopicIndex, normalize_topic
+
+from fakes import HashingEncoder
+
+_TOPICS = ["Graph neural networks", "quantum annealing", "protein folding", "Reinforcement  learning"]
+
+def _per_document(embeddings, topics, encoder: HashingEncoder) -> np.ndarray:
+    """Cálculo de referência: um tópico codificado e um cosseno por documento."""
+    scores = []
+    for embedding, topic in zip(embeddings, topics):
+        topic_vector = encoder.encode([normalize_topic(topic)])[0]
+        norm = np.linalg.norm(embedding) * np.linalg.norm(topic_vector)
+        scores.append(float(embedding @ topic_vector / norm) if norm else 0.0)
+    return np.array(scores, dtype=np.float32)
+
+def test_grouped_similarities_match_the_per_document_computation(fake_backends):
+    rng = random.Random(4)
+    # variações de caixa e espaço caem no mesmo tópico
+    topics = [rng.choice(_TOPICS + ["graph Neural networks ", "QUANTUM annealing"]) for _ in range(200)]
+    texts = [f"{rng.choice(_TOPICS)} {rng.choice(_TOPICS)} study {i}" for i in range(200)]
+    embeddings = HashingEncoder().encode(texts) * np.float32(3.0)  # o índice normaliza
+    embeddings[7] = 0.0  # vetor nulo: similaridade zero
+
+    index = TopicIndex(fallback_topics=[])
+    encoder = embedding_service.model
+    scores = index.similarities(embeddings, topics)
+
+    np.testing.assert_allclose(scores, _per_document(embeddings, topics, HashingEncoder()), atol=1e-6)
+    assert scores[7] == 0.0
+    # um vetor por tópico normalizado, calculados numa única chamada ao modelo
+    assert len(index) == len(_TOPICS)
+    assert encoder.calls == 1 and encoder.texts == len(_TOPICS)
+
+def test_index_is_bounded_and_evicts_the_least_recently_used(fake_backends):
+    index = TopicIndex(fallback_topics=[], max_size=3)
+    index.warm(["a", "b", "c"])
+    index.vectors(["a"])  # "a" passa a ser o mais recente
+    index.warm(["d", "e"])
+
+    assert len(index) == 3
+    assert set(index._vectors) == {"a", "d", "e"}
+
+    for n in range(50):
+        index.vectors([f"topic {n}", "a"])
+        assert len(index) <= 3
+    assert "a" in index._vectors
+
+    # o tópico removido é recalculado
+    encoder = embedding_service.model
+    embedding_service.clear_cache()
+    texts = encoder.texts
+    index.vectors(["b"])
+    assert encoder.texts == texts + 1